@@ -0,0 +1,128 @@
+"""
+Benchmark of BudgetCollection lookups with and without the compiled lookup index
+
+"uncached" times invalidate the index before every call, so each call pays the cost of walking the tree (as every call
+did before the index existed).  "cached" times reuse the index.  The mapping of n_transactions random categories to budgets is also compared between
+the list-based aggregate_categories_to_budget and the vectorized aggregate_categories_to_budget_codes
+
+Usage (from the repo root):
+    python -m benchmarks.bench_budget_collection --n_groups 50 --n_budgets_per_group 20 --n_categories_per_budget 5
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from spearmint.data_structures.budget import Budget, BudgetCollection
+
+
+def make_budget_collection(n_groups, n_budgets_per_group, n_categories_per_budget):
+    """
+    Returns a two-level BudgetCollection of n_groups BudgetCollections, each with n_budgets_per_group Budgets
+    """
+    bc = BudgetCollection("top")
+    for i in range(n_groups):
+        group = BudgetCollection(f"group-{i}")
+        for j in range(n_budgets_per_group):
+            group.add_budget(Budget(10, [f"category-{i}-{j}-{k}" for k in range(n_categories_per_budget)],
+                                    name=f"budget-{i}-{j}"))
+        bc.add_budget(group)
+    return bc
+
+
+def time_per_call(func, n_calls):
+    """Returns the best-of-3 time per call to func, in microseconds"""
+    return min(timeit.repeat(func, number=n_calls, repeat=3)) / n_calls * 1e6
+
+
+def run(n_groups, n_budgets_per_group, n_categories_per_budget, n_calls):
+    bc = make_budget_collection(n_groups, n_budgets_per_group, n_categories_per_budget)
+    categories = bc.categories
+    last_budget = bc.get_leaf_budgets()[-1].name
+
+    lookups = {
+        "categories": lambda: bc.categories,
+        "categories_flat_dict": lambda: bc.categories_flat_dict,
+        "get_budget_names(inf)": lambda: bc.get_budget_names(depth=float("inf")),
+        "get_leaf_budgets": lambda: bc.get_leaf_budgets(),
+        "get_budget_by_name(last leaf)": lambda: bc.get_budget_by_name(last_budget),
+        "aggregate (leaf, all categories)": lambda: bc.aggregate_categories_to_budget(categories),
+        "aggregate (child, all categories)": lambda: bc.aggregate_categories_to_budget(categories, depth="child"),
+    }
+
+    results = []
+    for name, lookup in lookups.items():
+        def uncached():
+            bc.invalidate()
+            lookup()
+
+        results.append({
+            "lookup": name,
+            "uncached [us]": time_per_call(uncached, n_calls),
+            "cached [us]": time_per_call(lookup, n_calls),
+        })
+    df = pd.DataFrame(results).set_index("lookup")
+    df["speedup"] = df["uncached [us]"] / df["cached [us]"]
+    return df
+
+
+def run_construction(n_groups, n_budgets_per_group, n_categories_per_budget):
+    """Returns a DataFrame of the time to build, slice and flatten the BudgetCollection"""
+    bc = make_budget_collection(n_groups, n_budgets_per_group, n_categories_per_budget)
+    budget_names = [b.name for b in bc.get_budgets()]
+    leaf_names = [b.name for b in bc.get_leaf_budgets()]
+    frozen = bc.freeze()
+
+    results = []
+    for name, func in [
+        ("build", lambda: make_budget_collection(n_groups, n_budgets_per_group, n_categories_per_budget)),
+        ("slice_by_budgets (all children)", lambda: bc.slice_by_budgets(budget_names)),
+        ("slice_by_budgets (all leaves)", lambda: bc.slice_by_budgets(leaf_names)),
+        ("flatten", lambda: bc.flatten()),
+        ("freeze", lambda: bc.freeze()),
+        ("slice_by_budgets (all leaves, frozen and memoized)", lambda: frozen.slice_by_budgets(leaf_names)),
+    ]:
+        results.append({"operation": name, "time [ms]": time_per_call(func, 1) / 1e3})
+    return pd.DataFrame(results).set_index("operation")
+
+
+def run_transactions(bc, n_transactions, seed=0):
+    """Returns a DataFrame of the time to map n_transactions categories to leaf budgets with each approach"""
+    rng = np.random.default_rng(seed)
+    categories = np.array(bc.categories + ["not a category"], dtype=object)
+    transactions = pd.Series(categories[rng.integers(0, len(categories), size=n_transactions)])
+    transactions_categorical = transactions.astype("category")
+
+    results = []
+    for name, func in [
+        ("list", lambda: bc.aggregate_categories_to_budget(transactions)),
+        ("codes", lambda: bc.aggregate_categories_to_budget_codes(transactions)),
+        ("codes (categorical input)", lambda: bc.aggregate_categories_to_budget_codes(transactions_categorical)),
+    ]:
+        results.append({"approach": name, "time [ms]": time_per_call(func, 1) / 1e3})
+    return pd.DataFrame(results).set_index("approach")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_groups", type=int, default=50, help="Number of BudgetCollections under the top level")
+    parser.add_argument("--n_budgets_per_group", type=int, default=20, help="Number of Budgets in each group")
+    parser.add_argument("--n_categories_per_budget", type=int, default=5, help="Number of categories in each Budget")
+    parser.add_argument("--n_calls", type=int, default=50, help="Number of calls to time for each lookup")
+    parser.add_argument("--n_transactions", type=int, default=1000000,
+                        help="Number of transaction categories to map to budgets")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    n_categories = args.n_groups * args.n_budgets_per_group * args.n_categories_per_budget
+    print(f"{n_categories} categories in {args.n_groups * args.n_budgets_per_group} budgets")
+    print(run_construction(args.n_groups, args.n_budgets_per_group, args.n_categories_per_budget).round(1).to_string())
+    print()
+    print(run(args.n_groups, args.n_budgets_per_group, args.n_categories_per_budget, args.n_calls).round(1).to_string())
+    print()
+    bc = make_budget_collection(args.n_groups, args.n_budgets_per_group, args.n_categories_per_budget)
+    print(f"Mapping {args.n_transactions} transactions to budgets")
+    print(run_transactions(bc, args.n_transactions).round(1).to_string())
@@ -0,0 +1,64 @@
+"""
+Benchmark of ParallelModel prediction throughput versus number of workers
+
+Usage (from the repo root):
+    python -m benchmarks.bench_parallel_predict --n_rows 200000 --workers 1 2 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import make_pipeline
+
+from spearmint.classifiers.parallel import ParallelModel
+
+
+def make_data(n_rows, n_descriptions=2000, n_categories=50, seed=0):
+    rng = np.random.default_rng(seed)
+    description_ids = rng.integers(0, n_descriptions, size=n_rows)
+    descriptions = np.array([f"merchant {i} store {i % 97}" for i in description_ids], dtype=object)
+    categories = np.array([f"category {i % n_categories}" for i in description_ids], dtype=object)
+    return descriptions, categories
+
+
+def run(n_rows, workers):
+    x, y = make_data(n_rows)
+    clf = make_pipeline(TfidfVectorizer(), RandomForestClassifier(n_estimators=100, random_state=0))
+    clf.fit(x[:5000], y[:5000])
+
+    results = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        model_path = os.path.join(tempdir, "model.joblib")
+        joblib.dump(clf, model_path)
+
+        for n_workers in workers:
+            if n_workers == 1:
+                predict = clf.predict
+            else:
+                predict = ParallelModel(model_path, n_workers=n_workers).predict
+            start = time.perf_counter()
+            predict(x)
+            elapsed = time.perf_counter() - start
+            results.append({"workers": n_workers, "seconds": elapsed, "rows/sec": n_rows / elapsed})
+
+    df = pd.DataFrame(results).set_index("workers")
+    df["speedup"] = df["rows/sec"] / df["rows/sec"].iloc[0]
+    return df
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_rows", type=int, default=200000, help="Number of descriptions to predict")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    print(run(args.n_rows, args.workers).round(2).to_string())
@@ -0,0 +1,61 @@
+"""
+Benchmark of per-description predictions (.predict_one) against the bulk .predict API
+
+Usage (from the repo root):
+    python -m benchmarks.bench_predict_one --n_descriptions 20000 --n_lookups 2000
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from spearmint.classifiers.common_usage_classifier import CommonUsageClassifier
+from spearmint.classifiers.lookup_classifier import LookupClassifier
+
+
+def make_data(n_descriptions, n_rows_per_description=3, n_categories=50, seed=0):
+    rng = np.random.default_rng(seed)
+    descriptions = np.repeat([f"description {i}" for i in range(n_descriptions)], n_rows_per_description)
+    categories = [f"category {i}" for i in rng.integers(0, n_categories, size=len(descriptions))]
+    return pd.Series(descriptions), pd.Series(categories)
+
+
+def time_per_call(func, n_calls):
+    """Returns the best-of-3 time per call to func, in microseconds"""
+    return min(timeit.repeat(func, number=n_calls, repeat=3)) / n_calls * 1e6
+
+
+def run(n_descriptions, n_lookups, n):
+    x, y = make_data(n_descriptions)
+    lookups = list(pd.unique(x)[:n_lookups])
+
+    cuc = CommonUsageClassifier()
+    cuc.fit(x, y)
+
+    lc = LookupClassifier(pd.Series(y.values, index=x.values).groupby(level=0).first())
+
+    results = []
+    for name, predict, predict_one in [
+        ("CommonUsageClassifier", lambda: cuc.predict([lookups[0]], n=n), lambda: cuc.predict_one(lookups[0], n=n)),
+        ("LookupClassifier", lambda: lc.predict([lookups[0]]), lambda: lc.predict_one(lookups[0])),
+    ]:
+        results.append({
+            "classifier": name,
+            "predict (1 row) [us]": time_per_call(predict, 100),
+            "predict_one [us]": time_per_call(predict_one, n_lookups),
+        })
+    return pd.DataFrame(results).set_index("classifier")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_descriptions", type=int, default=20000, help="Number of unique descriptions to fit")
+    parser.add_argument("--n_lookups", type=int, default=2000, help="Number of predict_one calls to time")
+    parser.add_argument("--n", type=int, default=2, help="Number of suggestions per description")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    print(run(args.n_descriptions, args.n_lookups, args.n).round(2).to_string())
@@ -0,0 +1,50 @@
+"""
+Benchmark of RulesClassifier match time as the number of rules grows
+
+Usage (from the repo root):
+    python -m benchmarks.bench_rules_classifier --n_rows 20000 --n_rules 10 100 1000 10000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from spearmint.classifiers.rules_classifier import RulesClassifier
+
+
+def make_descriptions(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return [f"POS PURCHASE merchant{i} store #{i % 997} CITY" for i in rng.integers(0, 10 * n_rows, size=n_rows)]
+
+
+def run(n_rows, n_rules_list):
+    descriptions = make_descriptions(n_rows)
+    results = []
+    for n_rules in n_rules_list:
+        rules = [(f"merchant{i} ", f"category {i % 50}", i % 3) for i in range(n_rules)]
+
+        start = time.perf_counter()
+        clf = RulesClassifier(rules)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        clf.predict(descriptions, n=1)
+        predict_time = time.perf_counter() - start
+
+        results.append({"rules": n_rules, "build [s]": build_time, "predict [s]": predict_time,
+                        "rows/sec": n_rows / predict_time})
+    return pd.DataFrame(results).set_index("rules")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_rows", type=int, default=20000, help="Number of descriptions to classify")
+    parser.add_argument("--n_rules", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="Rule set sizes to compare")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    print(run(args.n_rows, args.n_rules).round(3).to_string())
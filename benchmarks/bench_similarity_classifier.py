@@ -0,0 +1,59 @@
+"""
+Benchmark of SimilarityClassifier index build and query time as the labelled history grows
+
+Usage (from the repo root):
+    python -m benchmarks.bench_similarity_classifier --n_history 1000 10000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from spearmint.classifiers.similarity_classifier import SimilarityClassifier
+
+CITIES = ["TORONTO", "OTTAWA", "MONTREAL", "CALGARY", "VANCOUVER"]
+
+
+def make_descriptions(n, seed):
+    """Returns n descriptions of a random merchant name, store number, and city"""
+    rng = np.random.default_rng(seed)
+    letters = rng.integers(ord("A"), ord("Z") + 1, size=(n, 8)).astype(np.uint8)
+    names = [row.tobytes().decode() for row in letters]
+    numbers = rng.integers(0, 1000, size=n)
+    cities = rng.choice(CITIES, size=n)
+    return [f"{name} #{i} {city}" for name, i, city in zip(names, numbers, cities)]
+
+
+def run(n_history_list, n_queries):
+    queries = make_descriptions(n_queries, seed=1)
+    results = []
+    for n_history in n_history_list:
+        x = make_descriptions(n_history, seed=0)
+        y = [f"category {i % 50}" for i in range(n_history)]
+
+        clf = SimilarityClassifier()
+        start = time.perf_counter()
+        clf.fit(x, y)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        clf.predict(queries, n=2)
+        query_time = time.perf_counter() - start
+
+        results.append({"history": n_history, "build [s]": build_time,
+                        "query [us/row]": query_time / n_queries * 1e6})
+    return pd.DataFrame(results).set_index("history")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_history", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Labelled history sizes to compare")
+    parser.add_argument("--n_queries", type=int, default=2000, help="Number of new descriptions to query")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    print(run(args.n_history, args.n_queries).round(2).to_string())
@@ -0,0 +1,275 @@
+"""
+Speed and quality benchmark for the classifiers, on a synthetic labelled transaction history
+
+The synthetic history mimics real transaction data:
+    -   Each merchant has a true category and several description variants (store numbers and cities), so some test
+        descriptions are never seen in training and can only be classified by generalizing from similar ones
+    -   Description frequencies follow a Zipf distribution (a few descriptions are very common, most are rare)
+    -   A fraction of labels are noisy (mislabelled)
+
+For each classifier, the report has:
+    fit [s]: Time to fit on the training rows
+    size [MB], load [s]: Size of the model saved with joblib, and time to load it back
+    predict [rows/s]: Throughput of top-k suggestions (predict_suggestions) on the test rows
+    peak mem [MB]: Peak python memory allocated during fit and predict (measured with tracemalloc in a separate pass)
+    top-k acc: Fraction of test rows whose true category is in the first k suggestions (NaN if the classifier cannot
+               make k suggestions)
+    e2e [rows/s]: Throughput of classify_by_model (predict plus writing suggestions) on an in-memory db of test rows
+
+Usage (from the repo root):
+    python -m benchmarks.classifier_benchmark --n_rows 50000 --output report.csv
+    python -m benchmarks.classifier_benchmark --classifiers most-common lookup --model rf=./rf_unfitted.joblib
+
+Models given by --model are joblib-saved sklearn estimators (eg: a pipeline) that accept raw descriptions.  They are
+cloned and fitted to the synthetic data, so quality is compared on the same footing as the built-in classifiers
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import ComplementNB
+
+from spearmint.classifiers.common_usage_classifier import CommonUsageClassifier, get_most_frequent_as_df
+from spearmint.classifiers.featurized_classifier import FeaturizedClassifier
+from spearmint.classifiers.lookup_classifier import LookupClassifier
+from spearmint.classifiers.online_classifier import OnlineClassifier
+from spearmint.classifiers.similarity_classifier import SimilarityClassifier
+from spearmint.data.db_session import global_init, global_forget, create_session
+from spearmint.data.transaction import Transaction
+from spearmint.services.classification import classify_by_model, predict_suggestions
+
+CITIES = ["TORONTO", "OTTAWA", "MONTREAL", "CALGARY", "VANCOUVER", "HALIFAX", "WINNIPEG", "REGINA"]
+
+
+def make_dataset(n_rows, n_merchants=2000, n_categories=40, variants_per_merchant=5, zipf_a=1.2, label_noise=0.05,
+                 test_fraction=0.2, seed=0):
+    """
+    Returns (train, test) DataFrames of synthetic labelled transactions, each with columns of description and category
+
+    Test rows are labelled with their true category (no noise), so accuracy measures how well the noisy training labels
+    were generalized
+    """
+    rng = np.random.default_rng(seed)
+
+    letters = rng.integers(ord("A"), ord("Z") + 1, size=(n_merchants, 8)).astype(np.uint8)
+    merchant_names = [row.tobytes().decode() for row in letters]
+    merchant_categories = rng.integers(0, n_categories, size=n_merchants)
+
+    descriptions = []
+    description_categories = []
+    for name, category in zip(merchant_names, merchant_categories):
+        for store_number in rng.choice(10000, size=variants_per_merchant, replace=False):
+            descriptions.append(f"{name} #{store_number} {rng.choice(CITIES)}")
+            description_categories.append(category)
+    descriptions = np.array(descriptions, dtype=object)
+    description_categories = np.array(description_categories)
+
+    # Zipfian popularity over a random ordering of descriptions
+    popularity_rank = rng.permutation(len(descriptions)) + 1
+    p = popularity_rank.astype(float) ** -zipf_a
+    rows = rng.choice(len(descriptions), size=n_rows, p=p / p.sum())
+
+    categories = description_categories[rows].copy()
+    noisy = rng.random(n_rows) < label_noise
+    noisy_categories = rng.integers(0, n_categories, size=n_rows)
+
+    df = pd.DataFrame({
+        "description": descriptions[rows],
+        "category": [f"category {c}" for c in np.where(noisy, noisy_categories, categories)],
+        "true_category": [f"category {c}" for c in categories],
+    })
+    is_test = rng.random(n_rows) < test_fraction
+    train = df.loc[~is_test, ["description", "category"]].reset_index(drop=True)
+    test = df.loc[is_test, ["description", "true_category"]].rename(columns={"true_category": "category"})
+    return train, test.reset_index(drop=True)
+
+
+def _fit_lookup(x, y):
+    most_common = get_most_frequent_as_df(pd.DataFrame({"x": x, "y": y}), "x", "y", n_most_frequent=1)[0]
+    return LookupClassifier(most_common)
+
+
+def _fitted(clf, x, y):
+    clf.fit(x, y)
+    return clf
+
+
+# {name: function(x, y) -> fitted classifier}.  Each is called fresh for every pass so no state leaks between passes
+BUILTIN_CLASSIFIERS = {
+    "most-common": lambda x, y: _fitted(CommonUsageClassifier(), x, y),
+    "lookup": _fit_lookup,
+    "similar": lambda x, y: _fitted(SimilarityClassifier(), x, y),
+    "tfidf-nb": lambda x, y: _fitted(FeaturizedClassifier(TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4)),
+                                                          ComplementNB()), x, y),
+    "online": lambda x, y: _fitted(OnlineClassifier(), x, y),
+}
+
+
+def _joblib_model_factory(path):
+    template = joblib.load(path)
+    return lambda x, y: _fitted(clone(template), x, y)
+
+
+def top_k_accuracy(predictions, truth, k_max):
+    """
+    Returns [top-1 accuracy, ..., top-k_max accuracy], with NaN for any k larger than the number of suggestions made
+    """
+    labels = predictions.to_numpy(dtype=object)
+    truth = np.asarray(truth, dtype=object)[:, None]
+    hits = labels == truth
+    accuracy = []
+    for k in range(1, k_max + 1):
+        if k > labels.shape[1]:
+            accuracy.append(np.nan)
+        else:
+            accuracy.append(hits[:, :k].any(axis=1).mean())
+    return accuracy
+
+
+def _suggest(clf, x, k):
+    """Returns predict_suggestions(clf, x, k), falling back to k=1 for classifiers that only make one suggestion"""
+    try:
+        return predict_suggestions(clf, x, n=k)[0]
+    except NotImplementedError:
+        return predict_suggestions(clf, x, n=1)[0]
+
+
+def measure_peak_memory(factory, train, test, k):
+    """Returns the peak python memory (MB) allocated while fitting and predicting"""
+    tracemalloc.start()
+    try:
+        clf = factory(train["description"], train["category"])
+        _suggest(clf, test["description"].to_numpy(), k)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def measure_joblib_round_trip(clf):
+    """Returns (size in MB, load time in s) of clf saved with joblib"""
+    with tempfile.TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, "model.joblib")
+        joblib.dump(clf, path)
+        size = os.path.getsize(path) / 1e6
+        start = time.perf_counter()
+        joblib.load(path)
+        load_time = time.perf_counter() - start
+    return size, load_time
+
+
+def measure_end_to_end(clf, descriptions, k):
+    """Returns the rows/s of classify_by_model on an in-memory db holding descriptions"""
+    global_init('', echo=False)
+    try:
+        s = create_session()
+        s.execute(Transaction.__table__.insert(), [{"description": d} for d in descriptions])
+        s.commit()
+        s.close()
+
+        start = time.perf_counter()
+        try:
+            classify_by_model("benchmark", clf, n_classifications_per_trx=k)
+        except NotImplementedError:
+            classify_by_model("benchmark", clf, n_classifications_per_trx=1)
+        elapsed = time.perf_counter() - start
+    finally:
+        global_forget()
+    return len(descriptions) / elapsed
+
+
+def benchmark_classifier(name, factory, train, test, k, measure_memory=True):
+    x_test = test["description"].to_numpy()
+
+    start = time.perf_counter()
+    clf = factory(train["description"], train["category"])
+    fit_time = time.perf_counter() - start
+
+    size, load_time = measure_joblib_round_trip(clf)
+
+    start = time.perf_counter()
+    predictions = _suggest(clf, x_test, k)
+    predict_time = time.perf_counter() - start
+
+    result = {
+        "classifier": name,
+        "fit [s]": fit_time,
+        "size [MB]": size,
+        "load [s]": load_time,
+        "predict [rows/s]": len(x_test) / predict_time,
+        "peak mem [MB]": measure_peak_memory(factory, train, test, k) if measure_memory else np.nan,
+    }
+    for i, accuracy in enumerate(top_k_accuracy(predictions, test["category"], k), start=1):
+        result[f"top-{i} acc"] = accuracy
+    result["e2e [rows/s]"] = measure_end_to_end(clf, x_test, k)
+    return result
+
+
+def run(classifiers, train, test, k=3, measure_memory=True):
+    """
+    Returns a DataFrame report (one row per classifier) of benchmark_classifier for each of classifiers
+
+    Args:
+        classifiers (dict): {name: function(x, y) -> fitted classifier}
+        train (pd.DataFrame): Training rows, with columns of description and category
+        test (pd.DataFrame): Test rows, with columns of description and category
+        k (int): Number of suggestions to make (and maximum k to report top-k accuracy for)
+        measure_memory (bool): If False, skip the (slow) tracemalloc pass
+
+    Returns:
+        (pd.DataFrame)
+    """
+    results = [benchmark_classifier(name, factory, train, test, k, measure_memory=measure_memory)
+               for name, factory in classifiers.items()]
+    return pd.DataFrame(results).set_index("classifier")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_rows", type=int, default=50000, help="Number of synthetic transactions")
+    parser.add_argument("--n_merchants", type=int, default=2000, help="Number of distinct merchants")
+    parser.add_argument("--n_categories", type=int, default=40, help="Number of categories")
+    parser.add_argument("--zipf_a", type=float, default=1.2, help="Zipf exponent of description frequencies")
+    parser.add_argument("--label_noise", type=float, default=0.05, help="Fraction of mislabelled training rows")
+    parser.add_argument("--k", type=int, default=3, help="Number of suggestions per transaction")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data")
+    parser.add_argument("--classifiers", nargs="+", default=list(BUILTIN_CLASSIFIERS),
+                        choices=list(BUILTIN_CLASSIFIERS), help="Built-in classifiers to benchmark")
+    parser.add_argument("--model", action="append", default=[],
+                        help="Additional joblib-saved sklearn estimator to benchmark, as name=path.  Can be repeated")
+    parser.add_argument("--no_memory", action="store_true", help="Skip the tracemalloc memory pass")
+    parser.add_argument("--output", default=None,
+                        help="Optional path to also write the report to (.csv, or .json with the dataset settings)")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    train, test = make_dataset(args.n_rows, n_merchants=args.n_merchants, n_categories=args.n_categories,
+                               zipf_a=args.zipf_a, label_noise=args.label_noise, seed=args.seed)
+    print(f"{len(train)} training rows ({train['description'].nunique()} unique descriptions), "
+          f"{len(test)} test rows ({(~test['description'].isin(train['description'])).mean():.1%} unseen)")
+
+    classifiers = {name: BUILTIN_CLASSIFIERS[name] for name in args.classifiers}
+    for spec in args.model:
+        name, path = spec.split("=", 1)
+        classifiers[name] = _joblib_model_factory(path)
+
+    report = run(classifiers, train, test, k=args.k, measure_memory=not args.no_memory)
+    print(report.round(3).to_string())
+
+    if args.output:
+        if args.output.endswith(".json"):
+            settings = {k: v for k, v in vars(args).items() if k not in ("output", "model", "classifiers")}
+            with open(args.output, "w") as fout:
+                json.dump({"settings": settings, "results": report.reset_index().to_dict("records")}, fout, indent=2)
+        else:
+            report.to_csv(args.output)
@@ -10,12 +10,16 @@ LABEL = "y"
 
 
 class CommonUsageClassifier:
+    # predict() natively returns the top n predictions as a DataFrame
+    predicts_top_n = True
+
     def __init__(self):
         """
         Classifier that returns classifications based on the the n-most common labels for the data
 
         """
         self._df = None
+        self._lookup = {}
 
     def fit(self, feature_column, label_column):
         """
@@ -27,6 +31,7 @@ class CommonUsageClassifier:
         """
         df_temp = pd.DataFrame({FEATURE: feature_column, LABEL: label_column})
         self._df = get_most_frequent_as_df(df_temp, FEATURE, LABEL)
+        self._lookup = build_lookup(self._df)
 
     def predict(self, x, n=1):
         # Handle NA
@@ -46,6 +51,38 @@ class CommonUsageClassifier:
 
         return predicted
 
+    def predict_one(self, x, n=1):
+        """
+        Returns the n most common labels for a single feature, padded with None if fewer than n are known
+
+        Unlike .predict, this avoids building any DataFrames and is a single dict lookup into a table precomputed during
+        .fit.  Intended for interactive use (eg: suggesting a category while a user edits a single row)
+
+        Args:
+            x: A single feature (likely a string description)
+            n (int): Number of labels to return.  If None, return all known labels for x
+
+        Returns:
+            (list): Labels from most to least common
+        """
+        labels = self._lookup.get(x, ())
+        if n is None:
+            return list(labels)
+        return list(labels[:n]) + [None] * (n - len(labels))
+
+    def predict_many(self, x, n=1):
+        """
+        Returns .predict_one for each element of x, as a list of lists
+
+        Args:
+            x (iterable): A (small) 1D iterable of features
+            n (int): See predict_one
+
+        Returns:
+            (list): List of label lists
+        """
+        return [self.predict_one(this_x, n=n) for this_x in x]
+
     @classmethod
     def from_db(cls, db_file=None, feature_column='description', label_column='category'):
         """
@@ -150,6 +187,25 @@ def get_most_frequent_as_df(df, by, col_to_count, n_most_frequent=None, pad_to_n
     return df_returned
 
 
+def build_lookup(df):
+    """
+    Returns a {index: (value_0, value_1, ...)} dict of the non-null values in each row of df
+
+    Ex:
+        get_most_frequent_as_df output of:
+              0    1
+        x
+        x0   y1   y0
+        x1   y2  NaN
+
+    Results in:
+        {"x0": ("y1", "y0"), "x1": ("y2",)}
+    """
+    values = df.to_numpy(dtype=object)
+    is_null = pd.isnull(values)
+    return {index: tuple(row[~row_is_null]) for index, row, row_is_null in zip(df.index, values, is_null)}
+
+
 def pad_df(df, columns, pad_with=np.nan, inplace=False):
     """
     Returns df padded by columns of pad_with for any column in columns that is not already a column in df
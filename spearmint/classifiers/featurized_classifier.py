@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+
+# Maximum number of descriptions kept in a FeaturizedClassifier's cache of prediction features.  Beyond this, the oldest
+# descriptions are dropped
+MAX_CACHED_PREDICT_DESCRIPTIONS = 100000
+
+
+def _hash(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode())
+        # Separator that cannot appear in a str part, so ("ab", "c") and ("a", "bc") hash differently
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _write_atomically(path, write):
+    """
+    Calls write(file object) on a temporary file in path's directory and then moves it to path
+
+    Readers (in this or other processes) therefore see either the old file or the complete new one, never a partial
+    write
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fout:
+            write(fout)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def vectorizer_config_key(vectorizer):
+    """
+    Returns a str hash of a (sklearn) vectorizer's class and parameters
+    """
+    params = {k: repr(v) for k, v in sorted(vectorizer.get_params().items())}
+    return _hash(type(vectorizer).__name__, json.dumps(params, sort_keys=True))
+
+
+class FeatureCache:
+    def __init__(self, cache_dir):
+        """
+        On-disk cache of sparse description feature matrices
+
+        Each entry is stored under a str key as:
+            {key}.npz: The descriptions and their sparse feature matrix (one row per description, in the same order)
+            {key}.vectorizer.joblib: (optional) The fitted vectorizer that made the matrix
+
+        Files are replaced atomically, so entries can be shared by concurrent processes and threads (eg: ParallelModel
+        workers).  Descriptions and matrix are in one file, so a reader can never pair the descriptions of one write with
+        the matrix of another.  Concurrent saves to the same key are last-writer-wins
+
+        Args:
+            cache_dir (str): Directory to store cache entries in.  Created if it does not exist
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def load(self, key):
+        """
+        Returns (descriptions, matrix, vectorizer) for key, or None if key is not cached
+
+        vectorizer is None if it was not saved with the entry
+        """
+        try:
+            with np.load(self._path(key, ".npz")) as npz:
+                if "descriptions" not in npz:
+                    # Entry from an older version of the cache
+                    return None
+                descriptions = npz["descriptions"].tolist()
+                matrix = scipy.sparse.csr_matrix((npz["data"], npz["indices"], npz["indptr"]),
+                                                 shape=tuple(npz["shape"]))
+        except FileNotFoundError:
+            return None
+        vectorizer_path = self._path(key, ".vectorizer.joblib")
+        vectorizer = joblib.load(vectorizer_path) if os.path.exists(vectorizer_path) else None
+        return descriptions, matrix, vectorizer
+
+    def save(self, key, descriptions, matrix, vectorizer=None):
+        """
+        Saves an entry to the cache, replacing any existing entry with this key
+        """
+        if vectorizer is not None:
+            # Written before the matrix, because the matrix's existence is what marks an entry as present
+            _write_atomically(self._path(key, ".vectorizer.joblib"), lambda fout: joblib.dump(vectorizer, fout))
+
+        matrix = scipy.sparse.csr_matrix(matrix)
+        descriptions = np.array(list(descriptions), dtype=str)
+        _write_atomically(self._path(key, ".npz"), lambda fout: np.savez(
+            fout, descriptions=descriptions, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+            shape=np.array(matrix.shape),
+        ))
+
+
+class FeaturizedClassifier:
+    def __init__(self, vectorizer, estimator, cache_dir=None):
+        """
+        Classifier that turns descriptions into sparse text features and then classifies them with a sklearn estimator
+
+        Featurization is cached (if cache_dir is set):
+            -   fit caches the training matrix keyed by the vectorizer config and the set of training descriptions, so
+                retraining on the same descriptions (eg: with a different estimator, or after relabelling) skips
+                featurization
+            -   predict keeps a single growing matrix of the descriptions it has featurized (up to the most recent
+                MAX_CACHED_PREDICT_DESCRIPTIONS), so repeated predictions only featurize descriptions that have not been
+                seen before
+
+        Features are computed once per unique description and then broadcast to each row
+
+        Args:
+            vectorizer: An unfitted sklearn text vectorizer (eg: TfidfVectorizer)
+            estimator: An unfitted sklearn classifier that accepts sparse input (eg: RandomForestClassifier)
+            cache_dir (str): Optional directory for cached feature matrices
+        """
+        self.vectorizer = vectorizer
+        self.estimator = estimator
+        self.cache_dir = cache_dir
+        self._vectorizer_key = None
+
+    @property
+    def classes_(self):
+        return self.estimator.classes_
+
+    def _get_cache(self):
+        if self.cache_dir is None:
+            return None
+        return FeatureCache(self.cache_dir)
+
+    def fit(self, feature_column, label_column):
+        """
+        Fits the vectorizer and estimator
+
+        Args:
+            feature_column (iterable): A 1D iterable of descriptions
+            label_column (iterable): A 1D iterable of the same shape as feature containing the labels for the features
+        """
+        feature_column = pd.Series(feature_column, dtype=object).fillna("")
+        descriptions = sorted(pd.unique(feature_column))
+        key = _hash(vectorizer_config_key(self.vectorizer), *descriptions)
+
+        cache = self._get_cache()
+        cached = cache.load(key) if cache else None
+        if cached and cached[2] is not None:
+            _, features, self.vectorizer = cached
+        else:
+            features = self.vectorizer.fit_transform(descriptions)
+            if cache:
+                cache.save(key, descriptions, features, vectorizer=self.vectorizer)
+
+        # Predictions are only valid against features made by this exact fitted vectorizer
+        self._vectorizer_key = key
+
+        rows = pd.Index(descriptions).get_indexer(feature_column)
+        self.estimator.fit(features[rows], np.asarray(label_column))
+        return self
+
+    def transform(self, x):
+        """
+        Returns the (cached, where available) sparse features for x, with one row per element of x
+
+        Args:
+            x (iterable): 1D iterable of descriptions
+
+        Returns:
+            (scipy.sparse.csr_matrix)
+        """
+        x = pd.Series(x, dtype=object).fillna("")
+        unique_x = pd.unique(x)
+
+        cache = self._get_cache()
+        if cache is None:
+            features = self.vectorizer.transform(unique_x)
+            return features[pd.Index(unique_x).get_indexer(x)]
+
+        key = _hash("predict", self._vectorizer_key)
+        cached = cache.load(key)
+        if cached:
+            descriptions, features, _ = cached
+        else:
+            descriptions, features = [], None
+
+        known = pd.Index(descriptions)
+        new_descriptions = [d for d in unique_x if d not in known]
+        if new_descriptions:
+            new_features = self.vectorizer.transform(new_descriptions)
+            features = new_features if features is None else scipy.sparse.vstack([features, new_features]).tocsr()
+            descriptions = list(descriptions) + new_descriptions
+            known = pd.Index(descriptions)
+            result = features[known.get_indexer(x)]
+
+            # The whole entry is rewritten on every save, so keep it bounded by dropping the oldest descriptions
+            if len(descriptions) > MAX_CACHED_PREDICT_DESCRIPTIONS:
+                descriptions = descriptions[-MAX_CACHED_PREDICT_DESCRIPTIONS:]
+                features = features[-MAX_CACHED_PREDICT_DESCRIPTIONS:]
+            cache.save(key, descriptions, features)
+            return result
+
+        return features[known.get_indexer(x)]
+
+    def predict(self, x):
+        return self.estimator.predict(self.transform(x))
+
+    def predict_proba(self, x):
+        return self.estimator.predict_proba(self.transform(x))
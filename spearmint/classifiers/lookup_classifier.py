@@ -5,6 +5,9 @@ class LookupClassifier:
     def __init__(self, labels_as_series):
         self.labels_as_series = labels_as_series
 
+        # Hash lookup for single/small-batch predictions, dropping anything without a label
+        self._lookup = labels_as_series.dropna().to_dict()
+
     def predict(self, x):
         # Use reindex to get all labels corresponding to elements of x, with default value of None if x is not in
         # known labels
@@ -18,6 +21,20 @@ class LookupClassifier:
 
         return predicted
 
+    def predict_one(self, x):
+        """
+        Returns the label for a single feature, or None if x has no known label
+
+        This is a dict lookup rather than a reindex, so is much faster than .predict for one (or a few) features
+        """
+        return self._lookup.get(x, None)
+
+    def predict_many(self, x):
+        """
+        Returns a list of .predict_one for each element of x
+        """
+        return [self._lookup.get(this_x, None) for this_x in x]
+
     @classmethod
     def from_csv(cls, csv_file):
         """
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+
+class OnlineClassifier:
+    def __init__(self, n_features=2 ** 18, analyzer="char_wb", ngram_range=(2, 4), alpha=1e-5, random_state=0):
+        """
+        Description classifier that can be updated incrementally with new labels rather than retrained from scratch
+
+        Descriptions are featurized with a HashingVectorizer, which is stateless (no vocabulary to fit), so features for
+        new descriptions never change the features of old ones.  A linear model (SGDClassifier with log loss, so
+        predict_proba is available) is then updated with partial_fit.  The cost of an update scales with the number of
+        new labels, not the size of the history.
+
+        Categories that have not been seen before are added on the fly (SGDClassifier normally needs all classes up
+        front).  A new category starts with zero weights and is learned from the update that introduced it onward.
+
+        Args:
+            n_features (int): Number of hashed features
+            analyzer (str): HashingVectorizer analyzer ('word', 'char', or 'char_wb')
+            ngram_range (tuple): HashingVectorizer ngram_range
+            alpha (float): SGDClassifier regularization strength
+            random_state (int): SGDClassifier random state
+        """
+        self.vectorizer = HashingVectorizer(n_features=n_features,
+                                            analyzer=analyzer,
+                                            ngram_range=tuple(ngram_range),
+                                            alternate_sign=False,
+                                            )
+        self.estimator = SGDClassifier(loss="log_loss", alpha=alpha, random_state=random_state)
+
+        # {record key: label version} of every labelled record used in training, so callers can find which records are
+        # new or have changed since the last update (see services.classification.update_online_model)
+        self.trained_versions = {}
+
+        # Until we have seen two categories, the estimator cannot be fit.  Hold any labels seen so far here
+        self._pending_x = None
+        self._pending_y = None
+
+    @property
+    def is_fitted(self):
+        return hasattr(self.estimator, "classes_")
+
+    @property
+    def classes_(self):
+        if self.is_fitted:
+            return self.estimator.classes_
+        elif self._pending_y is not None:
+            return np.unique(self._pending_y)
+        else:
+            return np.array([], dtype=object)
+
+    def _transform(self, x):
+        return self.vectorizer.transform(pd.Series(x, dtype=object).fillna(""))
+
+    def partial_fit(self, feature_column, label_column):
+        """
+        Updates the model with a batch of labelled descriptions
+
+        Args:
+            feature_column (iterable): A 1D iterable of descriptions
+            label_column (iterable): A 1D iterable of the same shape as feature containing the labels for the features
+
+        Returns:
+            self
+        """
+        features = self._transform(feature_column)
+        labels = np.asarray(label_column, dtype=object)
+        if len(labels) == 0:
+            return self
+
+        if not self.is_fitted:
+            if self._pending_y is not None:
+                features = scipy.sparse.vstack([self._pending_x, features]).tocsr()
+                labels = np.concatenate([self._pending_y, labels])
+            classes = np.unique(labels)
+            if len(classes) < 2:
+                self._pending_x, self._pending_y = features, labels
+                return self
+            self._pending_x, self._pending_y = None, None
+            self.estimator.partial_fit(features, labels, classes=classes)
+            return self
+
+        self._add_classes(np.unique(labels))
+        self.estimator.partial_fit(features, labels)
+        return self
+
+    # Labelled data is always added incrementally, so fit is just the first partial_fit
+    fit = partial_fit
+
+    def _add_classes(self, labels):
+        """
+        Grows the estimator's classes (and coefficients) to include any of labels that it has not seen before
+        """
+        est = self.estimator
+        new_classes = np.setdiff1d(labels, est.classes_)
+        if len(new_classes) == 0:
+            return
+
+        coef = est.coef_
+        intercept = est.intercept_
+        if len(est.classes_) == 2:
+            # Binary models keep a single row of weights for "classes_[1] vs classes_[0]".  Convert to one row per class
+            # so the multiclass (one-vs-rest) model predicts the same way for the existing classes
+            coef = np.vstack([-coef, coef])
+            intercept = np.concatenate([-intercept, intercept])
+
+        classes = np.concatenate([est.classes_, new_classes])
+        coef = np.vstack([coef, np.zeros((len(new_classes), coef.shape[1]))])
+        intercept = np.concatenate([intercept, np.zeros(len(new_classes))])
+
+        # classes_ must stay sorted, because sklearn maps labels to columns by searchsorted
+        order = np.argsort(classes, kind="stable")
+        est.classes_ = classes[order]
+        est.coef_ = np.ascontiguousarray(coef[order])
+        est.intercept_ = intercept[order]
+
+    def _constant_prediction(self, x):
+        # Only one category has been seen, so that is all we can predict
+        return np.full(len(x), self.classes_[0] if len(self.classes_) else None, dtype=object)
+
+    def predict(self, x):
+        if not self.is_fitted:
+            return self._constant_prediction(x)
+        return self.estimator.predict(self._transform(x))
+
+    def predict_proba(self, x):
+        if not self.is_fitted:
+            return np.ones((len(x), len(self.classes_)))
+        return self.estimator.predict_proba(self._transform(x))
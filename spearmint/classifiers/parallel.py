@@ -0,0 +1,199 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Chunks per worker.  More chunks balances load better between workers at the cost of more inter-process overhead
+CHUNKS_PER_WORKER = 4
+
+# Model loaded by each worker process.  Set once per worker by _init_worker so the model is never pickled per task
+_worker_model = None
+
+
+def _init_worker(model_path, mmap_mode):
+    global _worker_model
+    _worker_model = joblib.load(model_path, mmap_mode=mmap_mode)
+
+
+def _call_on_chunk(method, kwargs, x):
+    return getattr(_worker_model, method)(x, **kwargs)
+
+
+def _concatenate(parts):
+    """
+    Returns chunked results merged back into one, keeping DataFrames (eg: top n predictions) as DataFrames
+    """
+    if isinstance(parts[0], pd.DataFrame):
+        return pd.concat(parts)
+    return np.concatenate([np.asarray(p) for p in parts])
+
+
+class ParallelModel:
+    def __init__(self, model_path, n_workers=None, mmap_mode="r"):
+        """
+        Wraps a joblib-saved model with a sklearn-like .predict that shards its input across a process pool
+
+        Each worker loads the model once from model_path when the pool starts.  With mmap_mode="r", large numpy arrays
+        in the model (eg: the trees of a random forest) are memory-mapped, so workers share the OS page cache rather
+        than each holding a copy.  Results from each chunk are merged in the original order of the input.
+
+        Args:
+            model_path (str): Path to a model saved using joblib.dump (uncompressed, if memory-mapping is wanted)
+            n_workers (int): Number of worker processes.  Defaults to os.cpu_count()
+            mmap_mode (str): Passed to joblib.load in each worker.  None loads the model fully into each worker
+        """
+        self.model_path = model_path
+        self.n_workers = n_workers if n_workers else os.cpu_count()
+        self.mmap_mode = mmap_mode
+        self._tempdir = None
+        self._description = None
+
+    def _describe(self):
+        """
+        Returns a dict describing the wrapped model (see ClassificationServer.describe), probing it on first use
+
+        The model is loaded (memory-mapped if mmap_mode is set) in this process once to check what it supports.  Only
+        the description is kept
+        """
+        if self._description is None:
+            clf = joblib.load(self.model_path, mmap_mode=self.mmap_mode)
+            self._description = {
+                "type": type(clf).__name__,
+                "predict_proba": hasattr(clf, "predict_proba"),
+                "predicts_top_n": getattr(clf, "predicts_top_n", False),
+                "predict_with_confidence": hasattr(clf, "predict_with_confidence"),
+                "classes_": getattr(clf, "classes_", None),
+            }
+        return self._description
+
+    @property
+    def supports_predict_proba(self):
+        """
+        Whether the wrapped model supports predict_proba (and thus top-k suggestions with confidence)
+        """
+        return self._describe()["predict_proba"]
+
+    @property
+    def predicts_top_n(self):
+        """
+        Whether the wrapped model's predict natively returns its top n predictions (eg: CommonUsageClassifier)
+        """
+        return self._describe()["predicts_top_n"]
+
+    @property
+    def supports_predict_with_confidence(self):
+        """
+        Whether the wrapped model has predict_with_confidence (eg: SimilarityClassifier)
+        """
+        return self._describe()["predict_with_confidence"]
+
+    @property
+    def classes_(self):
+        """
+        The wrapped model's classes_
+        """
+        classes = self._describe()["classes_"]
+        if classes is None:
+            raise AttributeError(f"{self._describe()['type']} has no classes_")
+        return classes
+
+    def predict(self, x, n=None):
+        """
+        Returns the wrapped model's .predict(x), computed in chunks across the process pool
+
+        Args:
+            x (iterable): 1D iterable of features (likely descriptions)
+            n (int): Number of predictions per feature.  Only passed to models that predicts_top_n (if None, their
+                     default is used)
+
+        Returns:
+            (np.array or pd.DataFrame): Predictions in the same order as x
+        """
+        if n is not None and self.predicts_top_n:
+            return self._call_in_pool("predict", x, n=n)
+        return self._call_in_pool("predict", x)
+
+    def predict_with_confidence(self, x, n=1):
+        """
+        Returns the wrapped model's .predict_with_confidence(x, n), computed in chunks across the process pool
+
+        Only supported if the wrapped model has predict_with_confidence (see supports_predict_with_confidence)
+
+        Returns:
+            (pd.DataFrame, pd.DataFrame): Predictions and confidences, in the same order as x
+        """
+        if not self.supports_predict_with_confidence:
+            raise AttributeError(f"{self._describe()['type']} has no predict_with_confidence")
+        return self._call_in_pool("predict_with_confidence", x, n=n)
+
+    def predict_proba(self, x):
+        """
+        Returns the wrapped model's .predict_proba(x), computed in chunks across the process pool
+
+        Args:
+            x (iterable): 1D iterable of features (likely descriptions)
+
+        Returns:
+            (np.array): (len(x), n_classes) array of probabilities in the same order as x
+        """
+        if not self.supports_predict_proba:
+            raise AttributeError(f"{self._describe()['type']} has no predict_proba")
+        return self._call_in_pool("predict_proba", x)
+
+    def _call_in_pool(self, method, x, **kwargs):
+        x = np.asarray(x, dtype=object)
+        if len(x) == 0 and method == "predict_proba":
+            return np.empty((0, len(self.classes_)))
+        elif len(x) == 0 and method == "predict" and not kwargs:
+            return np.array([], dtype=object)
+        elif len(x) == 0:
+            # Let the model decide the shape of an empty result
+            chunks = [x]
+        else:
+            n_chunks = min(len(x), self.n_workers * CHUNKS_PER_WORKER)
+            chunks = np.array_split(x, n_chunks)
+
+        with ProcessPoolExecutor(max_workers=self.n_workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.model_path, self.mmap_mode),
+                                 ) as executor:
+            # executor.map yields results in the order of chunks, regardless of which finishes first
+            predictions = list(executor.map(partial(_call_on_chunk, method, kwargs), chunks))
+
+        if isinstance(predictions[0], tuple):
+            # Several results per chunk (eg: predict_with_confidence)
+            return tuple(_concatenate(list(parts)) for parts in zip(*predictions))
+        return _concatenate(predictions)
+
+    def close(self):
+        """
+        Removes any temporary model artifact created by from_model
+        """
+        if self._tempdir:
+            shutil.rmtree(self._tempdir, ignore_errors=True)
+            self._tempdir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @classmethod
+    def from_model(cls, clf, n_workers=None, mmap_mode="r"):
+        """
+        Returns a ParallelModel for an in-memory model, by first saving it as a temporary joblib artifact
+
+        The artifact is removed on .close() (or when used as a context manager)
+        """
+        tempdir = tempfile.mkdtemp(prefix="spearmint_model_")
+        model_path = os.path.join(tempdir, "model.joblib")
+        joblib.dump(clf, model_path)
+        parallel_model = cls(model_path, n_workers=n_workers, mmap_mode=mmap_mode)
+        parallel_model._tempdir = tempdir
+        return parallel_model
@@ -0,0 +1,160 @@
+from collections import deque
+
+import pandas as pd
+
+
+class RulesClassifier:
+    # predict() natively returns the top n predictions as a DataFrame (see CommonUsageClassifier)
+    predicts_top_n = True
+
+    def __init__(self, rules, case_sensitive=False):
+        """
+        Classifier that labels features (descriptions) by "description contains pattern -> category" rules
+
+        All patterns are compiled into a single Aho-Corasick automaton, so each description is scanned once regardless
+        of how many rules there are (matching cost scales with the length of the description, not the number of
+        rules).  When several rules match, rules with higher priority win.  Ties are broken by the order of rules.
+
+        Args:
+            rules (iterable): Iterable of (pattern, category) or (pattern, category, priority) tuples, where pattern is
+                              a literal substring to look for.  priority defaults to 0
+            case_sensitive (bool): If False, patterns and descriptions are compared case-insensitively
+        """
+        self.case_sensitive = case_sensitive
+
+        rules = [tuple(rule) + (0,) if len(rule) == 2 else tuple(rule) for rule in rules]
+        # Sort rules once, from highest to lowest priority (stable, so ties keep their given order).  After this, a
+        # rule's index is its rank and a lower index always wins
+        self.rules = sorted(rules, key=lambda rule: -rule[2])
+        self._categories = [category for _, category, _ in self.rules]
+
+        self._goto, self._fail, self._outputs = _build_automaton(
+            [self._normalize(pattern) for pattern, _, _ in self.rules]
+        )
+
+    def _normalize(self, text):
+        return text if self.case_sensitive else text.lower()
+
+    def match(self, x):
+        """
+        Returns the sorted ranks (indices into self.rules) of every rule that matches a single feature
+
+        Args:
+            x (str): Feature to match against
+
+        Returns:
+            (list): Sorted list of int rule ranks, best rule first
+        """
+        if not isinstance(x, str):
+            return []
+
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        matched = set()
+        state = 0
+        for char in self._normalize(x):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                matched.update(outputs[state])
+        return sorted(matched)
+
+    def predict_one(self, x, n=1):
+        """
+        Returns the categories of the n best matching rules for a single feature, padded with None
+
+        Categories are returned at most once, at the position of the best rule that maps to them
+        """
+        categories = []
+        for rank in self.match(x):
+            category = self._categories[rank]
+            if category not in categories:
+                categories.append(category)
+                if n is not None and len(categories) == n:
+                    break
+        if n is None:
+            return categories
+        return categories + [None] * (n - len(categories))
+
+    def predict(self, x, n=1):
+        """
+        Returns the categories of the n best matching rules for each element of x
+
+        Each unique element of x is matched only once, and the results are broadcast back to x
+
+        Args:
+            x (iterable): 1D iterable of features (likely descriptions)
+            n (int): Number of categories to return per feature.  If None, return all matching categories (with as
+                     many columns as the feature with the most matches)
+
+        Returns:
+            (pd.DataFrame): DataFrame indexed by x with columns of rank (0 to n-1).  Entries are NaN if there are fewer
+                            than n matching categories
+        """
+        unique_x = pd.unique(pd.Series(x, dtype=object))
+        categories = [self.predict_one(this_x, n=n) for this_x in unique_x]
+        if n is None:
+            n = max((len(c) for c in categories), default=0)
+        predicted = pd.DataFrame(categories,
+                                 index=unique_x,
+                                 columns=range(n),
+                                 dtype=object,
+                                 )
+        return predicted.reindex(x)
+
+    @classmethod
+    def from_csv(cls, csv_file, case_sensitive=False):
+        """
+        Instantiates from a csv file with columns of "Pattern", "Category" and (optionally) "Priority"
+        """
+        df = pd.read_csv(csv_file)
+        if "Priority" not in df:
+            df["Priority"] = 0
+        return cls(df[["Pattern", "Category", "Priority"]].itertuples(index=False, name=None),
+                   case_sensitive=case_sensitive)
+
+
+def _build_automaton(patterns):
+    """
+    Returns the goto, fail, and output tables of an Aho-Corasick automaton for patterns
+
+    Args:
+        patterns (list): List of str patterns
+
+    Returns:
+        goto (list): goto[state] is a {char: next_state} dict
+        fail (list): fail[state] is the state to fall back to when goto[state] has no entry for a char
+        outputs (list): outputs[state] is a tuple of the indices of all patterns that end at this state (including
+                        those reached through fail links)
+    """
+    goto = [{}]
+    outputs = [set()]
+
+    # Build the trie of patterns
+    for i, pattern in enumerate(patterns):
+        if not pattern:
+            raise ValueError(f"Rule {i} has an empty pattern")
+        state = 0
+        for char in pattern:
+            if char not in goto[state]:
+                goto.append({})
+                outputs.append(set())
+                goto[state][char] = len(goto) - 1
+            state = goto[state][char]
+        outputs[state].add(i)
+
+    # Breadth-first to set fail links, where each fail link points to the longest proper suffix that is also in the
+    # trie.  Outputs of that suffix are merged in so matching never has to follow the fail chain to collect outputs
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in goto[state].items():
+            queue.append(next_state)
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(char, 0)
+            outputs[next_state] |= outputs[fail[next_state]]
+
+    return goto, fail, [tuple(o) for o in outputs]
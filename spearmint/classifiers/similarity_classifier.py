@@ -0,0 +1,205 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from spearmint.classifiers.common_usage_classifier import get_most_frequent_as_df
+from spearmint.data.db_session import global_init
+from spearmint.services.transaction import get_transactions_with_category
+
+# Default column names
+FEATURE = "x"
+LABEL = "y"
+
+# Prime just larger than 2**32, used for the universal hashes that simulate permutations for MinHash
+_MINHASH_PRIME = np.uint64(4294967311)
+
+
+class SimilarityClassifier:
+    # predict() natively returns the top n predictions as a DataFrame
+    predicts_top_n = True
+
+    def __init__(self, ngram=3, n_bands=20, rows_per_band=5, min_similarity=0.3, seed=0):
+        """
+        Classifier that suggests the categories of the most similar previously labelled descriptions
+
+        Descriptions are compared by the Jaccard similarity of their character n-grams, estimated with MinHash.  To
+        avoid comparing a query against every known description, signatures are bucketed with locality sensitive
+        hashing (LSH): a query is only compared to descriptions that share at least one band of its signature.  With the
+        default 20 bands of 5 rows, descriptions with similarity 0.7 are found ~97% of the time, those with 0.5 ~47%,
+        and those with 0.3 (eg: sharing only a city name) ~5%, which keeps the number of candidates compared small.
+
+        Args:
+            ngram (int): Length of the character n-grams used as shingles
+            n_bands (int): Number of LSH bands
+            rows_per_band (int): Number of MinHash values per band.  Signatures have n_bands * rows_per_band values
+            min_similarity (float): Neighbours with an estimated similarity below this are ignored
+            seed (int): Seed for the MinHash permutations
+        """
+        self.ngram = ngram
+        self.n_bands = n_bands
+        self.rows_per_band = rows_per_band
+        self.min_similarity = min_similarity
+
+        rng = np.random.RandomState(seed)
+        n_permutations = n_bands * rows_per_band
+        self._a = rng.randint(1, 2 ** 31, size=(n_permutations, 1)).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31, size=(n_permutations, 1)).astype(np.uint64)
+
+        self._descriptions = None
+        self._labels = None
+        self._signatures = None
+        self._buckets = None
+
+    def _shingles(self, x):
+        if not isinstance(x, str):
+            return set()
+        x = " ".join(x.lower().split())
+        if len(x) <= self.ngram:
+            return {x} if x else set()
+        return {x[i:i + self.ngram] for i in range(len(x) - self.ngram + 1)}
+
+    def _signature(self, x):
+        """
+        Returns the MinHash signature of x, or None if x has no shingles
+        """
+        shingles = self._shingles(x)
+        if not shingles:
+            return None
+        # crc32 rather than hash() so signatures are stable between processes (eg: for a model saved with joblib)
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((self._a * hashes + self._b) % _MINHASH_PRIME).min(axis=1)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows_per_band:(i + 1) * self.rows_per_band].tobytes() for i in range(self.n_bands)]
+
+    def fit(self, feature_column, label_column):
+        """
+        Fits the classifier by indexing each unique description under its most common label
+
+        Args:
+            feature_column (iterable): A 1D iterable of the feature to be classified.  Likely strings
+            label_column (iterable): A 1D iterable of the same shape as feature containing the labels for the features
+        """
+        df = pd.DataFrame({FEATURE: feature_column, LABEL: label_column}).dropna()
+        most_common = get_most_frequent_as_df(df, FEATURE, LABEL, n_most_frequent=1)[0]
+
+        descriptions = []
+        labels = []
+        signatures = []
+        for description, label in most_common.items():
+            signature = self._signature(description)
+            if signature is not None:
+                descriptions.append(description)
+                labels.append(label)
+                signatures.append(signature)
+
+        self._descriptions = np.array(descriptions, dtype=object)
+        self._labels = np.array(labels, dtype=object)
+        n_permutations = self.n_bands * self.rows_per_band
+        self._signatures = np.array(signatures, dtype=np.uint64).reshape(-1, n_permutations)
+
+        self._buckets = [{} for _ in range(self.n_bands)]
+        for i, signature in enumerate(self._signatures):
+            for band, key in zip(self._buckets, self._band_keys(signature)):
+                band.setdefault(key, []).append(i)
+
+    def neighbours(self, x):
+        """
+        Returns the indexed descriptions that are similar to x, and their estimated similarity
+
+        Args:
+            x (str): Description to find neighbours for
+
+        Returns:
+            (np.array, np.array): Indices of neighbours (into the fitted descriptions) and their similarities, sorted
+                                  from most to least similar
+        """
+        signature = self._signature(x)
+        if signature is None:
+            return np.array([], dtype=int), np.array([])
+
+        candidates = set()
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(band.get(key, ()))
+        if not candidates:
+            return np.array([], dtype=int), np.array([])
+
+        candidates = np.fromiter(candidates, dtype=int, count=len(candidates))
+        similarities = (self._signatures[candidates] == signature).mean(axis=1)
+
+        keep = similarities >= self.min_similarity
+        candidates, similarities = candidates[keep], similarities[keep]
+        order = np.argsort(-similarities, kind="stable")
+        return candidates[order], similarities[order]
+
+    def predict_one_with_confidence(self, x, n=1):
+        """
+        Returns the n best categories for x and their confidences, each padded with None to length n
+
+        A category's confidence is the similarity of the nearest neighbour labelled with that category.  If n is None,
+        all similar categories are returned (without padding)
+        """
+        categories = []
+        confidences = []
+        for i, similarity in zip(*self.neighbours(x)):
+            if self._labels[i] not in categories:
+                categories.append(self._labels[i])
+                confidences.append(float(similarity))
+                if len(categories) == n:
+                    break
+        if n is None:
+            return categories, confidences
+        padding = [None] * (n - len(categories))
+        return categories + padding, confidences + padding
+
+    def predict_one(self, x, n=1):
+        return self.predict_one_with_confidence(x, n=n)[0]
+
+    def predict_with_confidence(self, x, n=1):
+        """
+        Returns the n best categories for each element of x, and their confidences
+
+        Each unique element of x is looked up only once, and the results are broadcast back to x
+
+        Args:
+            x (iterable): 1D iterable of features (likely descriptions)
+            n (int): Number of categories to return per feature.  If None, return all similar categories (with as
+                     many columns as the feature with the most similar categories)
+
+        Returns:
+            (pd.DataFrame, pd.DataFrame): Categories and confidences, each indexed by x with columns of rank (0 to
+                                          n-1).  Entries are NaN where there are fewer than n similar categories
+        """
+        unique_x = pd.unique(pd.Series(x, dtype=object))
+        results = [self.predict_one_with_confidence(this_x, n=n) for this_x in unique_x]
+        if n is None:
+            n = max((len(r[0]) for r in results), default=0)
+        categories = pd.DataFrame([r[0] for r in results], index=unique_x, columns=range(n), dtype=object)
+        confidences = pd.DataFrame([r[1] for r in results], index=unique_x, columns=range(n), dtype=float)
+        return categories.reindex(x), confidences.reindex(x)
+
+    def predict(self, x, n=1):
+        return self.predict_with_confidence(x, n=n)[0]
+
+    @classmethod
+    def from_db(cls, db_file=None, feature_column='description', label_column='category', **kwargs):
+        """
+        Returns a classifier fitted to the records in db_file
+
+        Args:
+            db_file (str): Path to a database file
+            feature_column (str): Name of the db column to use as a feature
+            label_column (str): Name of the db column to use as a label
+            kwargs: Passed to the constructor
+
+        Returns:
+            Fitted SimilarityClassifier
+        """
+        if db_file:
+            global_init(db_file, echo=False)
+        # Else we assume the db is initialized
+        df = get_transactions_with_category(return_type='df')
+        clf = cls(**kwargs)
+        clf.fit(df[feature_column], df[label_column])
+        return clf
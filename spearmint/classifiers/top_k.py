@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+
+def top_k_from_proba(proba, classes, k=1):
+    """
+    Returns the k most probable classes and their probabilities for each row of a predict_proba matrix
+
+    Uses np.argpartition to find the top k columns of each row in O(n_classes) rather than fully sorting every row, and
+    then sorts only those k columns.
+
+    Ex:
+        top_k_from_proba(np.array([[0.1, 0.7, 0.2],
+                                   [0.5, 0.2, 0.3]]),
+                         classes=np.array(["a", "b", "c"]),
+                         k=2)
+
+    Results in:
+        (array([['b', 'c'],
+                ['a', 'c']]),
+         array([[0.7, 0.2],
+                [0.5, 0.3]]))
+
+    Args:
+        proba (np.array): (n_samples, n_classes) array of class probabilities, such as from sklearn's .predict_proba
+        classes (np.array): (n_classes,) array of class labels for the columns of proba (eg: clf.classes_)
+        k (int): Number of classes to return per row.  If k > n_classes, k=n_classes
+
+    Returns:
+        (np.array, np.array): (n_samples, k) arrays of labels and of their probabilities, each row ordered from most
+                              to least probable
+    """
+    proba = np.asarray(proba)
+    classes = np.asarray(classes)
+    n_classes = proba.shape[1]
+    k = min(k, n_classes)
+
+    if k < n_classes:
+        # Unordered indices of the k largest entries in each row
+        top_k_indices = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+    else:
+        top_k_indices = np.tile(np.arange(n_classes), (proba.shape[0], 1))
+
+    top_k_proba = np.take_along_axis(proba, top_k_indices, axis=1)
+
+    # Order those k entries from most to least probable (stable so ties keep class order)
+    order = np.argsort(-top_k_proba, axis=1, kind="stable")
+    top_k_indices = np.take_along_axis(top_k_indices, order, axis=1)
+    top_k_proba = np.take_along_axis(top_k_proba, order, axis=1)
+
+    return classes[top_k_indices], top_k_proba
+
+
+def predict_top_k(clf, x, k=1):
+    """
+    Returns the top k predictions and confidences from a model with predict_proba and classes_, as DataFrames
+
+    Args:
+        clf: A fitted model with .predict_proba and .classes_ (eg: any sklearn classifier)
+        x (iterable): 1D iterable of features (likely descriptions)
+        k (int): Number of predictions per row
+
+    Returns:
+        (pd.DataFrame, pd.DataFrame): Labels and confidences, each indexed by x with columns of rank (0 to k-1)
+    """
+    labels, confidences = top_k_from_proba(clf.predict_proba(x), clf.classes_, k)
+    index = pd.Index(x)
+    return pd.DataFrame(labels, index=index), pd.DataFrame(confidences, index=index)
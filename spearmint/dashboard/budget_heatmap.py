@@ -1,4 +1,7 @@
 import argparse
+import functools
+
+import numpy as np
 import pandas as pd
 
 import plotly.graph_objects as go
@@ -8,12 +11,14 @@ import dash_html_components as html
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output, State, ALL
 
+from spearmint.dashboard import data_cache
 from spearmint.dashboard.budget_sidebar_list_elements import make_sidebar_ul
 from spearmint.dashboard.budget_sidebar_list_elements import register_sidebar_list_click, get_checked_sidebar_children
 from spearmint.dashboard.utils import get_rounded_z_range_including_mid, make_centered_rg_colorscale, date_shift, \
     invisible_figure, round_date_to_month_begin
 from spearmint.data.db_session import global_init
-from spearmint.data_structures.budget import BudgetCollection
+from spearmint.data_structures.budget import BudgetCollection, FrozenBudgetCollection
+from spearmint.data_structures.spend_cube import SpendCube
 from spearmint.services.budget import get_overall_budget_collection
 from spearmint.services.transaction import get_transactions, get_unique_transaction_categories_as_string
 
@@ -33,8 +38,16 @@ BUDGET_VALUE_COLUMN = "budget"
 DELTA_COLUMN = "delta"
 SUBTOTAL_BUDGET_NAME = "Subtotal"
 
-WORKING_DATA_ID = "working-data"
 RAW_DATA_ID = "raw-data"
+BUDGET_VERSION_ID = "budget-version"
+
+# The SpendCube of the raw data is cached under the raw data's token plus this
+SPEND_CUBE_TOKEN_SUFFIX = "-spend-cube"
+# The heatmap's current data (used by the Subtotal bar chart) is cached under the raw data's token plus this
+WORKING_DATA_TOKEN_SUFFIX = "-working-data"
+
+# Number of per-budget delta rows (one budget over one date range and moving average) to keep cached
+MAX_CACHED_BUDGET_ROWS = 256
 
 SLIDER_TITLE_WIDTHS = {'md': 2, 'sm': 12}
 SLIDER_WIDTHS = {'md': 10, 'sm': 12}
@@ -44,7 +57,19 @@ external_stylesheets = [dbc.themes.BOOTSTRAP]
 
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 
-BUDGET_COLLECTION = get_overall_budget_collection()
+# How often to check whether the budget definition has changed
+BUDGET_RELOAD_INTERVAL_MS = 5000
+
+
+def get_budget_collection():
+    """
+    Returns the current overall budget, picking up any changes to the budget definition file
+
+    This is a cheap check of the file's mtime unless the file has changed.  If the changed file is invalid (eg: it is
+    mid-save), the last good budget is kept.  The budget is frozen, so slices of it (one per heatmap callback) are
+    memoized
+    """
+    return get_overall_budget_collection(frozen=True)
 
 
 # Define a right margin for the heatmap and barchart.  This is to achieve a (implicitly) shared x-axis without having to
@@ -72,110 +97,122 @@ def aggregate_to_budget_deltas(df, datetime_column=DATETIME_COLUMN, category_col
                                delta_column=DELTA_COLUMN,
                                budget_value_column=BUDGET_VALUE_COLUMN, budget=None, moving_average_window=None,
                                start_date=None, end_date=None, work_on_copy=True):
-    if work_on_copy:
-        df = df.copy()
+    """
+    Returns a DataFrame of the monthly actual, budgeted and delta (actual - budget) amounts of each child of budget
 
-    start_date, end_date, date_range = _parse_dates(datetime_column, df, end_date, start_date, moving_average_window)
+    Everything is computed as (budget, month) matrices: actuals by summing a SpendCube's category rows into budgets,
+    budgeted amounts from budget.get_amount_matrix, and deltas by subtracting the two.  Pass a SpendCube (built once
+    per data load) as df so that the transactions are not regrouped on every call.
 
-    # If we have a budget collection with aggregated budgets (multiple categories -> single budget), aggregate
-    if isinstance(budget, BudgetCollection):
-        df[budget_name_column] = budget.aggregate_categories_to_budget(df[category_column], depth='child')
-        budget_names = [b.name for b in budget.get_budgets()]
-    else:
+    Each budget's row is cached (see _get_budget_row), so toggling a budget on only computes that budget's row and the
+    Subtotal is summed from the cached rows
+
+    Args:
+        df (pd.DataFrame, SpendCube): Transactions, or a SpendCube of them
+        datetime_column, category_column, amount_column (str): Column names in df (if df is a DataFrame)
+        budget_name_column, delta_column, budget_value_column (str): Names to use in the returned DataFrame
+        budget (BudgetCollection, FrozenBudgetCollection): Budget whose children are aggregated to
+        moving_average_window (int): If set, amounts and budgets are moving averages over this many months
+        start_date, end_date: Range of months to return.  Default to the range of df
+        work_on_copy (bool): Unused (df is never modified).  Kept for backwards compatibility
+
+    Returns:
+        (pd.DataFrame): Indexed by (budget_name_column, datetime_column) with columns of amount_column,
+                        budget_value_column and delta_column, plus rows for SUBTOTAL_BUDGET_NAME with the sum of the
+                        deltas.  Empty if no transactions are in budget
+    """
+    if not isinstance(budget, (BudgetCollection, FrozenBudgetCollection)):
         raise NotImplementedError("This is not done.  I think we need to catch if dict here and do something.  "
                                   "Not sure about int")
-        df[budget_name_column] = df[category_column]
-        budget_names = pd.unique(df[budget_name_column])
 
-    # Reject anything that doesn't have a mapped budget_name (because we don't care about it!)
-    df = df.dropna(subset=[budget_name_column])
+    if isinstance(df, SpendCube):
+        cube = df
+    else:
+        cube = SpendCube.from_transactions(df, datetime_column=datetime_column, category_column=category_column,
+                                           amount_column=amount_column)
+
+    if start_date is None:
+        start_date = cube.months.min()
+    if end_date is None:
+        end_date = cube.months.max()
+    start_date, end_date, date_range = _parse_dates(datetime_column, None, end_date, start_date, moving_average_window)
+
+    # Frozen budgets are hashable, so their rows can be cached
+    budgets = budget.freeze().get_budgets()
+    budget_names = [b.name for b in budgets]
+    if SUBTOTAL_BUDGET_NAME in budget_names:
+        raise ValueError("Tried to add Subtotal as budget but Subtotal already exists")
+
+    months = tuple(date_range)
+    rows = [_get_budget_row(cube, b, months, moving_average_window) for b in budgets]
 
     # If we have no data here, we haven't selected any categories to plot.  Escape
-    if len(df) == 0:
-        # no data!
-        return df
-
-        # Rearrange df of individual transactions into format needed
-    df_sums = df[[budget_name_column, datetime_column, amount_column]] \
-        .groupby([budget_name_column, pd.Grouper(key=datetime_column, freq='MS')]).sum()
-
-    # Make a regular index with all category/month combinations having values.
-    # Fill anything missing with 0
-    new_index = pd.MultiIndex.from_product((budget_names, date_range), names=[budget_name_column, datetime_column])
-    df_sums = df_sums.reindex(new_index, fill_value=0)
-
-    # Rearrange budget into format needed
-    # TODO: Handle various possible budget input types more rigorously
-    if isinstance(budget, (float, int)):
-        # All budget values are equal and set to the number budget
-        # Build budget such that each month/category has the same budget value, and it covers all values in df_sums
-        df_budget = pd.DataFrame({budget_value_column: [budget] * len(df_sums.index)}, index=df_sums.index)
-        # Alternatively, could make this a {category: _, budget: _} dataframe (no date) and cast to all months using
-        # same code as below
-    elif isinstance(budget, BudgetCollection):
-        name_amount = [(b.name, b.amount) for b in budget.get_budgets()]
-        name, amount = list(zip(*name_amount))
-
-        # Indexed by budget_name
-        df_budget = pd.DataFrame({budget_value_column: amount}, index=name)
-
-        # Reindexed to broadcast across all dates
-        # level sets the index to match to.  Others are broadcast across
-        df_budget = df_budget.reindex(df_sums.index, level=budget_name_column)
-
-    # NOT TESTED(?)
-    # elif isinstance(budget, dict):
-    #     # Build the {cat: budget} dict into a dataframe with index of cat, column of budget
-    #     budget = pd.DataFrame(budget).T
-    #     budget.index.name = category_column
-    #     budget.rename(columns={0: "budget"}, inplace=True)
-    # elif isinstance(budget, pd.Series):
-    #     # Handle case where we have a series
-    #     budget = pd.DataFrame(budget)
-
-    # If we wanted to make everything into the full multi-index before merge, we can reshape it.  But, the merge below
-    # can handle merging a 1d index into a multiindex
-    # if len(budget.index) == 1:
-    #     # Assume we're a budget that has index=category, values=budget values for categories
-    #     # We're missing a time component.  One option is to expand this dataframe to have the time
-    #     # component, then add as an index.  Can do this by:
-    #     # Add column that has a list-like of all dates we want for a given budget category
-    #     budget[datetime_column] = [date_range] * len(budget)
-    #     # Explode the datetime column, which takes the elements from the list and generates new rows for each
-    #     budget = budget.explode(datetime_column)
-    #     # Reform the index to be category/datetime (could also reindex on above index and fill, but we will do that
-    #     # after)
-    #     budget = budget.reset_index().set_index(df_sums.index.names).reindex(df_sums.index, fill_value=0)
-
-    df_sums = pd.merge(df_sums, df_budget[budget_value_column], left_index=True, right_index=True, how='left')
-
-    # For anything that has no budget, fill with 0
-    # TODO: Can we get here now?  Think this might have been before some refactoring, but not now?
-    df_sums.loc[df_sums[budget_value_column].isna(), budget_value_column] = 0.0
+    if sum(n_transactions for _, _, n_transactions in rows) == 0:
+        return pd.DataFrame()
 
-    # Apply moving average, if applicable
-    if moving_average_window:
-        # Do rolling mean for each budget_name, then put this back to original index (dropping the extra level added
-        # by the groupby).  Maybe this could be done with a .transform instead?
-        # If we don't groupby on budget_name, the rolling means bleed between each budget_name (eg, last transaction
-        # of budgetA is averaged with first transaction of budgetB!)
-        df_sums = (df_sums.groupby(level=budget_name_column).
-                   rolling(moving_average_window).
-                   mean().droplevel(0)
-                   )
+    actual = np.concatenate([row[0] for row in rows])
+    budgeted = np.concatenate([row[1] for row in rows])
+    deltas = actual - budgeted
 
-    df_sums[delta_column] = df_sums[amount_column] - df_sums[budget_value_column]
+    index = pd.MultiIndex.from_product((budget_names, date_range), names=[budget_name_column, datetime_column])
+    df_sums = pd.DataFrame({
+        amount_column: actual.ravel(),
+        budget_value_column: budgeted.ravel(),
+        delta_column: deltas.ravel(),
+    }, index=index)
 
     # Add Subtotal "category" to see everything subtotaled
-    if delta_column in df_sums.index.get_level_values(budget_name_column):
-        raise ValueError("Tried to add Subtotal as budget but Subtotal already exists")
-    subtotal = df_sums.groupby(level=datetime_column)[delta_column].sum()
-    subtotal = pd.concat([subtotal], keys=[SUBTOTAL_BUDGET_NAME], names=[BUDGET_NAME_COLUMN])
-    df_sums = pd.concat([df_sums, subtotal.to_frame()])
+    subtotal_index = pd.MultiIndex.from_product(([SUBTOTAL_BUDGET_NAME], date_range),
+                                                names=[budget_name_column, datetime_column])
+    subtotal = pd.DataFrame({delta_column: np.nansum(deltas, axis=0)}, index=subtotal_index)
+    df_sums = pd.concat([df_sums, subtotal])
 
     return df_sums
 
 
+@functools.lru_cache(maxsize=MAX_CACHED_BUDGET_ROWS)
+def _get_budget_row(cube, budget, months, moving_average_window):
+    """
+    Returns (actual, budgeted, n_transactions) for one budget, where actual and budgeted are (1, n_months) np.arrays
+
+    Rows are cached by (cube, budget, months, moving_average_window).  The cube stands in for the data version: reloading
+    the data builds a new SpendCube, so rows of old data are never reused and age out of the cache.  Note the cache
+    holds strong references to its keys, so a replaced SpendCube stays in memory until all of its rows are evicted.
+    The arrays are shared between calls, so they are read-only
+
+    Args:
+        cube (SpendCube): Transactions
+        budget (FrozenBudget, FrozenBudgetCollection): Budget to aggregate to
+        months (tuple): Month starts of the row
+        moving_average_window (int): If set, the row is a moving average over this many months
+
+    Returns:
+        (tuple): (actual, budgeted, number of transactions in budget over all of cube's months)
+    """
+    months = pd.DatetimeIndex(months)
+    # Wrap budget so it is the only child of a collection
+    wrapped = FrozenBudgetCollection(f"{budget.name} (row)", [budget])
+    actual, counts = cube.aggregate_to_budgets(wrapped, depth='child')
+    actual = cube.reindex_months(actual, months)
+    budgeted = wrapped.get_amount_matrix(months, depth='child')
+
+    # Apply moving average, if applicable
+    if moving_average_window:
+        actual = _rolling_mean_by_row(actual, moving_average_window)
+        budgeted = _rolling_mean_by_row(budgeted, moving_average_window)
+
+    actual.flags.writeable = False
+    budgeted.flags.writeable = False
+    return actual, budgeted, int(counts.sum())
+
+
+def _rolling_mean_by_row(matrix, window):
+    """
+    Returns the rolling mean along each row of matrix (NaN until a row has a full window)
+    """
+    return pd.DataFrame(matrix.T).rolling(window).mean().to_numpy().T
+
+
 def budget_heatmap(df, datetime_column=DATETIME_COLUMN, category_column=CATEGORY_COLUMN,
                    amount_column=AMOUNT_COLUMN, budget=None, moving_average_window=None, start_date=None, end_date=None,
                    fig: go.Figure = None, annotations=True, annotation_text_size=8, delta_column=DELTA_COLUMN
@@ -257,16 +294,20 @@ def monthly_bar(df, datetime_column=DATETIME_COLUMN, y_column=AMOUNT_COLUMN, del
     """
     Returns a plotly figure of a bar chart of df[y_column], grouped monthly by df[datetime_column].
 
-    Optionally has a horizontal line at y=budget, a moving average of the monthly data overlaid on the figure, and
-    lineplots overlaid on each bar showing the burn rate per month.
+    Optionally has a line at the budget (a stepped line if the budget changes month to month), a moving average of the
+    monthly data overlaid on the figure, and lineplots overlaid on each bar showing the burn rate per month.
 
     Optionally truncates view of the figure between start_date and end_date, but these only affect the range shown
     on the plot and do not remove data from being used in the moving average.
+
+    budget is either a single monthly amount or a pd.Series of the amount in effect each month (indexed by month start,
+    eg: from Budget.get_amounts), matching the budgets used by the heatmap
     """
     if fig is None:
         fig = go.Figure()
 
     start_date, end_date, date_range = _parse_dates(datetime_column, df, end_date, start_date, moving_average_window)
+    budget_by_month = _budget_by_month(budget, date_range)
 
     # Rearrange data into what we need
     df_monthly = df.groupby(pd.Grouper(key=datetime_column, freq='MS')).sum().reindex(date_range, fill_value=0.0)
@@ -290,8 +331,11 @@ def monthly_bar(df, datetime_column=DATETIME_COLUMN, y_column=AMOUNT_COLUMN, del
 
     # Plot bars monthly
     bar_name = "Monthly"
-    if budget:
-        bar_name += f" (budget = ${budget})"
+    if budget_by_month is not None:
+        if budget_by_month.nunique() == 1:
+            bar_name += f" (budget = ${budget_by_month.iloc[0]})"
+        else:
+            bar_name += " (budget varies by month)"
     fig.add_trace(go.Bar(
         x=df_monthly.index,
         y=df_monthly[y_column],
@@ -302,33 +346,52 @@ def monthly_bar(df, datetime_column=DATETIME_COLUMN, y_column=AMOUNT_COLUMN, del
     # Ensure axes show full range of data, and pad by same amount as other figures
     fig.update_xaxes(range=[start_date - X_AXIS_PAD, end_date], dtick="M1")
 
-    if budget:
+    if budget_by_month is not None and budget_by_month.nunique() == 1:
+        budget_value = budget_by_month.iloc[0]
         fig.add_shape(
             type="line",
             xref="paper",
             x0=0,
             x1=1,
             yref='y',
-            y0=budget,
-            y1=budget,
+            y0=budget_value,
+            y1=budget_value,
             line=dict(
                 dash="dot",
                 width=3,
                 color='cyan',
             ),
-            name=f"Budget ({budget})",
+            name=f"Budget ({budget_value})",
         )
+    elif budget_by_month is not None:
+        # Budget changes over time (see Budget schedule).  Step between months so each bar has its own budget
+        fig.add_trace(go.Scatter(
+            x=budget_by_month.index,
+            y=budget_by_month,
+            line=dict(
+                dash="dot",
+                width=3,
+                color='cyan',
+                shape='hvh',
+            ),
+            mode="lines",
+            name="Budget",
+            hoverinfo="y",
+        ))
 
     if moving_average_window:
         df_ma = (df_monthly[[y_column]]
                  .rolling(moving_average_window)
                  .mean()
                  )
+        if budget_by_month is not None:
+            # Compare to the moving average of the budget, as the heatmap does
+            df_ma[BUDGET_VALUE_COLUMN] = budget_by_month.rolling(moving_average_window).mean()
         df_ma = df_ma.loc[df_ma[y_column].notna()]
 
-        if budget and len(df_ma) > 0:
+        if budget_by_month is not None and len(df_ma) > 0:
             # TODO: This hovertext would make more sense in the bar rather than on just the moving average dot
-            df_ma[delta_column] = df_ma[y_column] - budget
+            df_ma[delta_column] = df_ma[y_column] - df_ma[BUDGET_VALUE_COLUMN]
             df_ma['overunder'] = df_ma.apply(lambda row: "under" if row.loc[delta_column] > 0 else "over", axis=1)
             hovertext = df_ma.apply(
                 lambda row: f"${row.loc[y_column]:.2f} (${abs(row.loc[delta_column]):.2f} {row.loc['overunder']} budget)",
@@ -342,14 +405,17 @@ def monthly_bar(df, datetime_column=DATETIME_COLUMN, y_column=AMOUNT_COLUMN, del
             hoverinfo = "none",
             hovertext = ""
 
-        def set_color(val):
-            if budget is None:
-                return "black"
-            if val > budget:
+        def set_color(delta):
+            if delta > 0:
                 return "green"
             else:
                 return "red"
 
+        if delta_column in df_ma.columns:
+            marker_colors = list(map(set_color, df_ma[delta_column]))
+        else:
+            marker_colors = "black"
+
         fig.add_trace(go.Scatter(
             x=df_ma.index,
             y=df_ma[y_column],
@@ -360,7 +426,7 @@ def monthly_bar(df, datetime_column=DATETIME_COLUMN, y_column=AMOUNT_COLUMN, del
             ),
             marker=dict(
                 size=7,
-                color=list(map(set_color, df_ma[y_column]))
+                color=marker_colors
             ),
             name=f"{moving_average_window} Month Moving Average",
             hoverinfo=hoverinfo,
@@ -384,6 +450,22 @@ def monthly_bar(df, datetime_column=DATETIME_COLUMN, y_column=AMOUNT_COLUMN, del
     return fig
 
 
+def _budget_by_month(budget, months):
+    """
+    Returns budget (a single amount or a pd.Series indexed by month) as a pd.Series over months, or None if there is no
+    budget
+    """
+    if budget is None:
+        return None
+    if isinstance(budget, pd.Series):
+        budget_by_month = budget.reindex(months).astype(float)
+    else:
+        budget_by_month = pd.Series(float(budget), index=months)
+    if budget_by_month.isna().all():
+        return None
+    return budget_by_month
+
+
 def _make_annotations(df_sums, annotation_text_size=8, delta_column=DELTA_COLUMN):
     annotations = []
     for (cat, datetime_), ds in df_sums.iterrows():
@@ -461,11 +543,40 @@ def _date_picker_default_range(df):
     return start_date, end_date
 
 
+def _check_session_token(token):
+    """
+    Raises PreventUpdate if token (which comes from the browser) is not a token this server could have given a session
+    """
+    if not data_cache.is_valid_token(token):
+        raise dash.exceptions.PreventUpdate()
+
+
+def _get_raw_data(token):
+    """
+    Returns the cached transactions DataFrame for token, reloading it from the db if it is no longer cached
+    """
+    return data_cache.get(token, default_factory=lambda: get_transactions('df'))
+
+
+def _get_spend_cube(token):
+    """
+    Returns the cached SpendCube of the transactions for token, building it if it is not cached
+    """
+    return data_cache.get(token + SPEND_CUBE_TOKEN_SUFFIX,
+                          default_factory=lambda: SpendCube.from_transactions(_get_raw_data(token)))
+
+
 def get_app_layout():
+    """
+    Returns the layout for a new session
+
+    Called on every page load (app.layout is this function), so each session gets its own raw data token and reloading
+    data in one session does not change the data of any other
+    """
     df = get_transactions('df')
     start_date, end_date = _date_picker_default_range(df)
 
-    df = df.to_json(orient='table')
+    raw_data_token = data_cache.put(df)
 
     return html.Div(
         children=[
@@ -513,15 +624,19 @@ def get_app_layout():
                 ],
                 fluid=True,
             ),
+            # Data is kept server side in data_cache, and only the token to get it is stored in the browser.  The
+            # session's other cached data (SpendCube, heatmap data) is stored under tokens derived from this one
             html.Div(
-                id=WORKING_DATA_ID,  # JSONified pandas df holding the current data subset (to avoid duplicate work)
+                raw_data_token,
+                id=RAW_DATA_ID,  # Token of the df holding the raw data (to avoid extra db interactions)
                 style={'display': 'none'},
             ),
             html.Div(
-                df,
-                id=RAW_DATA_ID,  # JSONified pandas df holding the raw data (to avoid extra db interactions)
+                get_budget_collection().content_hash,
+                id=BUDGET_VERSION_ID,  # content_hash of the budget the controls were built from
                 style={'display': 'none'},
-            )
+            ),
+            dcc.Interval(id="budget-reload-interval", interval=BUDGET_RELOAD_INTERVAL_MS),
         ]
     )
 
@@ -537,6 +652,7 @@ def get_date_picker(start_date=None, end_date=None):
 
 
 def get_controls(depth, start_date=None, end_date=None, show_categories=True):
+    budget_collection = get_budget_collection()
     return html.Div(
         dbc.Container(
             [
@@ -588,10 +704,10 @@ def get_controls(depth, start_date=None, end_date=None, show_categories=True):
                     ),
                 ]),
                 dbc.Row([
-                    html.Div(make_sidebar_ul(BUDGET_COLLECTION.categories_flat_dict,
+                    html.Div(make_sidebar_ul(budget_collection.categories_flat_dict,
                                              "Overall",
                                              depth=depth,
-                                             budget_collection=BUDGET_COLLECTION,
+                                             budget_collection=budget_collection,
                                              show_categories=show_categories
                                              )),
                 ]),
@@ -657,13 +773,15 @@ def get_show_categories_radio(show_categories=True):
     [
         Input("monthly-hist-depth-slider", "value"),
         Input("show-categories-radio", "value"),
+        Input(BUDGET_VERSION_ID, "children"),
     ],
     [
         State(RAW_DATA_ID, "children")
     ]
 )
-def update_controls(depth, show_categories, raw_data):
-    df = pd.read_json(raw_data, orient='table')
+def update_controls(depth, show_categories, budget_version, raw_data):
+    _check_session_token(raw_data)
+    df = _get_raw_data(raw_data)
     start_date, end_date = _date_picker_default_range(df)
     return get_controls(depth=depth, start_date=start_date, end_date=end_date, show_categories=show_categories)
 
@@ -672,7 +790,6 @@ def update_controls(depth, show_categories, raw_data):
     [
         Output("heatmap-graph-div", "style"),
         Output("heatmap-graph", "figure"),
-        Output(WORKING_DATA_ID, "children"),
     ],
     [
         Input('monthly-hist-date-range', "start_date"),
@@ -688,8 +805,9 @@ def update_controls(depth, show_categories, raw_data):
 def update_heatmap(start_date, end_date, ma, sidebar_ul_children, annotation_text_size, raw_data):
     """
     TODO: Docs
-    -   note that we persis data in WORKING_DATA_ID for the xy plot
+    -   note that we persist the heatmap's data in data_cache (see WORKING_DATA_TOKEN_SUFFIX) for the xy plot
     """
+    _check_session_token(raw_data)
     budgets_to_show = get_checked_sidebar_children(sidebar_ul_children)
 
     div_style = {'display': 'block'}
@@ -702,7 +820,7 @@ def update_heatmap(start_date, end_date, ma, sidebar_ul_children, annotation_tex
         fig = invisible_figure()
 
         # "show" the invisible figure by returning a style {display == block}
-        return div_style, fig, ""
+        return div_style, fig
 
     if annotation_text_size > 0:
         annotations = True
@@ -710,14 +828,11 @@ def update_heatmap(start_date, end_date, ma, sidebar_ul_children, annotation_tex
         annotations = False
 
     # Make a subset of the overall Budget definition for only these children
-    bc_subset = BUDGET_COLLECTION.slice_by_budgets(budgets_to_show)
-
-    df = pd.read_json(raw_data, orient='table')
+    bc_subset = get_budget_collection().slice_by_budgets(budgets_to_show)
 
-    # Aggregate transactions to the budgets we have chosen
-    df = aggregate_to_budget_deltas(df, datetime_column=DATETIME_COLUMN, category_column=CATEGORY_COLUMN,
-                                         amount_column=AMOUNT_COLUMN, budget=bc_subset, moving_average_window=ma, start_date=start_date,
-                                         end_date=end_date, work_on_copy=False)
+    # Aggregate transactions to the budgets we have chosen, using the SpendCube built once per data load
+    df = aggregate_to_budget_deltas(_get_spend_cube(raw_data), budget=bc_subset, moving_average_window=ma,
+                                    start_date=start_date, end_date=end_date)
 
     fig = budget_heatmap(df,
                          datetime_column=DATETIME_COLUMN,
@@ -734,7 +849,9 @@ def update_heatmap(start_date, end_date, ma, sidebar_ul_children, annotation_tex
     # Update layout to match other figures in this column
     fig.update_layout(margin=SHARED_FIGURE_MARGIN)
     fig.update_yaxes(automargin=False)  # Otherwise our figures will be out of alignment
-    return div_style, fig, df.to_json(orient='table')
+    # Replace this session's working data
+    data_cache.put(df, token=raw_data + WORKING_DATA_TOKEN_SUFFIX)
+    return div_style, fig
 
 
 # Sidebar callbacks
@@ -757,11 +874,11 @@ app.callback(
         Input("monthly-hist-ma-slider", "value"),
      ],
     [
-        State(WORKING_DATA_ID, "children"),
         State(RAW_DATA_ID, "children")
     ]
 )
-def update_barchart(clickData, start_date, end_date, moving_average_window, working_data, raw_data):
+def update_barchart(clickData, start_date, end_date, moving_average_window, raw_data):
+    _check_session_token(raw_data)
     div_style = {'display': 'block'}
 
     if not clickData:
@@ -777,18 +894,25 @@ def update_barchart(clickData, start_date, end_date, moving_average_window, work
         budget_amount = None
         plot_burn_rate = False
         # Special case where data is not in DB
-        df = pd.read_json(working_data, orient='table')
+        try:
+            df = data_cache.get(raw_data + WORKING_DATA_TOKEN_SUFFIX)
+        except KeyError:
+            # Working data is gone (eg: server restarted).  It will be remade on the next heatmap update
+            raise dash.exceptions.PreventUpdate()
         df = df.reset_index()
         df[AMOUNT_COLUMN] = df[DELTA_COLUMN]
+        df = df.loc[df[BUDGET_NAME_COLUMN] == budget_name]
     else:
-        budget = BUDGET_COLLECTION.get_budget_by_name(budget_name)
-        budget_amount = budget.amount
+        budget = get_budget_collection().get_budget_by_name(budget_name)
+        # Budget in effect each month shown (following any schedule), as in the heatmap
+        _, _, months = _parse_dates(DATETIME_COLUMN, _get_raw_data(raw_data), end_date, start_date,
+                                    moving_average_window)
+        budget_amount = pd.Series(budget.get_amounts(months), index=months)
         plot_burn_rate = True
-        df = pd.read_json(raw_data, orient="table")
+        # Raw data is shared through the cache, so slice rather than adding columns to it
+        df = _get_raw_data(raw_data)
         # Filter down to only the budget_name we care about, aggregating categories to a budget if needed
-        df[BUDGET_NAME_COLUMN] = budget.aggregate_categories_to_budget(df[CATEGORY_COLUMN], depth='this')
-
-    df = df.loc[df[BUDGET_NAME_COLUMN] == budget_name]
+        df = df.loc[budget.aggregate_categories_to_budget_codes(df[CATEGORY_COLUMN], depth='this') == budget_name]
 
     fig = monthly_bar(df,
                       datetime_column=DATETIME_COLUMN,
@@ -827,14 +951,40 @@ def update_barchart(clickData, start_date, end_date, moving_average_window, work
     Output(RAW_DATA_ID, "children"),
     [
         Input("reload-button", "n_clicks")
+    ],
+    [
+        State(RAW_DATA_ID, "children"),
     ]
 )
-def reload_data(nclicks):
+def reload_data(nclicks, raw_data):
     if nclicks == 0:
         raise dash.exceptions.PreventUpdate()
+    _check_session_token(raw_data)
+
+    # Replace this session's cached data (and its SpendCube) under the same token
+    df = get_transactions("df")
+    data_cache.put(SpendCube.from_transactions(df), token=raw_data + SPEND_CUBE_TOKEN_SUFFIX)
+    return data_cache.put(df, token=raw_data)
+
 
-    raw_data = get_transactions("df").to_json(orient="table")
-    return raw_data
+@app.callback(
+    Output(BUDGET_VERSION_ID, "children"),
+    [
+        Input("budget-reload-interval", "n_intervals")
+    ],
+    [
+        State(BUDGET_VERSION_ID, "children")
+    ]
+)
+def reload_budget(n_intervals, budget_version):
+    """
+    Updates the budget version if the budget definition has changed, which rebuilds the controls (and through them the
+    figures) from the new budget.  Transaction data is not reloaded
+    """
+    new_version = get_budget_collection().content_hash
+    if new_version == budget_version:
+        raise dash.exceptions.PreventUpdate()
+    return new_version
 
 
 def parse_args():
@@ -851,5 +1001,6 @@ if __name__ == '__main__':
     args = parse_args()
     global_init(args.db, echo=False)
 
-    app.layout = get_app_layout()
+    # A function, so that the layout (and its data token) is made per session
+    app.layout = get_app_layout
     app.run_server(debug=True, port=8051)
@@ -0,0 +1,88 @@
+"""
+Process-local cache of server-side data for the dashboards
+
+Rather than serializing DataFrames into hidden divs (sending them to the browser and parsing them back on every
+callback), dashboards put() the data here and store only the returned token in the browser.  Callbacks then get() the
+data by token, which is a dict lookup.
+
+Cached objects are shared between callbacks, so callbacks must not modify them in place (copy first if needed).
+
+The cache is in memory of the dashboard's server process, so it does not survive a restart and is not shared between
+worker processes.  Callers should handle missing tokens (see get's default_factory)
+
+Tokens that come back from the browser are client input.  Check them with is_valid_token before use, and only put()
+under tokens the server made (or derived from them), never under a token chosen by the client
+"""
+from collections import OrderedDict
+import re
+import threading
+import uuid
+
+# Number of objects to keep.  Older objects are evicted first (least recently used)
+MAX_ENTRIES = 32
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def put(obj, token=None):
+    """
+    Stores obj in the cache, returning the (str) token to get it back with
+
+    Args:
+        obj: Object to cache
+        token (str): Optional token to store obj under (replacing anything already there).  If None, a new token is made
+
+    Returns:
+        (str) token
+    """
+    if token is None:
+        token = uuid.uuid4().hex
+    with _lock:
+        _cache[token] = obj
+        _cache.move_to_end(token)
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return token
+
+
+def is_valid_token(token):
+    """
+    Returns True if token has the form of a token made by put (a random hex string)
+
+    Tokens made by put are unguessable, so a client can only know the tokens it was given.  Derived tokens (eg: a token
+    plus a suffix) are not valid, so clients cannot address them directly
+    """
+    return isinstance(token, str) and re.fullmatch(r"[0-9a-f]{32}", token) is not None
+
+
+def get(token, default_factory=None):
+    """
+    Returns the object stored under token
+
+    Args:
+        token (str): Token returned by put
+        default_factory (callable): If set and token is not in the cache (eg: it was evicted, or the server restarted),
+                                    the result of default_factory() is cached under token and returned.  If not set,
+                                    a missing token raises KeyError
+
+    Returns:
+        Cached object
+    """
+    with _lock:
+        if token in _cache:
+            _cache.move_to_end(token)
+            return _cache[token]
+    if default_factory is None:
+        raise KeyError(f"No cached data for token '{token}'")
+    obj = default_factory()
+    put(obj, token=token)
+    return obj
+
+
+def clear():
+    """
+    Removes everything from the cache
+    """
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,171 @@
+import argparse
+
+import plotly.graph_objects as go
+import dash
+import dash_core_components as dcc
+import dash_html_components as html
+import dash_bootstrap_components as dbc
+from dash.dependencies import Input, Output, State
+
+from spearmint.dashboard import data_cache
+from spearmint.data.db_session import global_init
+from spearmint.data_structures.spend_cube import SpendCube
+from spearmint.services.budget import get_overall_budget_collection
+from spearmint.services.budget_scenarios import compare_scenarios, load_scenarios, subtotals_to_dataframe, \
+    summarize_scenarios
+from spearmint.services.transaction import get_transactions
+
+DATETIME_COLUMN = "datetime"
+RAW_DATA_ID = "raw-data"
+
+# The SpendCube of the raw data is cached under the raw data's token plus this
+SPEND_CUBE_TOKEN_SUFFIX = "-spend-cube"
+
+# Set from the command line
+SCENARIO_FILE = None
+
+external_stylesheets = [dbc.themes.BOOTSTRAP]
+
+app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
+
+
+def scenario_figure(results, cumulative=False):
+    """
+    Returns a plotly figure with a line for each scenario's monthly (or cumulative) subtotal of actual - budgeted
+    """
+    df = subtotals_to_dataframe(results)
+    if cumulative:
+        df = df.cumsum()
+
+    fig = go.Figure()
+    for scenario in df.columns:
+        fig.add_trace(go.Scatter(x=df.index, y=df[scenario], mode="lines+markers", name=scenario))
+    fig.add_hline(y=0, line_dash="dash", line_color="grey")
+    fig.update_layout(
+        yaxis_title="Cumulative Actual - Budget" if cumulative else "Actual - Budget",
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        plot_bgcolor='rgba(0, 0, 0, 0)',
+    )
+    return fig
+
+
+def get_app_layout():
+    """
+    Returns the layout for a new session (app.layout is this function, so each session gets its own data token)
+    """
+    df = get_transactions('df')
+    start_date = df[DATETIME_COLUMN].min()
+    end_date = df[DATETIME_COLUMN].max()
+
+    return dbc.Container(
+        [
+            dbc.Row([
+                dbc.Col(
+                    [
+                        html.Button("Reload Scenarios", id="reload-scenarios-button"),
+                        dcc.DatePickerRange(
+                            id="scenario-date-range",
+                            start_date=start_date,
+                            end_date=end_date,
+                            display_format="YYYY-MMM-DD",
+                        ),
+                        dcc.RadioItems(
+                            id="scenario-depth-radio",
+                            options=[{"label": "Top level budgets", "value": "child"},
+                                     {"label": "Leaf budgets", "value": "leaf"}],
+                            value="child",
+                        ),
+                        dcc.Checklist(
+                            id="scenario-cumulative-checklist",
+                            options=[{"label": "Cumulative", "value": "cumulative"}],
+                            value=[],
+                        ),
+                    ],
+                    lg=3, md=4, xs=6,
+                ),
+                dbc.Col(
+                    [
+                        dcc.Graph(id="scenario-graph", style={'height': '55vh'}),
+                        html.Div(id="scenario-summary"),
+                    ],
+                    lg=9, md=8, xs=6,
+                ),
+            ]),
+            html.Div(
+                data_cache.put(df),
+                id=RAW_DATA_ID,  # Token of the df (in data_cache) holding the raw data (to avoid extra db interactions)
+                style={'display': 'none'},
+            ),
+        ],
+        fluid=True,
+    )
+
+
+@app.callback(
+    [
+        Output("scenario-graph", "figure"),
+        Output("scenario-summary", "children"),
+    ],
+    [
+        Input("reload-scenarios-button", "n_clicks"),
+        Input("scenario-date-range", "start_date"),
+        Input("scenario-date-range", "end_date"),
+        Input("scenario-depth-radio", "value"),
+        Input("scenario-cumulative-checklist", "value"),
+    ],
+    [
+        State(RAW_DATA_ID, "children"),
+    ]
+)
+def update_scenarios(n_clicks, start_date, end_date, depth, cumulative, raw_data):
+    """
+    Evaluates all scenarios (re-reading the scenario file and picking up any budget changes) against the stored
+    transactions
+    """
+    if not data_cache.is_valid_token(raw_data):
+        raise dash.exceptions.PreventUpdate()
+    cube = _get_spend_cube(raw_data)
+    results = compare_scenarios(cube, load_scenarios(SCENARIO_FILE),
+                                budget=get_overall_budget_collection(frozen=True),
+                                start_date=start_date, end_date=end_date, depth=depth)
+
+    fig = scenario_figure(results, cumulative="cumulative" in cumulative)
+    summary = summarize_scenarios(results).round(2).reset_index()
+    table = dbc.Table.from_dataframe(summary, striped=True, bordered=True, hover=True, size="sm")
+    return fig, table
+
+
+def _get_spend_cube(token):
+    """
+    Returns the cached SpendCube of the transactions for token, building it (reloading the transactions from the db
+    if they are no longer cached) if it is not cached
+    """
+    return data_cache.get(
+        token + SPEND_CUBE_TOKEN_SUFFIX,
+        default_factory=lambda: SpendCube.from_transactions(
+            data_cache.get(token, default_factory=lambda: get_transactions('df'))
+        ),
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "db",
+        help="Path to transactions database",
+    )
+    parser.add_argument(
+        "scenarios",
+        help="Path to a json scenario file (see services.budget_scenarios)",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    global_init(args.db, echo=False)
+    SCENARIO_FILE = args.scenarios
+
+    app.layout = get_app_layout
+    app.run_server(debug=True, port=8052)
@@ -17,7 +17,7 @@ from spearmint.data.db_session import global_init, create_session
 from spearmint.data.transaction import Transaction
 from spearmint.services.budget import get_expense_budget_collection, get_income_budget_collection, \
     get_excluded_budget_collection, get_unbudgeted_categories
-from spearmint.services.category import get_category_by_id
+from spearmint.services.category import get_category_by_id, get_suggested_categories_by_transaction
 from spearmint.services.transaction import get_transactions, get_transactions_by_id, \
     get_unique_transaction_categories_as_string
 
@@ -89,7 +89,7 @@ def flatten(lst):
 
 SUGGESTED_COLUMN_SPECS = [
     {'name': f'{SUGGESTED_CATEGORY_PREFIX} most_common', 'scheme': 'most_common', 'n': 2, 'order_by': None},
-    {'name': f'{SUGGESTED_CATEGORY_PREFIX} rf', 'scheme': 'rf', 'n': 1, 'order_by': None},
+    {'name': f'{SUGGESTED_CATEGORY_PREFIX} rf', 'scheme': 'rf', 'n': 1, 'order_by': 'confidence'},
     {'name': f'{SUGGESTED_CATEGORY_PREFIX} from_file', 'scheme': 'from_file', 'n': 1, 'order_by': None},
     # {'name': f'{SUGGESTED_CATEGORY_PREFIX} clf', 'scheme': 'clf', 'n': 1, 'order_by': None},
 ]
@@ -136,7 +136,8 @@ def load_data(suggested_columns=tuple()):
                                     {scheme: category scheme,
                                      n: maximum number of suggestions to include for this scheme,
                                      order_by: How to order suggestions from a scheme.  'confidence' will order in
-                                               descending confidence value.  None will be in order on transaction obj,
+                                               descending confidence value and 'rank' in ascending rank (both ordered
+                                               by the db).  None will be in order on transaction obj,
                                     }
 
     Returns:
@@ -145,6 +146,10 @@ def load_data(suggested_columns=tuple()):
     # df = get_all_transactions('df')
     trxs = get_transactions()
 
+    # Any ordered suggestions are fetched already ordered from the db, once per scheme
+    ordered_suggestions = {spec['scheme']: get_suggested_categories_by_transaction(spec['scheme'], spec['order_by'])
+                           for spec in suggested_columns if spec['order_by'] is not None}
+
     def trx_to_dict(trx: Transaction):
         # TODO: Sync these with globals above for shown columns.  Or, just always populate everything
         d = {k: getattr(trx, k) for k in ['id', 'datetime', 'amount', 'description', 'account_name']}
@@ -157,24 +162,17 @@ def load_data(suggested_columns=tuple()):
         for suggested_spec in suggested_columns:
             scheme = suggested_spec['scheme']
 
-            # Get suggestions within this scheme
-            categories_suggested = [category for category in trx.categories_suggested if category.scheme == scheme]
-
+            # Get suggestions within this scheme (trx.categories_suggested is already in order of scheme and rank)
             if suggested_spec['order_by'] is None:
-                pass
-            elif suggested_spec['order_by'] == 'confidence':
-                raise NotImplementedError("SORT BY CONFIDENCE!")
-
-            suggested_names = get_suggested_column_names(suggested_spec)
-            suggested_names_with_id = get_suggested_column_names(suggested_spec, CATEGORY_ID_SUFFIX)
+                categories_suggested = [category for category in trx.categories_suggested if category.scheme == scheme]
+            else:
+                categories_suggested = ordered_suggestions[scheme].get(trx.id, [])
 
-            for i, (name, name_with_id) in enumerate(zip(suggested_names, suggested_names_with_id)):
+            for i, name in enumerate(get_suggested_column_names(suggested_spec)):
                 try:
                     d[name] = categories_suggested[i].category
-                    d[name_with_id] = categories_suggested[i].id
                 except IndexError:
                     d[name] = None
-                    d[name_with_id] = None
 
         return d
 
@@ -335,17 +333,17 @@ def get_app_layout(db_file):
                 html.H2("Income Categories:"),
                 html.Ul(
                     id="income-categories-list",
-                    children=categories_to_children_string(get_income_budget_collection().categories),
+                    children=categories_to_children_string(get_income_budget_collection(frozen=True).categories),
                 ),
                 html.H2("Expense Categories:"),
                 html.Ul(
                     id="expense-categories-list",
-                    children=categories_to_children_string(get_expense_budget_collection().categories),
+                    children=categories_to_children_string(get_expense_budget_collection(frozen=True).categories),
                 ),
                 html.H2("Excluded Categories:"),
                 html.Ul(
                     id="excluded-categories-list",
-                    children=categories_to_children_string(get_excluded_budget_collection().categories),
+                    children=categories_to_children_string(get_excluded_budget_collection(frozen=True).categories),
                 ),
                 html.H2("Unbudgeted Categories:"),
                 html.Ul(
@@ -481,11 +479,11 @@ def _save_changes_to_db(data):
             trx.category = None
             # trx.category_id = None  # This should be redundant
         elif c[CATEGORY_ID] is None:
-            # Manually entered - create new Category and attach
-            category = Category(scheme=ACCEPTED_CATEGORY, category=c[CATEGORY])
+            # Manually entered or accepted from a suggestion - create new Category and attach
+            category = Category(scheme=ACCEPTED_CATEGORY, category=c[CATEGORY], transaction_id=trx.id)
             trx.category = category
         else:
-            # Accepted a suggestion.  Reuse this category by attaching to .category.
+            # Reattached an existing category.  Reuse this category by attaching to .category.
             category = get_category_by_id(id=c[CATEGORY_ID])
             trx.category = category
     # To commit these objects, which came from a different session that I no longer have, merge them into a new
@@ -595,7 +593,6 @@ def accept_category_on_click_via_active_cell(active_cell, rows, columns_to_watch
         this_row = _get_active_row(active_cell, rows)
 
         source_column = active_cell['column_id']
-        source_id_column = active_cell['column_id'] + CATEGORY_ID_SUFFIX
 
         # If cell is empty, ignore (we only overwrite if there is content to overwrite with)
         if not this_row[source_column]:
@@ -605,14 +602,14 @@ def accept_category_on_click_via_active_cell(active_cell, rows, columns_to_watch
         target_id_column = CATEGORY_ID
 
         # Check if destination already has this content
-        if this_row[target_column] == this_row[source_column] or \
-           this_row[target_id_column] == this_row[source_id_column]:
+        if this_row[target_column] == this_row[source_column]:
             return None
         else:
             # Make a deep copy of rows so we can later compare data to data_previous
             rows_previous = copy.deepcopy(rows)
             this_row[target_column] = this_row[source_column]
-            this_row[target_id_column] = this_row[source_id_column]
+            # Suggestions are not categories themselves, so accepting one makes a new accepted category on save
+            this_row[target_id_column] = None
             return rows, rows_previous, True
 
     # No edits
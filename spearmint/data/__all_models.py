@@ -3,3 +3,6 @@ import spearmint.data.transaction
 
 # noinspection PyUnresolvedReferences
 import spearmint.data.category
+
+# noinspection PyUnresolvedReferences
+import spearmint.data.suggested_category
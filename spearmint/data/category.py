@@ -1,5 +1,5 @@
 import sqlalchemy as sa
-from sqlalchemy import Column, DateTime, String, Float, ForeignKey
+from sqlalchemy import Column, DateTime, String, Float
 import datetime as datetime_package
 
 from spearmint.data.modelbase import SqlAlchemyBase
@@ -7,6 +7,7 @@ from spearmint.data.big_integer_type import BigIntegerType
 
 
 class Category(SqlAlchemyBase):
+    # Accepted categories (see Transaction.category).  Suggestions are stored separately as SuggestedCategory
     __tablename__ = "category"
 
     id: int = Column(BigIntegerType, primary_key=True, autoincrement=True)
@@ -16,7 +17,10 @@ class Category(SqlAlchemyBase):
     confidence: float = Column(Float)
     category: str = Column(String, nullable=False)  # Should be index to category table
 
-    transaction_id = Column(BigIntegerType, ForeignKey("transaction.id"))
+    # Transaction this category was created for, if any.  Deliberately not a foreign key or relationship: the
+    # transaction refers to its accepted category through Transaction.category_id, and a foreign key back would make
+    # the two tables circularly dependent again
+    transaction_id = Column(BigIntegerType)
 
     def __repr__(self):
         return f"id={self.id}; category={self.category}; scheme={self.scheme}; confidence={self.confidence}"
@@ -33,15 +33,92 @@ def global_init(db_path: str = "", echo: bool = True):
 
     engine = sa.create_engine(conn_str, echo=echo)
 
-    __factory = sa.orm.sessionmaker(bind=engine)
-
     # Inform sa about our models
     import spearmint.data.__all_models
 
+    # dbs made before suggestions had their own table need their suggestions moved once the table is created
+    needs_suggestion_migration = _has_table(engine, "category") and not _has_table(engine, "suggested_category")
+
     SqlAlchemyBase.metadata.create_all(engine)
+    _add_missing_columns_and_indexes(engine)
+    if needs_suggestion_migration:
+        _migrate_suggested_categories(engine)
+
+    # Only set once the db is usable, so a failed migration does not leave a half initialized factory behind
+    __factory = sa.orm.sessionmaker(bind=engine)
     print("DB global_init complete")
 
 
+def _add_missing_columns_and_indexes(engine):
+    """
+    Brings tables in an existing db up to date with the models by adding any missing columns and indexes
+
+    create_all only creates tables that do not exist yet, so without this a db made by an older version of the models
+    would be missing anything added since.  Each change is printed.  Columns can only be added if existing rows have a
+    value for them (they are nullable or have a server default), otherwise a RuntimeError is raised before anything is
+    changed
+    """
+    inspector = sa.inspect(engine)
+    missing_columns = []
+    missing_indexes = []
+    for table in SqlAlchemyBase.metadata.tables.values():
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        missing_columns.extend((table, c) for c in table.columns if c.name not in existing_columns)
+
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        missing_indexes.extend(i for i in table.indexes if i.name not in existing_indexes)
+
+    cannot_add = [f"{table.name}.{column.name}" for table, column in missing_columns
+                  if not column.nullable and column.server_default is None]
+    if cannot_add:
+        raise RuntimeError(f"Cannot add non-nullable columns without a server default to the existing db: "
+                           f"{cannot_add}.  Migrate the db by hand (or give the columns a server_default)")
+
+    for table, column in missing_columns:
+        column_spec = sa.schema.CreateColumn(column).compile(dialect=engine.dialect)
+        print(f"Migrating db: adding column {table.name}.{column.name}")
+        engine.execute(f'ALTER TABLE "{table.name}" ADD COLUMN {column_spec}')
+
+    for index in missing_indexes:
+        print(f"Migrating db: adding index {index.name} on {index.table.name}")
+        index.create(engine)
+
+
+def _has_table(engine, table_name):
+    return table_name in sa.inspect(engine).get_table_names()
+
+
+def _migrate_suggested_categories(engine):
+    """
+    Moves suggested categories out of the category table and into the suggested_category table
+
+    Before suggested_category existed, suggestions were category rows with a transaction_id.  Each of these is copied
+    to suggested_category, with ranks (0, 1, ...) assigned within each (transaction, scheme) by their old rank (if the
+    db has one), then descending confidence, then insertion order.  Rows that are only suggestions (not also some
+    transaction's accepted category) are then removed from category.  Done in a single db transaction.
+    """
+    category_columns = {c["name"] for c in sa.inspect(engine).get_columns("category")}
+    order_by = "confidence DESC, id"
+    if "rank" in category_columns:
+        order_by = "rank IS NULL, rank, " + order_by
+
+    with engine.begin() as conn:
+        n_moved = conn.execute(
+            'INSERT INTO suggested_category (transaction_id, scheme, rank, category, confidence, datetime) '
+            'SELECT transaction_id, scheme, '
+            f'ROW_NUMBER() OVER (PARTITION BY transaction_id, scheme ORDER BY {order_by}) - 1, '
+            'category, confidence, datetime '
+            'FROM category WHERE transaction_id IS NOT NULL'
+        ).rowcount
+        conn.execute(
+            'DELETE FROM category WHERE transaction_id IS NOT NULL '
+            'AND NOT EXISTS (SELECT 1 FROM "transaction" WHERE "transaction".category_id = category.id)'
+        )
+        # Index from when suggestions were in the category table
+        conn.execute('DROP INDEX IF EXISTS ix_category_scheme_transaction_confidence')
+    print(f"Moved {n_moved} suggested categories to the suggested_category table")
+
+
 def global_forget():
     """
     Forgets global initialization
@@ -0,0 +1,31 @@
+import sqlalchemy as sa
+from sqlalchemy import Column, DateTime, String, Float, ForeignKey, Integer, Index
+import datetime as datetime_package
+
+from spearmint.data.modelbase import SqlAlchemyBase
+from spearmint.data.big_integer_type import BigIntegerType
+
+
+class SuggestedCategory(SqlAlchemyBase):
+    __tablename__ = "suggested_category"
+    # Keyed (and, without a rowid, physically stored) by (transaction_id, scheme, rank), so all suggestions for a
+    # transaction are one contiguous range of the table
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    transaction_id: int = Column(BigIntegerType, ForeignKey("transaction.id"), primary_key=True)
+    scheme: str = Column(String, primary_key=True)
+    rank: int = Column(Integer, primary_key=True, autoincrement=False)  # 0 is the top suggestion in a scheme
+    category: str = Column(String, nullable=False)  # Should be index to category table
+    confidence: float = Column(Float)
+    # raises when I typeset datetime to datetime.datetime.  Not sure why
+    datetime: datetime_package.datetime = Column(DateTime)
+
+    def __repr__(self):
+        return f"transaction_id={self.transaction_id}; scheme={self.scheme}; rank={self.rank}; " \
+               f"category={self.category}; confidence={self.confidence}"
+
+
+# Covers fetching a scheme's suggestions grouped by transaction and ordered by descending confidence without a sort step,
+# and scheme-wide deletes
+Index("ix_suggested_category_scheme_transaction_confidence",
+      SuggestedCategory.scheme, SuggestedCategory.transaction_id, SuggestedCategory.confidence.desc())
@@ -20,33 +20,23 @@ class Transaction(SqlAlchemyBase):
 
     # Sets a uni-directional relation.  We will know a single (uselist=False) accepted category, accessible as an object
     # in python via .category, but that Category won't know we are using it.
-    category_id: int = Column(BigIntegerType, ForeignKey("category.id"))
+    # Indexed for joining categories to the transactions that accepted them
+    category_id: int = Column(BigIntegerType, ForeignKey("category.id"), index=True)
     category = relationship("Category",
                             uselist=False,  # one-to-one
                             foreign_keys=[category_id]
                             )
 
-    # Sets a bi-directional relation.  suggested_categories here will have category objects, while each label object will
-    # record which transaction they're a suggestion for by having a .transaction_id.  Because Transaction has two
-    # uses of the Transaction foreign key, we need to set the primaryjoin arg explicitly (primaryjoin is implicitly
-    # set by sqlalchemy when it is not ambiguous)
-    # Because a Transaction points to a Category and that same Category points to the same Transaction, we cannot add them
-    # using only two INSERT statements (to add one requires the other to already exist and have its primary key).
-    # To get around this, use the method from
-    #   https://docs.sqlalchemy.org/en/13/orm/relationship_persistence.html#post-update,
-    # as referenced in
-    #   https://stackoverflow.com/questions/18284464/sqlalchemy-exc-circulardependencyerror-circular-dependency-detected
-    # We set post_update=True, which tells sqlalchemy to INSERT both with empty references, then do an UPDATE to
-    # populate the references.  THey also mention this is prefereably done from the many side of a many to one relation,
-    # so I think they'd prefer the relationship was defined from the category side?  Can redo later...
-    categories_suggested_id: int = Column(BigIntegerType, ForeignKey("category.id"))
-    categories_suggested: list = relationship("Category",
-                                              backref="transaction",  # this trx is acccessible via label.transaction attr
-                                              primaryjoin="Transaction.id==Category.transaction_id",  # unambiguous relation
-                                              post_update=True,  # Because circular reference
+    # Sets a bi-directional relation to this transaction's suggested categories (each suggestion records which
+    # transaction it is for by its .transaction_id, and is accessible back via suggestion.transaction).  Suggestions
+    # live in their own table, so unlike the accepted category there is no circular reference between the tables and
+    # both can be inserted without an extra UPDATE.  Ordered by scheme and then rank
+    categories_suggested: list = relationship("SuggestedCategory",
+                                              backref="transaction",
+                                              order_by="(SuggestedCategory.scheme, SuggestedCategory.rank)",
+                                              cascade="all, delete-orphan",
                                               )
 
-
     def __repr__(self):
         try:
             category = self.category.category
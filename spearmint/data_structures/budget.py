@@ -1,12 +1,142 @@
+from types import MappingProxyType
 from typing import Union, Tuple, List
+import functools
+import hashlib
+import json
+import weakref
+
 import numpy as np
+import pandas as pd
 
 
 DEFAULT_BUDGET_COLLECTION_NAME = "Unnamed Budget"
 
+# Number of date ranges to cache amount matrices for (per BudgetCollection)
+_MAX_CACHED_AMOUNT_MATRICES = 32
+
 # FUTURE: Put an ABC above Budget and BudgetCollection to enforce the commonalities in API?
 
 
+def _parse_schedule(schedule, to_monthly=None):
+    """
+    Returns a schedule of budget amount changes as a tuple of (pd.Timestamp, monthly amount), sorted by date
+
+    to_monthly is an optional function converting each amount to a monthly amount
+    """
+    if not schedule:
+        return tuple()
+    if to_monthly is None:
+        to_monthly = lambda x: x
+    schedule = [(pd.Timestamp(date), to_monthly(amount)) for date, amount in schedule]
+    return tuple(sorted(schedule, key=lambda change: change[0]))
+
+
+def _scheduled_amounts(amount, schedule, months):
+    """
+    Returns a np.array of the amount in effect in each of months, given a base amount and schedule of changes
+    """
+    months = pd.DatetimeIndex(months)
+    if not schedule:
+        return np.full(len(months), amount, dtype=float)
+    dates = pd.DatetimeIndex([date for date, _ in schedule])
+    amounts = np.array([amount] + [change for _, change in schedule], dtype=float)
+    # Number of changes that are in effect by each month = index into amounts
+    return amounts[dates.searchsorted(months, side="right")]
+
+
+def _encode_category_to_budget(category_to_budget):
+    """
+    Returns a precomputed categorical encoding of a {category: budget_name} dict
+
+    Returns:
+        (tuple): (pd.Index of categories, np.array of the budget code of each category, pd.Index of budget names in
+                 order of first appearance)
+    """
+    category_index = pd.Index(list(category_to_budget.keys()), dtype=object)
+    budget_codes, budget_names = pd.factorize(pd.Series(list(category_to_budget.values()), dtype=object))
+    return category_index, budget_codes.astype(np.int64), pd.Index(budget_names, dtype=object)
+
+
+def _categories_to_budget_codes(categories, encoding):
+    """
+    Returns a pd.Categorical of the budget each element of categories is in (NaN, code -1, if in none), as array ops
+
+    If categories is already categorical, only its (unique) categories are looked up
+    """
+    category_index, budget_codes, budget_names = encoding
+    # Append a "missing" code so get_indexer's -1 (not found) takes it without a separate mask
+    budget_codes = np.append(budget_codes, -1)
+
+    if isinstance(categories, pd.Series):
+        categories = categories.array
+    if isinstance(categories, pd.Categorical):
+        category_codes = budget_codes[category_index.get_indexer(categories.categories)]
+        codes = np.append(category_codes, -1)[categories.codes]
+    else:
+        codes = budget_codes[category_index.get_indexer(np.asarray(categories, dtype=object))]
+    return pd.Categorical.from_codes(codes, categories=budget_names)
+
+
+def _get_names_below(b):
+    """
+    Returns a set of b's name, its categories, and (for a BudgetCollection) every budget name below it
+    """
+    if isinstance(b, BudgetCollection):
+        names = set(b._get_known_names())
+    else:
+        names = set(b.categories)
+    names.add(b.name)
+    return names
+
+
+def _compile_index(bc):
+    """
+    Returns a dict of lookups for a (Frozen)BudgetCollection, built in one pass over its children and reusing the
+    compiled index of any child collection
+    """
+    categories = []
+    flat_dict = {bc.name: [b.name for b in bc.get_budgets()]}
+    leaves = []
+    # Preorder (each child, then its descendants, before the next child) so the first match is the same one a
+    # depth-first search would find
+    name_to_budget = {}
+    child_category_to_budget = {}
+    leaf_category_to_budget = {}
+
+    for b in bc.get_budgets():
+        name_to_budget.setdefault(b.name, b)
+        categories.extend(b.categories)
+        child_category_to_budget.update(b.category_to_budget)
+        if isinstance(b, (BudgetCollection, FrozenBudgetCollection)):
+            child_index = b._get_index()
+            flat_dict.update(child_index["flat_dict"])
+            leaves.extend(child_index["leaves"])
+            for name, budget in child_index["name_to_budget"].items():
+                name_to_budget.setdefault(name, budget)
+            leaf_category_to_budget.update(child_index["category_to_budget"]["leaf"])
+        else:
+            leaves.append(b)
+            leaf_category_to_budget.update(b.category_to_budget)
+
+    return {
+        "categories": categories,
+        "flat_dict": flat_dict,
+        "leaves": leaves,
+        "name_to_budget": name_to_budget,
+        "category_to_budget": {
+            "this": {c: bc.name for c in categories},
+            "child": child_category_to_budget,
+            "leaf": leaf_category_to_budget,
+        },
+        # {depth: [names]}, filled in by get_budget_names as depths are requested
+        "budget_names": {},
+        # {depth: encoding}, filled in by aggregate_categories_to_budget_codes as depths are requested
+        "budget_encodings": {},
+        # {(depth, months): matrix}, filled in by get_amount_matrix as date ranges are requested
+        "amount_matrices": {},
+    }
+
+
 class BudgetCollection:
     """
     Collection of Budget objects
@@ -14,10 +144,94 @@ class BudgetCollection:
     def __init__(self, name=None):
         """
         Initialize empty BudgetCollection
+
+        Lookups that would otherwise walk the tree (categories, names, leaves, category->budget maps, ...) are compiled
+        into a cached index on first use.  The index is invalidated by add_budget/extend (here or in any nested
+        BudgetCollection) and by renaming.  If budgets are modified some other way (eg: appending to .budgets
+        directly), call invalidate()
         """
         self.budgets = []
+        # Weak references to the BudgetCollections that contain this one, so they can be invalidated when this one
+        # changes.  Weak so that temporary collections (eg: from slice_by_budgets) do not live as long as their children
+        self._parents = []
+        self._index = None
+        # Set of every category and budget name below this BudgetCollection, maintained incrementally by add_budget so
+        # duplicate checks do not walk the tree.  None means it needs to be rebuilt (see _get_known_names)
+        self._known_names = set()
         self.name = name if name else DEFAULT_BUDGET_COLLECTION_NAME
 
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._name = name
+        self.invalidate()
+        # Our old name is in our ancestors' known names, so they have to be rebuilt
+        for parent in self._iter_parents():
+            parent._forget_known_names()
+
+    def invalidate(self):
+        """
+        Clears the cached lookup index of this BudgetCollection and of any BudgetCollection that contains it
+        """
+        self._index = None
+        for parent in self._iter_parents():
+            parent.invalidate()
+
+    def _iter_parents(self):
+        """
+        Returns a list of the BudgetCollections that directly contain this one, dropping any that no longer exist
+        """
+        parents = [ref() for ref in self._parents]
+        parents = [p for p in parents if p is not None]
+        self._parents = [weakref.ref(p) for p in parents]
+        return parents
+
+    def _get_known_names(self):
+        """
+        Returns the set of every category and budget name below this BudgetCollection (not including its own name)
+        """
+        if self._known_names is None:
+            self._known_names = set()
+            for b in self.budgets:
+                self._known_names.update(_get_names_below(b))
+        return self._known_names
+
+    def _forget_known_names(self):
+        self._known_names = None
+        for parent in self._iter_parents():
+            parent._forget_known_names()
+
+    def _add_known_names(self, names):
+        """
+        Adds names to the known names of this BudgetCollection and all that contain it
+        """
+        if self._known_names is not None:
+            self._known_names.update(names)
+        for parent in self._iter_parents():
+            parent._add_known_names(names)
+
+    def __getstate__(self):
+        # Weak references cannot be pickled.  Parent links are rebuilt by the parent's __setstate__
+        state = self.__dict__.copy()
+        state["_parents"] = []
+        state["_index"] = None
+        state["_known_names"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for b in self.budgets:
+            if isinstance(b, BudgetCollection):
+                b._parents.append(weakref.ref(self))
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = _compile_index(self)
+        return self._index
+
     @property
     def amount(self):
         total = 0
@@ -27,13 +241,7 @@ class BudgetCollection:
 
     @property
     def categories(self):
-        """
-        FUTURE: Could cache this instead if I don't want to always traverse.  Then update whenever we add_budget
-        """
-        categories = []
-        for b in self.budgets:
-            categories.extend(b.categories)
-        return categories
+        return list(self._get_index()["categories"])
 
     @property
     def categories_flat_dict(self):
@@ -47,20 +255,11 @@ class BudgetCollection:
                 ...
             }
         """
-        categories = {self.name: [b.name for b in self.budgets]}
-        for b in self.budgets:
-            try:
-                deeper_categories = b.categories_flat_dict
-                categories.update(deeper_categories)
-            except AttributeError:
-                # Recursing on something that doesn't have categories to report.  Don't go deeper
-                pass
-
-        return categories
+        return {k: list(v) for k, v in self._get_index()["flat_dict"].items()}
 
     @property
     def category_to_budget(self):
-        return {c: self.name for c in self.categories}
+        return dict(self._get_index()["category_to_budget"]["this"])
 
     def add_budget(self, b, raise_on_duplicate=True):
         """
@@ -76,15 +275,17 @@ class BudgetCollection:
         Returns:
             None
         """
+        new_names = _get_names_below(b)
         if raise_on_duplicate:
-            known_categories = set(self.categories)
-            known_budgets = set(self.get_budget_names(depth=np.inf))
-            known = known_categories | known_budgets | set([self.name])
-
-            for cat in b.categories + [b.name]:
-                if cat in known:
+            known = self._get_known_names()
+            for cat in new_names:
+                if cat in known or cat == self.name:
                     raise ValueError(f"Budget {b} has category {cat} that is already in this BudgetCollection")
         self.budgets.append(b)
+        if isinstance(b, BudgetCollection):
+            b._parents.append(weakref.ref(self))
+        self._add_known_names(new_names)
+        self.invalidate()
 
     def get_all_names(self):
         """
@@ -118,14 +319,17 @@ class BudgetCollection:
         """
         Returns a list of the names of the Budgets (or BudgetCollections) that are immediate children of this object
         """
-        names = [b.name for b in self.get_budgets()]
-        if depth > 0:
-            for b in self.get_budgets():
-                try:
-                    names.extend(b.get_budget_names(depth=depth-1))
-                except AttributeError:
-                    pass
-        return names
+        cached_names = self._get_index()["budget_names"]
+        if depth not in cached_names:
+            names = [b.name for b in self.get_budgets()]
+            if depth > 0:
+                for b in self.get_budgets():
+                    try:
+                        names.extend(b.get_budget_names(depth=depth-1))
+                    except AttributeError:
+                        pass
+            cached_names[depth] = names
+        return list(cached_names[depth])
 
     def get_budgets(self):
         return self.budgets
@@ -149,19 +353,14 @@ class BudgetCollection:
         Returns:
             (Budget or None)
         """
-        for b in self.get_budgets():
-            if b.name == name:
-                return b
-            else:
-                if recurse:
-                    try:
-                        # If successful, we can return what we get from recursion
-                        return b.get_budget_by_name(name, recurse)
-                    except (AttributeError, KeyError):
-                        # Otherwise, we continue looking elsewhere
-                        # AttributeError: This is a Budget not a BudgetCollection
-                        # KeyError: This BudgetCollection doesn't have what we want...
-                        pass
+        if recurse:
+            name_to_budget = self._get_index()["name_to_budget"]
+            if name in name_to_budget:
+                return name_to_budget[name]
+        else:
+            for b in self.get_budgets():
+                if b.name == name:
+                    return b
 
         # If we get to the end, we found nothing
         raise KeyError(f"Cannot find budget named '{name}'")
@@ -170,14 +369,7 @@ class BudgetCollection:
         """
         Returns a list of the leaf budgets (budgets at the lowest level in this collection)
         """
-        leaf_budgets = []
-        for b in self.get_budgets():
-            try:
-                leaf_budgets.extend(b.get_leaf_budgets())
-            except AttributeError:
-                # No deeper budgets
-                leaf_budgets.append(b)
-        return leaf_budgets
+        return list(self._get_index()["leaves"])
 
     def slice_by_budgets(self, budgets: Union[Tuple, List] = tuple()):
         """
@@ -229,21 +421,105 @@ class BudgetCollection:
             TODO
             (list?)
         """
-        category_to_budget = {}
-        if depth == 'leaf':
-            budgets_to_aggregate_to = self.get_leaf_budgets()
+        try:
+            category_to_budget = self._get_index()["category_to_budget"][depth]
+        except KeyError:
+            raise ValueError(f"Unknown value for depth '{depth}")
+
+        budgets = [category_to_budget.get(c, None) for c in categories]
+        return budgets
+
+    def aggregate_categories_to_budget_codes(self, categories, depth='leaf'):
+        """
+        Vectorized aggregate_categories_to_budget, returning a pd.Categorical of budget names
+
+        Categories are mapped through an encoding of the BudgetCollection that is computed once (per depth) and cached,
+        so mapping any number of categories is a few array operations rather than a python loop.  Categories that are
+        not in the BudgetCollection are NaN (code -1).  Use .codes on the result for the integer codes
+
+        Args:
+            categories: pd.Series, np.array, or list of category names.  Categorical Series are fastest, as only their
+                        unique categories are looked up
+            depth (str): See aggregate_categories_to_budget
+
+        Returns:
+            (pd.Categorical): Budget name for each element of categories, with categories (the pd.Categorical kind) of
+                              all budget names at this depth that have categories
+        """
+        index = self._get_index()
+        if depth not in index["category_to_budget"]:
+            raise ValueError(f"Unknown value for depth '{depth}")
+        if depth not in index["budget_encodings"]:
+            index["budget_encodings"][depth] = _encode_category_to_budget(index["category_to_budget"][depth])
+        return _categories_to_budget_codes(categories, index["budget_encodings"][depth])
+
+    def get_budgets_at_depth(self, depth):
+        """
+        Returns a list of the budgets at a depth of this BudgetCollection
+
+        Args:
+            depth (str): One of:
+                            this: [this BudgetCollection]
+                            child: The immediate children of this BudgetCollection
+                            leaf: The leaf budgets of this BudgetCollection
+
+        Returns:
+            (list)
+        """
+        if depth == 'this':
+            return [self]
         elif depth == 'child':
-            budgets_to_aggregate_to = self.get_budgets()
-        elif depth == 'this':
-            budgets_to_aggregate_to = [self]
+            return list(self.get_budgets())
+        elif depth == 'leaf':
+            return self.get_leaf_budgets()
         else:
             raise ValueError(f"Unknown value for depth '{depth}")
 
-        for b in budgets_to_aggregate_to:
-            category_to_budget.update(b.category_to_budget)
+    def get_amounts(self, months):
+        """
+        Returns a np.array of the total budgeted amount of this collection in each of months.  See Budget.get_amounts
+        """
+        amounts = np.zeros(len(months))
+        for b in self.get_budgets():
+            amounts += b.get_amounts(months)
+        return amounts
 
-        budgets = [category_to_budget.get(c, None) for c in categories]
-        return budgets
+    def get_amount_matrix(self, months, depth='child'):
+        """
+        Returns a (n_budgets, n_months) np.array of the budgeted amount of each budget in each of months
+
+        The matrix is computed once per (depth, months) and cached (it is returned read-only, so copy it before
+        modifying).  Rows are in the same order as the budgets at this depth, eg: get_budgets() for depth=child
+
+        Args:
+            months: Iterable of dates (typically month starts, eg: a pd.date_range(..., freq='MS'))
+            depth (str): One of:
+                            this: One row for this BudgetCollection
+                            child: One row for each immediate child of this BudgetCollection
+                            leaf: One row for each leaf budget of this BudgetCollection
+
+        Returns:
+            (np.array)
+        """
+        budgets = self.get_budgets_at_depth(depth)
+        months = pd.DatetimeIndex(months)
+        key = (depth, tuple(months.asi8))
+        matrices = self._get_index()["amount_matrices"]
+        if key not in matrices:
+            matrix = np.zeros((len(budgets), len(months)))
+            for i, b in enumerate(budgets):
+                matrix[i] = b.get_amounts(months)
+            matrix.setflags(write=False)
+            if len(matrices) >= _MAX_CACHED_AMOUNT_MATRICES:
+                matrices.clear()
+            matrices[key] = matrix
+        return matrices[key]
+
+    def freeze(self):
+        """
+        Returns an immutable, hashable FrozenBudgetCollection with the same contents as this BudgetCollection
+        """
+        return FrozenBudgetCollection(self.name, [b.freeze() for b in self.get_budgets()])
 
     def extend(self, bs):
         """
@@ -306,7 +582,7 @@ class BudgetCollection:
 
 
 class Budget:
-    def __init__(self, amount, categories, name=None, amount_type="Monthly"):
+    def __init__(self, amount, categories, name=None, amount_type="Monthly", schedule=None):
         """
         Initialize Budget instance
 
@@ -315,6 +591,9 @@ class Budget:
         :param amount_type: Specifies how amount is specified, eg:
                                 Monthly: X dollars per month
                                 Yearly: X dollars per year (converted internally to monthly)
+        :param schedule: Optional iterable of (effective_date, amount) changes to the budget, with amount specified the
+                         same way as amount.  From each effective_date on the budget is that amount (until the next
+                         change).  Before the first change, the budget is amount
         """
         self.categories = categories
 
@@ -327,12 +606,13 @@ class Budget:
             self.name = name
 
         if amount_type == "Yearly":
-            amount = amount / 12.0
+            to_monthly = lambda x: x / 12.0
         elif amount_type == "Monthly":
-            pass
+            to_monthly = lambda x: x
         else:
             raise ValueError("Invalid value for amount_type ('{0}')".format(amount_type))
-        self.amount = amount
+        self.amount = to_monthly(amount)
+        self.schedule = _parse_schedule(schedule, to_monthly)
 
         self.category_to_budget = {c: self.name for c in self.categories}
 
@@ -361,11 +641,43 @@ class Budget:
         """
         return [self.category_to_budget.get(c, None) for c in categories]
 
+    def aggregate_categories_to_budget_codes(self, categories, depth=None):
+        """
+        Vectorized aggregate_categories_to_budget, returning a pd.Categorical that is budget.name or NaN
+
+        Args:
+            categories: pd.Series, np.array, or list of category names
+            depth (None): Ignored.  Included to be consistent with BudgetCategory API
+
+        Returns:
+            (pd.Categorical)
+        """
+        return _categories_to_budget_codes(categories, _encode_category_to_budget(self.category_to_budget))
+
+    def get_amounts(self, months):
+        """
+        Returns a np.array of the budgeted amount in each of months, following the budget's schedule
+
+        Args:
+            months: Iterable of dates (typically month starts, eg: a pd.date_range(..., freq='MS'))
+
+        Returns:
+            (np.array)
+        """
+        return _scheduled_amounts(self.amount, self.schedule, months)
+
+    def freeze(self):
+        """
+        Returns an immutable, hashable FrozenBudget with the same contents as this Budget
+        """
+        return FrozenBudget(self.amount, self.categories, name=self.name, schedule=self.schedule)
+
     def __eq__(self, other):
         try:
             return ((self.categories == other.categories) and
                     (self.amount == other.amount) and
-                    (self.name == other.name)
+                    (self.name == other.name) and
+                    (self.schedule == other.schedule)
                     )
         except:
             return False
@@ -375,4 +687,182 @@ class Budget:
         Return a string representation of the Budget
         :return: String
         """
-        return self.to_str()
\ No newline at end of file
+        return self.to_str()
+
+
+def _content_hash(*parts):
+    return hashlib.sha256(json.dumps(parts, default=_to_json_scalar).encode()).hexdigest()
+
+
+def _to_json_scalar(obj):
+    # numpy scalars (eg: amounts read from a DataFrame) hash the same as the equivalent python number
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class _Frozen:
+    """
+    Base for immutable budgets.  Attributes can only be set in __init__ (via object.__setattr__)
+
+    Equality and hashing use content_hash, a sha256 of the contents that is stable across processes (unlike hash() of
+    a str), so it can also be used as a key for caches that are shared or persisted
+    """
+    __slots__ = ()
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self):
+        return hash(self.content_hash)
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self.content_hash == other.content_hash
+
+    def freeze(self):
+        return self
+
+
+class FrozenBudget(_Frozen):
+    __slots__ = ("name", "amount", "categories", "schedule", "_category_to_budget", "content_hash")
+
+    def __init__(self, amount, categories, name=None, schedule=None):
+        """
+        Immutable, hashable Budget.  Usually made by Budget.freeze()
+
+        Args:
+            amount: Monthly budgeted dollar amount of spending
+            categories: Iterable of categories in the budget (stored as a tuple)
+            name: Name of the budget.  Defaults the same way as Budget
+            schedule: Optional iterable of (effective_date, monthly amount) changes.  See Budget
+        """
+        categories = tuple(categories)
+        if name is None:
+            name = Budget(amount, list(categories)).name
+        schedule = _parse_schedule(schedule)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "amount", amount)
+        object.__setattr__(self, "categories", categories)
+        object.__setattr__(self, "schedule", schedule)
+        object.__setattr__(self, "_category_to_budget", {c: name for c in categories})
+        object.__setattr__(self, "content_hash",
+                           _content_hash("budget", name, amount, categories,
+                                         [(date.isoformat(), change) for date, change in schedule]))
+
+    @property
+    def category_to_budget(self):
+        return MappingProxyType(self._category_to_budget)
+
+    # Read-only methods are shared with Budget
+    to_str = Budget.to_str
+    __str__ = Budget.__str__
+    aggregate_categories_to_budget = Budget.aggregate_categories_to_budget
+    aggregate_categories_to_budget_codes = Budget.aggregate_categories_to_budget_codes
+    get_amounts = Budget.get_amounts
+
+    def thaw(self):
+        """
+        Returns a (mutable) Budget with the same contents
+        """
+        return Budget(self.amount, list(self.categories), name=self.name, schedule=self.schedule)
+
+    def __reduce__(self):
+        return FrozenBudget, (self.amount, self.categories, self.name, self.schedule)
+
+    def __repr__(self):
+        return f"FrozenBudget({self.amount!r}, {self.categories!r}, name={self.name!r}, schedule={self.schedule!r})"
+
+
+class FrozenBudgetCollection(_Frozen):
+    __slots__ = ("name", "budgets", "content_hash", "_index")
+
+    def __init__(self, name, budgets):
+        """
+        Immutable, hashable BudgetCollection.  Usually made by BudgetCollection.freeze()
+
+        Because it cannot change, anything derived from it can be memoized using it as a key (see slice_by_budgets)
+
+        Args:
+            name (str): Name of the collection
+            budgets: Iterable of FrozenBudget and FrozenBudgetCollection objects (stored as a tuple)
+        """
+        budgets = tuple(budgets)
+        for b in budgets:
+            if not isinstance(b, _Frozen):
+                raise TypeError(f"FrozenBudgetCollection can only contain frozen budgets, got {type(b).__name__}")
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "budgets", budgets)
+        object.__setattr__(self, "content_hash",
+                           _content_hash("collection", name, [b.content_hash for b in budgets]))
+        object.__setattr__(self, "_index", None)
+
+    def _get_index(self):
+        if self._index is None:
+            object.__setattr__(self, "_index", _compile_index(self))
+        return self._index
+
+    # Read-only methods are shared with BudgetCollection.  They only use name, get_budgets() and the compiled index
+    amount = BudgetCollection.amount
+    categories = BudgetCollection.categories
+    categories_flat_dict = BudgetCollection.categories_flat_dict
+    category_to_budget = BudgetCollection.category_to_budget
+    get_all_names = BudgetCollection.get_all_names
+    get_duplicated_names = BudgetCollection.get_duplicated_names
+    has_duplicates = BudgetCollection.has_duplicates
+    get_budget_names = BudgetCollection.get_budget_names
+    get_budget_by_name = BudgetCollection.get_budget_by_name
+    get_leaf_budgets = BudgetCollection.get_leaf_budgets
+    aggregate_categories_to_budget = BudgetCollection.aggregate_categories_to_budget
+    aggregate_categories_to_budget_codes = BudgetCollection.aggregate_categories_to_budget_codes
+    get_budgets_at_depth = BudgetCollection.get_budgets_at_depth
+    get_amounts = BudgetCollection.get_amounts
+    get_amount_matrix = BudgetCollection.get_amount_matrix
+    to_str = BudgetCollection.to_str
+    __str__ = BudgetCollection.__str__
+    display = BudgetCollection.display
+
+    def get_budgets(self):
+        return self.budgets
+
+    def slice_by_budgets(self, budgets: Union[Tuple, List] = tuple()):
+        """
+        Returns a new FrozenBudgetCollection that is a flat subset of the current one.  See BudgetCollection
+
+        Results are memoized, so repeatedly slicing by the same budgets returns the same object
+        """
+        return _slice_frozen_budget_collection(self, tuple(budgets))
+
+    def flatten(self):
+        """
+        Returns a new FrozenBudgetCollection composed of all the leaf budgets in the current collection
+        """
+        return FrozenBudgetCollection(self.name, self.get_leaf_budgets())
+
+    def thaw(self):
+        """
+        Returns a (mutable) BudgetCollection with the same contents
+        """
+        bc = BudgetCollection(self.name)
+        for b in self.budgets:
+            bc.add_budget(b.thaw(), raise_on_duplicate=False)
+        return bc
+
+    def __reduce__(self):
+        return FrozenBudgetCollection, (self.name, self.budgets)
+
+    def __repr__(self):
+        return f"FrozenBudgetCollection({self.name!r}, {self.budgets!r})"
+
+
+@functools.lru_cache(maxsize=128)
+def _slice_frozen_budget_collection(bc, budgets):
+    sliced = FrozenBudgetCollection(bc.name, [bc.get_budget_by_name(name, recurse=True) for name in budgets])
+    # Same check that BudgetCollection.add_budget would do while building the slice
+    duplicates = sliced.get_duplicated_names()
+    if duplicates:
+        raise ValueError(f"Slicing by budgets {budgets} gives duplicated categories {duplicates}")
+    return sliced
+
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+
+class SpendCube:
+    """
+    Dense category x month matrices of the sum and count of transactions
+
+    Built once from the transactions (see from_transactions), after which views of any budget and date range are
+    derived by summing category rows into budgets and selecting month columns.  The cost of those views depends on the
+    number of categories and months, not the number of transactions
+    """
+    def __init__(self, categories, months, sums, counts):
+        """
+        Args:
+            categories (pd.Index): Category of each row
+            months (pd.DatetimeIndex): Month start of each column
+            sums (np.array): (n_categories, n_months) sum of transaction amounts
+            counts (np.array): (n_categories, n_months) number of transactions
+        """
+        self.categories = pd.Index(categories, dtype=object)
+        self.months = pd.DatetimeIndex(months)
+        self.sums = np.asarray(sums, dtype=float)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_transactions(cls, df, datetime_column="datetime", category_column="category", amount_column="amount"):
+        """
+        Returns a SpendCube of the transactions in df
+
+        Transactions without a category or date are left out.  Months run from the first to the last transaction, with
+        zeros for months without transactions
+
+        Args:
+            df (pd.DataFrame): Transactions, with datetime, category and amount columns
+            datetime_column, category_column, amount_column (str): Column names in df
+
+        Returns:
+            (SpendCube)
+        """
+        category_codes, categories = pd.factorize(df[category_column])
+        month_periods = pd.DatetimeIndex(df[datetime_column]).to_period('M')
+        has_month = ~month_periods.isna()
+        if has_month.any():
+            months = pd.period_range(month_periods[has_month].min(), month_periods[has_month].max(), freq='M')
+        else:
+            months = pd.PeriodIndex([], freq='M')
+        month_codes = months.get_indexer(month_periods)
+
+        keep = (category_codes >= 0) & (month_codes >= 0)
+        flat_index = category_codes[keep] * len(months) + month_codes[keep]
+        size = len(categories) * len(months)
+        amounts = df[amount_column].to_numpy(dtype=float)[keep]
+        sums = np.bincount(flat_index, weights=amounts, minlength=size).reshape(len(categories), len(months))
+        counts = np.bincount(flat_index, minlength=size).reshape(len(categories), len(months))
+        return cls(categories, months.to_timestamp(), sums, counts)
+
+    def reindex_months(self, matrix, months):
+        """
+        Returns the columns of a (n_rows, n_months of this cube) matrix for each of months, with zeros for months
+        outside this cube.  If months is None, matrix is returned as is
+        """
+        if months is None:
+            return matrix
+        columns = self.months.get_indexer(pd.DatetimeIndex(months))
+        # Add a column of zeros that get_indexer's -1 (not found) picks up
+        padded = np.concatenate([matrix, np.zeros((matrix.shape[0], 1), dtype=matrix.dtype)], axis=1)
+        return padded[:, columns]
+
+    def get_sums(self, months=None):
+        """
+        Returns the (n_categories, n_months) sums, optionally for specific months (zeros for months outside the cube)
+        """
+        return self.reindex_months(self.sums, months)
+
+    def get_counts(self, months=None):
+        """
+        Returns the (n_categories, n_months) counts, optionally for specific months (zeros for months outside the cube)
+        """
+        return self.reindex_months(self.counts, months)
+
+    def aggregate_to_budgets(self, budget, months=None, depth='child'):
+        """
+        Returns (sums, counts) of transactions summed into the budgets of a BudgetCollection
+
+        Args:
+            budget (BudgetCollection, FrozenBudgetCollection): Budget to aggregate categories into
+            months: Optional iterable of month starts to return columns for (zeros for months outside the cube).  If
+                    None, all months in the cube
+            depth (str): Depth of budget to aggregate to.  Rows are in the same order as budget.get_budgets_at_depth
+                         (and budget.get_amount_matrix)
+
+        Returns:
+            (tuple): (np.array of sums, np.array of counts), each (n_budgets, n_months)
+        """
+        budget_names = pd.Index([b.name for b in budget.get_budgets_at_depth(depth)], dtype=object)
+        budget_codes = budget.aggregate_categories_to_budget_codes(self.categories, depth=depth)
+        # Categorical codes are in the order budgets were first seen in the category map, which is not necessarily the
+        # row order (eg: budgets without categories are skipped).  Remap them to rows
+        code_to_row = np.append(budget_names.get_indexer(budget_codes.categories), -1)
+        rows = code_to_row[budget_codes.codes]
+        keep = rows >= 0
+
+        sums = np.zeros((len(budget_names), self.sums.shape[1]))
+        counts = np.zeros((len(budget_names), self.counts.shape[1]), dtype=np.int64)
+        np.add.at(sums, rows[keep], self.sums[keep])
+        np.add.at(counts, rows[keep], self.counts[keep])
+        return self.reindex_months(sums, months), self.reindex_months(counts, months)
+
+    def __repr__(self):
+        return f"SpendCube({len(self.categories)} categories x {len(self.months)} months)"
@@ -1,17 +1,244 @@
-from spearmint.data_structures.budget import BudgetCollection
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from spearmint.data_structures.budget import Budget, BudgetCollection, FrozenBudgetCollection
 from spearmint.services.mock_budget_data import budget_definition
 
+# Path to a budget definition file (see load_budget_definition).  If not set, the mock budget definitions are used
+BUDGET_DEFINITION_ENV = "SPEARMINT_BUDGET_DEFINITION"
+
+# The top level BudgetCollections of a budget definition, in the order they are put in the overall BudgetCollection
+BUDGET_DEFINITION_SECTIONS = ("income", "expense", "excluded")
+OVERALL_BUDGET_COLLECTION_NAME = "Overall"
+
+# Version of the compiled (pickled) form.  Bump this if FrozenBudget/FrozenBudgetCollection change
+_COMPILED_VERSION = 2
+
+# {path: {"mtime_ns": _, "size": _, "sha256": _, "budgets": _}} of definitions loaded in this process
+_loaded_definitions = {}
+_mock_budgets = None
+
+
+def definition_to_budget(definition):
+    """
+    Returns a FrozenBudget or FrozenBudgetCollection built from a (json-like) budget definition
+
+    A definition is a dict of either:
+        Budget: {"categories": [str, ...], "amount": number, "name": str (optional),
+                 "amount_type": "Monthly" or "Yearly" (optional, default Monthly),
+                 "schedule": [{"from": date str, "amount": number}, ...] (optional, see Budget)}
+        BudgetCollection: {"name": str, "budgets": [definition, ...]}
+
+    Duplicated names or categories raise a ValueError, the same as building with BudgetCollection.add_budget
+    """
+    if "budgets" in definition:
+        bc = FrozenBudgetCollection(definition["name"], [definition_to_budget(d) for d in definition["budgets"]])
+        duplicates = bc.get_duplicated_names()
+        if duplicates:
+            raise ValueError(f"BudgetCollection '{bc.name}' has duplicated names {sorted(duplicates)}")
+        return bc
+    else:
+        schedule = [(change["from"], change["amount"]) for change in definition.get("schedule", [])]
+        b = Budget(definition.get("amount", 0), list(definition["categories"]), name=definition.get("name"),
+                   amount_type=definition.get("amount_type", "Monthly"), schedule=schedule)
+        return b.freeze()
+
+
+def budget_to_definition(b):
+    """
+    Returns the budget definition (see definition_to_budget) of a Budget or BudgetCollection (frozen or not)
+    """
+    if isinstance(b, (BudgetCollection, FrozenBudgetCollection)):
+        return {"name": b.name, "budgets": [budget_to_definition(child) for child in b.get_budgets()]}
+    else:
+        definition = {"name": b.name, "amount": b.amount, "categories": list(b.categories)}
+        if b.schedule:
+            definition["schedule"] = [{"from": date.isoformat(), "amount": amount} for date, amount in b.schedule]
+        return definition
+
+
+def compile_budget_definition(definition):
+    """
+    Returns {section: FrozenBudgetCollection} for each of BUDGET_DEFINITION_SECTIONS and "overall" from a budget file's
+    contents, which are {section: BudgetCollection definition}
+    """
+    budgets = {section: definition_to_budget(definition[section]) for section in BUDGET_DEFINITION_SECTIONS}
+    overall = FrozenBudgetCollection(OVERALL_BUDGET_COLLECTION_NAME,
+                                     [budgets[section] for section in BUDGET_DEFINITION_SECTIONS])
+    duplicates = overall.get_duplicated_names()
+    if duplicates:
+        raise ValueError(f"Budget definition has duplicated names {sorted(duplicates)}")
+    budgets["overall"] = overall
+    return budgets
+
+
+def _get_compiled_cache_path(path):
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{filename}.compiled.pickle")
+
+
+def load_budget_definition(path, use_cache_file=True):
+    """
+    Returns the compiled budgets of a budget definition file.  See compile_budget_definition
+
+    The file is json with keys of "income", "expense", and "excluded", each defining a BudgetCollection (see
+    definition_to_budget).  For example:
+        {
+            "income": {"name": "Income", "budgets": [{"amount": 5000, "categories": ["Paycheck"]}]},
+            "expense": {"name": "Expenses", "budgets": [
+                {"name": "Home", "budgets": [{"amount": -1800, "categories": ["Mortgage & Rent"]}]}
+            ]},
+            "excluded": {"name": "Excluded Transactions", "budgets": [{"categories": ["Transfer"]}]}
+        }
+
+    Compiling is done once per version of the file:
+        -   In this process, if the file's mtime and size have not changed the previous result is returned without
+            reading the file (so this is cheap to call often, eg: to notice edits to the file)
+        -   Otherwise the file is read and hashed.  If it matches the previous load (eg: the file was touched but not
+            changed), or the compiled cache file next to it (".<filename>.compiled.pickle"), that is used rather than
+            compiling again
+
+    If a changed file cannot be read or compiled (eg: a typo, or an editor's half-written save), the error is printed
+    and the last good compiled budgets are returned until the file changes again.  Errors are only raised if this
+    process has never loaded the file successfully.
+
+    The compiled cache file is a pickle, which is loaded without any checks that it was written by spearmint.  Only
+    use budget definitions in directories that are trusted (not writable by other users)
+
+    Because the compiled budgets are frozen, a new version of the file gives new objects with a new content_hash rather
+    than changing anything already handed out
+
+    Args:
+        path (str): Path to the budget definition file
+        use_cache_file (bool): If True, read and write the compiled cache file
+
+    Returns:
+        (dict): {"income": FrozenBudgetCollection, "expense": ..., "excluded": ..., "overall": ...}
+    """
+    loaded = _loaded_definitions.get(path)
+    stat = None
+    try:
+        stat = os.stat(path)
+        if loaded and (loaded["mtime_ns"], loaded["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return loaded["budgets"]
+        budgets, sha256 = _load_changed_budget_definition(path, loaded, use_cache_file)
+    except Exception as e:
+        if not loaded:
+            raise
+        # Keep serving the last good budgets.  Remember this version of the file (if we got that far) so the error is
+        # reported once per change rather than on every call
+        print(f"WARNING: Could not load budget definition {path} ({type(e).__name__}: {e}).  Using the last "
+              f"successfully loaded version")
+        if stat is not None:
+            _loaded_definitions[path] = dict(loaded, mtime_ns=stat.st_mtime_ns, size=stat.st_size, sha256=None)
+        return loaded["budgets"]
+
+    _loaded_definitions[path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256,
+                                 "budgets": budgets}
+    return budgets
+
+
+def _load_changed_budget_definition(path, loaded, use_cache_file):
+    """
+    Returns (budgets, sha256) for a budget definition file that might have changed since loaded.  See
+    load_budget_definition
+    """
+    with open(path, "rb") as fin:
+        contents = fin.read()
+    sha256 = hashlib.sha256(contents).hexdigest()
+
+    if loaded and loaded["sha256"] == sha256:
+        return loaded["budgets"], sha256
+
+    cache_path = _get_compiled_cache_path(path)
+    if use_cache_file and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as fin:
+                cached = pickle.load(fin)
+            if cached["version"] == _COMPILED_VERSION and cached["sha256"] == sha256:
+                return cached["budgets"], sha256
+        except Exception:
+            # Unreadable or from an incompatible version.  Just recompile
+            pass
+
+    budgets = compile_budget_definition(json.loads(contents))
+    if use_cache_file:
+        try:
+            _write_compiled_cache(cache_path, {"version": _COMPILED_VERSION, "sha256": sha256, "budgets": budgets})
+        except OSError:
+            # Read-only location.  We still have the compiled budgets in memory
+            pass
+    return budgets, sha256
+
+
+def _write_compiled_cache(cache_path, compiled):
+    """
+    Pickles compiled to cache_path via a temporary file, so that readers never see a partially written cache
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fout:
+            pickle.dump(compiled, fout)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _compile_mock_budget_definition():
+    income = budget_definition.get_income_bc().freeze()
+    expense = budget_definition.get_expense_bc().freeze()
+    excluded = budget_definition.get_excluded_bc().freeze()
+    return {
+        "income": income,
+        "expense": expense,
+        "excluded": excluded,
+        "overall": FrozenBudgetCollection(OVERALL_BUDGET_COLLECTION_NAME, [income, expense, excluded]),
+    }
+
+
+def get_budgets(path=None):
+    """
+    Returns the current compiled budgets (see load_budget_definition)
 
-def get_income_budget_collection():
-    return budget_definition.get_income_bc()
+    Args:
+        path (str): Path to a budget definition file.  Defaults to the SPEARMINT_BUDGET_DEFINITION environment
+                    variable, or if that is not set the mock budget definitions
 
+    Returns:
+        (dict): {"income": FrozenBudgetCollection, "expense": ..., "excluded": ..., "overall": ...}
+    """
+    if path is None:
+        path = os.environ.get(BUDGET_DEFINITION_ENV)
+    if path:
+        return load_budget_definition(path)
+    else:
+        # The mock definitions are code, so they cannot change while we are running
+        global _mock_budgets
+        if _mock_budgets is None:
+            _mock_budgets = _compile_mock_budget_definition()
+        return _mock_budgets
 
-def get_expense_budget_collection():
-    return budget_definition.get_expense_bc()
 
+def _get_budget_collection(section, frozen):
+    bc = get_budgets()[section]
+    return bc if frozen else bc.thaw()
 
-def get_excluded_budget_collection():
-    return budget_definition.get_excluded_bc()
+
+def get_income_budget_collection(frozen=False):
+    return _get_budget_collection("income", frozen)
+
+
+def get_expense_budget_collection(frozen=False):
+    return _get_budget_collection("expense", frozen)
+
+
+def get_excluded_budget_collection(frozen=False):
+    return _get_budget_collection("excluded", frozen)
 
 
 def get_unbudgeted_categories(categories):
@@ -24,24 +251,20 @@ def get_unbudgeted_categories(categories):
     Returns:
         (list): Elements of categories not in this budget
     """
-    expenses = get_expense_budget_collection()
-    incomes = get_income_budget_collection()
-    exclusions = get_excluded_budget_collection()
-    budgeted = expenses.categories + incomes.categories + exclusions.categories
+    budgeted = set(get_budgets()["overall"].categories)
 
     unbudgeted = [c for c in categories if c not in budgeted]
     return unbudgeted
 
 
-def get_overall_budget_collection():
+def get_overall_budget_collection(frozen=False):
     """
     Returns a BudgetCollection that includes Income, Expense, and Excluded transactions
+
+    Args:
+        frozen (bool): If True, return the (shared, cached) FrozenBudgetCollection rather than a new BudgetCollection
     """
-    bc = BudgetCollection(name="Overall")
-    bc.add_budget(get_income_budget_collection())
-    bc.add_budget(get_expense_budget_collection())
-    bc.add_budget(get_excluded_budget_collection())
-    return bc
+    return _get_budget_collection("overall", frozen)
 
 
 if __name__ == "__main__":
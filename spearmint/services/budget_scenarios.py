@@ -0,0 +1,258 @@
+import json
+
+import click
+import numpy as np
+import pandas as pd
+
+from spearmint.data.db_session import global_init
+from spearmint.data_structures.budget import FrozenBudgetCollection
+from spearmint.data_structures.spend_cube import SpendCube
+from spearmint.services.budget import get_overall_budget_collection, definition_to_budget, budget_to_definition
+from spearmint.services.transaction import get_transactions
+
+BASELINE_SCENARIO_NAME = "baseline"
+
+
+def get_months(start_date, end_date):
+    """
+    Returns a pd.DatetimeIndex of the beginning of every month that overlaps start_date to end_date
+    """
+    start_date = pd.Timestamp(start_date).to_period('M').to_timestamp()
+    return pd.date_range(start=start_date, end=pd.Timestamp(end_date), freq='MS')
+
+
+def get_actuals_matrix(df, budget, months, depth='child', datetime_column="datetime", category_column="category",
+                       amount_column="amount"):
+    """
+    Returns a (n_budgets, n_months) np.array of the total amount of transactions in each budget and month
+
+    Computed through a SpendCube (array operations rather than a groupby).  Transactions outside the budget or outside
+    months are ignored
+
+    Args:
+        df (pd.DataFrame, SpendCube): Transactions, with datetime, category and amount columns, or a SpendCube of them
+        budget (BudgetCollection, FrozenBudgetCollection): Budget to aggregate transactions to
+        months (pd.DatetimeIndex): Month starts to aggregate to, as from get_months
+        depth (str): Depth of budget to aggregate to.  Rows are in the same order as budget.get_amount_matrix
+        datetime_column, category_column, amount_column (str): Column names in df
+
+    Returns:
+        (np.array)
+    """
+    if isinstance(df, SpendCube):
+        cube = df
+    else:
+        cube = SpendCube.from_transactions(df, datetime_column=datetime_column, category_column=category_column,
+                                           amount_column=amount_column)
+    return cube.aggregate_to_budgets(budget, months=months, depth=depth)[0]
+
+
+def apply_scenario(budget, overrides):
+    """
+    Returns a FrozenBudgetCollection of budget with some of its (leaf) budgets changed
+
+    Args:
+        budget (BudgetCollection, FrozenBudgetCollection): Budget to start from
+        overrides (dict): {budget name: change}, where change is either a number (the new monthly amount, replacing
+                          any schedule) or a partial budget definition that is applied on top of the existing budget
+                          (eg: {"amount": 9600, "amount_type": "Yearly"} or {"schedule": [{"from": "2021-01-01",
+                          "amount": -900}]}).  See services.budget.definition_to_budget
+
+    Returns:
+        (FrozenBudgetCollection)
+    """
+    budget = budget.freeze()
+    overrides = dict(overrides)
+
+    def _apply(b):
+        if isinstance(b, FrozenBudgetCollection):
+            return FrozenBudgetCollection(b.name, [_apply(child) for child in b.get_budgets()])
+        elif b.name in overrides:
+            change = overrides.pop(b.name)
+            if not isinstance(change, dict):
+                change = {"amount": change, "schedule": []}
+            definition = budget_to_definition(b)
+            if "amount" in change and "schedule" not in change:
+                # A new amount without a new schedule replaces the schedule too
+                definition.pop("schedule", None)
+            definition.update(change)
+            return definition_to_budget(definition)
+        else:
+            return b
+
+    new_budget = _apply(budget)
+    if overrides:
+        raise ValueError(f"Cannot find (leaf) budgets to override named {sorted(overrides)}")
+    return new_budget
+
+
+def evaluate_scenarios(actuals, budgeted):
+    """
+    Returns deltas, subtotals and over/under budget counts for any number of scenarios at once
+
+    Delta is actual - budgeted, so (as in the budget heatmap) a negative delta is worse than budgeted for both
+    expenses (negative amounts, spent more than budgeted) and income (earned less than budgeted)
+
+    Args:
+        actuals (np.array): (n_budgets, n_months) actual amounts, shared by all scenarios (see get_actuals_matrix)
+        budgeted (np.array): (n_scenarios, n_budgets, n_months) budgeted amounts
+
+    Returns:
+        (dict) of np.arrays:
+            deltas: (n_scenarios, n_budgets, n_months) actuals - budgeted
+            subtotals: (n_scenarios, n_months) sum of deltas over budgets
+            n_over_budget: (n_scenarios, n_budgets) number of months with a negative delta
+            n_under_budget: (n_scenarios, n_budgets) number of months with a non-negative delta
+    """
+    deltas = actuals[np.newaxis, :, :] - budgeted
+    return {
+        "deltas": deltas,
+        "subtotals": deltas.sum(axis=1),
+        "n_over_budget": (deltas < 0).sum(axis=2),
+        "n_under_budget": (deltas >= 0).sum(axis=2),
+    }
+
+
+def compare_scenarios(df, scenarios, budget=None, start_date=None, end_date=None, depth='child'):
+    """
+    Evaluates a batch of budget scenarios against transactions
+
+    Actuals are aggregated once, then every scenario is evaluated at once as a scenarios x budgets x months array
+
+    Args:
+        df (pd.DataFrame, SpendCube): Transactions, with datetime, category and amount columns, or a SpendCube of them
+        scenarios (dict): {scenario name: overrides}.  See apply_scenario.  A scenario named "baseline" with no
+                          overrides is added first if there is not one already
+        budget (BudgetCollection, FrozenBudgetCollection): Budget the scenarios are relative to.  Defaults to the overall
+                                                           budget
+        start_date, end_date: Range of dates to evaluate.  Default to the range of df, so must be given if df has no
+                              transactions
+        depth (str): Depth of budget to report on.  See BudgetCollection.get_amount_matrix
+
+    Returns:
+        (dict): {
+                    "scenarios": [scenario names],
+                    "budgets": [budget names],
+                    "months": pd.DatetimeIndex,
+                    "actuals": (n_budgets, n_months) np.array,
+                    "budgeted": (n_scenarios, n_budgets, n_months) np.array,
+                    and everything from evaluate_scenarios
+                }
+    """
+    if budget is None:
+        budget = get_overall_budget_collection(frozen=True)
+    if not isinstance(df, SpendCube):
+        df = SpendCube.from_transactions(df)
+    if len(df.months) == 0 and (start_date is None or end_date is None):
+        raise ValueError("No transactions to take the date range from.  Pass start_date and end_date")
+    if start_date is None:
+        start_date = df.months.min()
+    if end_date is None:
+        end_date = df.months.max()
+    months = get_months(start_date, end_date)
+
+    scenarios = dict(scenarios)
+    if BASELINE_SCENARIO_NAME not in scenarios:
+        scenarios = {BASELINE_SCENARIO_NAME: {}, **scenarios}
+
+    actuals = get_actuals_matrix(df, budget, months, depth=depth)
+    budgeted = np.stack([apply_scenario(budget, overrides).get_amount_matrix(months, depth=depth)
+                         for overrides in scenarios.values()])
+
+    results = {
+        "scenarios": list(scenarios),
+        "budgets": [b.name for b in budget.get_budgets_at_depth(depth)],
+        "months": months,
+        "actuals": actuals,
+        "budgeted": budgeted,
+    }
+    results.update(evaluate_scenarios(actuals, budgeted))
+    return results
+
+
+def summarize_scenarios(results):
+    """
+    Returns a DataFrame with one row per scenario summarizing compare_scenarios results
+
+    Columns are the total delta, the worst (most negative) monthly subtotal, and the number of budget-months that were
+    over/under budget
+    """
+    return pd.DataFrame({
+        "total delta": results["subtotals"].sum(axis=1),
+        "worst month": results["subtotals"].min(axis=1),
+        "over budget": results["n_over_budget"].sum(axis=1),
+        "under budget": results["n_under_budget"].sum(axis=1),
+    }, index=pd.Index(results["scenarios"], name="scenario"))
+
+
+def subtotals_to_dataframe(results):
+    """
+    Returns the monthly subtotal of each scenario as a DataFrame indexed by month, with a column per scenario
+    """
+    return pd.DataFrame(results["subtotals"].T, index=results["months"], columns=results["scenarios"])
+
+
+def load_scenarios(path):
+    """
+    Returns the scenarios in a json file of {scenario name: overrides}.  See apply_scenario
+    """
+    with open(path) as fin:
+        return json.load(fin)
+
+
+@click.group()
+def cli():
+    pass
+
+
+@click.command()
+@click.argument("DB_PATH")
+@click.argument("SCENARIO_FILE")
+@click.option(
+    "--start_date",
+    default=None,
+    help="Date to start comparing from (default is the first transaction)"
+)
+@click.option(
+    "--end_date",
+    default=None,
+    help="Date to compare until (default is the last transaction)"
+)
+@click.option(
+    "--depth",
+    default="child",
+    type=click.Choice(["this", "child", "leaf"]),
+    help="Depth of the budget to count over/under budget months at"
+)
+@click.option(
+    "--output",
+    default=None,
+    help="Optional path to write the monthly subtotals of each scenario to as csv"
+)
+def compare(db_path, scenario_file, start_date, end_date, depth, output):
+    """
+    Compare budget scenarios against the transactions in a DB
+
+    SCENARIO_FILE is json of {scenario name: {budget name: new monthly amount or partial budget definition}}, eg:
+
+        {"more groceries": {"Groceries_": -1000}, "raise": {"Paycheck_": {"amount": 120000, "amount_type": "Yearly"}}}
+
+    Args:\n
+        db_path (str): Path to the DB to read transactions from\n
+        scenario_file (str): Path to the scenario file
+    """
+    global_init(db_path, False)
+    df = get_transactions('df')
+    results = compare_scenarios(df, load_scenarios(scenario_file), start_date=start_date, end_date=end_date,
+                                depth=depth)
+    print(summarize_scenarios(results).round(2).to_string())
+
+    if output:
+        subtotals_to_dataframe(results).to_csv(output)
+
+
+cli.add_command(compare)
+
+
+if __name__ == '__main__':
+    cli()
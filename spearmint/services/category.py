@@ -1,7 +1,9 @@
 import click
+from sqlalchemy import exists, select, func
 
 from spearmint.data.category import Category
 from spearmint.data.db_session import create_session, global_init
+from spearmint.data.suggested_category import SuggestedCategory
 from spearmint.data.transaction import Transaction
 
 
@@ -42,9 +44,112 @@ def get_categories(scheme=None):
     return q.all()
 
 
+def get_suggested_categories_by_transaction(scheme, order_by="confidence"):
+    """
+    Returns all suggested categories in a scheme, grouped by the transaction they are suggested for and ordered within
+    each group
+
+    Ordering is done by the db (supported by the suggested_category table's (transaction_id, scheme, rank) primary key
+    and (scheme, transaction_id, confidence) index) rather than by sorting in python
+
+    Args:
+        scheme (str): Scheme name to match
+        order_by (str): One of:
+                            confidence: Descending confidence (suggestions without a confidence are last)
+                            rank: Ascending rank
+                            None: Same as rank (the order they were suggested in)
+
+    Returns:
+        (dict): {transaction_id: [SuggestedCategory, ...]}
+    """
+    if order_by == "confidence":
+        ordering = (SuggestedCategory.confidence.desc(), SuggestedCategory.rank)
+    elif order_by == "rank" or order_by is None:
+        ordering = (SuggestedCategory.rank,)
+    else:
+        raise ValueError(f"Invalid order_by '{order_by}'")
+
+    s = create_session()
+    q = (s.query(SuggestedCategory)
+         .filter(SuggestedCategory.scheme == scheme)
+         .order_by(SuggestedCategory.transaction_id, *ordering)
+         )
+    categories_by_transaction = {}
+    for c in q:
+        categories_by_transaction.setdefault(c.transaction_id, []).append(c)
+    s.close()
+    return categories_by_transaction
+
+
+def _scheme_exists_query(s, scheme):
+    return s.query(s.query(SuggestedCategory.transaction_id).filter(SuggestedCategory.scheme == scheme).exists())
+
+
+def scheme_exists(scheme):
+    """
+    Returns True if any suggested category is in scheme
+    """
+    s = create_session()
+    exists = _scheme_exists_query(s, scheme).scalar()
+    s.close()
+    return exists
+
+
+def write_suggested_categories(rows_by_scheme, if_scheme_exists="replace"):
+    """
+    Writes suggested categories for one or more schemes in a single db transaction
+
+    For if_scheme_exists="replace", each scheme is replaced by a scheme-scoped DELETE followed by a bulk INSERT (both
+    set-based, so no ORM objects are loaded into python).  Because everything happens in one transaction, readers see
+    either the old or the new suggestions of every scheme, never both or neither, and a failure part way through leaves
+    the db unchanged
+
+    Args:
+        rows_by_scheme (dict): {scheme: [row_dict, ...]}, where each row_dict has keys of transaction_id, category,
+                               rank and confidence.  See predictions_to_category_rows
+        if_scheme_exists (str): One of:
+                                    replace: Removes all existing suggestions in the scheme
+                                    raise: Raises a ValueError if the scheme already has suggestions
+                                    ignore: Keeps any existing suggestions in the scheme, only adding new suggestions
+                                            where a transaction does not already have one at that rank
+
+    Side Effects:
+        db suggested_category table is updated
+
+    Returns:
+        None
+    """
+    if if_scheme_exists not in ("replace", "raise", "ignore"):
+        raise ValueError(f"Invalid value for if_scheme_exists '{if_scheme_exists}")
+
+    table = SuggestedCategory.__table__
+    insert = table.insert()
+    if if_scheme_exists == "ignore":
+        insert = insert.prefix_with("OR IGNORE")
+
+    s = create_session()
+    try:
+        for scheme, rows in rows_by_scheme.items():
+            if if_scheme_exists == "raise":
+                if _scheme_exists_query(s, scheme).scalar():
+                    raise ValueError(f"Scheme '{scheme}' already in use")
+            elif if_scheme_exists == "replace":
+                s.execute(table.delete().where(table.c.scheme == scheme))
+
+            if rows:
+                # executemany of a single Core INSERT, rather than an ORM add per suggestion
+                s.execute(insert.values(scheme=scheme), rows)
+        s.commit()
+    except Exception:
+        s.rollback()
+        raise
+    finally:
+        s.close()
+
+
 def get_accepted_categories():
     s = create_session()
-    accepted_categories = s.query(Category).filter(Category.id.in_(s.query(Transaction.category_id))).all()
+    accepted_categories = s.query(Category).join(Transaction, Transaction.category_id == Category.id).all()
     s.close()
     return accepted_categories
 
@@ -56,6 +161,9 @@ def accept_current_chosen_categories(scheme="accepted"):
     Stale "accepted" categories are any categories in the accepted scheme now that are no longer attached to a
     Transaction.category
 
+    This is done as one UPDATE and one DELETE in a single db transaction, so the number of round trips does not depend
+    on the number of categories
+
     Args:
         scheme (str): Scheme name for the "accepted" scheme
 
@@ -64,30 +172,106 @@ def accept_current_chosen_categories(scheme="accepted"):
         Modifies all categories that are accepted to now be in the accepted scheme
 
     Returns:
-        None
+        (int, int): Number of categories updated to the accepted scheme, and number of stale categories deleted
     """
-    accepted_categories = get_accepted_categories()
-    print(f"len(accepted_categories) = {len(accepted_categories)}")
+    s = create_session()
+    is_accepted = exists().where(Transaction.category_id == Category.id)
+    try:
+        # Update anything that is accepted to the accepted scheme
+        n_updated = (s.query(Category)
+                     .filter(Category.scheme != scheme)
+                     .filter(is_accepted)
+                     .update({Category.scheme: scheme}, synchronize_session=False)
+                     )
+        print(f"updated {n_updated} categories to the accepted scheme")
+
+        # Remove anything that is in the accepted scheme but is no longer accepted.  NOT EXISTS rather than NOT IN
+        # because NOT IN (subquery) is never true if the subquery has any NULLs (eg: any uncategorized transaction)
+        n_deleted = (s.query(Category)
+                     .filter(Category.scheme == scheme)
+                     .filter(~is_accepted)
+                     .delete(synchronize_session=False)
+                     )
+        print(f"deleted {n_deleted} stale accepted categories")
+        s.commit()
+    except Exception:
+        s.rollback()
+        raise
+    finally:
+        s.close()
+    return n_updated, n_deleted
+
+
+def accept_suggestions(scheme, min_confidence=None, descriptions=None):
+    """
+    Accepts the top-ranked suggestion of a scheme as the Transaction.category of every uncategorized transaction
+
+    Set-based, using a constant number of statements in a single db transaction regardless of table size: one
+    INSERT ... SELECT creates an accepted Category (in the suggestion's scheme) from each transaction's top suggestion,
+    and one UPDATE points the transactions at them
+
+    Args:
+        scheme (str): Scheme of the suggestions to accept
+        min_confidence (float): If set, only suggestions with a confidence of at least this are accepted (suggestions
+                                without a confidence are never accepted).  The best ranked suggestion that meets this
+                                is accepted
+        descriptions (iterable): If set, only transactions with one of these descriptions are updated
+
+    Side Effects:
+        Adds Category rows and sets Transaction.category_id for the updated transactions
+
+    Returns:
+        (int): Number of transactions updated
+    """
+    suggested = SuggestedCategory.__table__
+    category = Category.__table__
+    trx = Transaction.__table__
+
+    def _candidates(query, suggested_table):
+        query = query.where(suggested_table.c.scheme == scheme)
+        if min_confidence is not None:
+            query = query.where(suggested_table.c.confidence >= min_confidence)
+        return query
+
+    other = suggested.alias("other")
+    top_rank = (_candidates(select([func.min(other.c.rank)]), other)
+                .where(other.c.transaction_id == suggested.c.transaction_id)
+                .as_scalar()
+                )
+    to_accept = (_candidates(select([suggested.c.scheme, suggested.c.category, suggested.c.confidence,
+                                     suggested.c.transaction_id]), suggested)
+                 .select_from(suggested.join(trx, trx.c.id == suggested.c.transaction_id))
+                 .where(trx.c.category_id.is_(None))
+                 .where(suggested.c.rank == top_rank)
+                 )
+    if descriptions is not None:
+        to_accept = to_accept.where(trx.c.description.in_(list(descriptions)))
 
-    # Update anything that is accepted to the accepted scheme
     s = create_session()
-    for c in accepted_categories:
-        c.scheme = scheme
-        s.merge(c)
-        # s.add(c)
-    s.commit()
-    print("updated accepted schemes")
-
-    # Remove anything that is in the accepted scheme but is no longer accepted
-    stale_accepted = (s.query(Category)
-                       .filter(Category.scheme == scheme)
-                       .filter(Category.id.notin_(s.query(Transaction.category_id)))
-                       .all())
-    print(f"len(stale_accepted) = {len(stale_accepted)}")
-    for c in stale_accepted:
-        s.delete(c)
-    s.commit()
-    print("Deleted stale")
+    try:
+        # Categories created by this call are those with an id above the current max
+        max_id = s.execute(select([func.coalesce(func.max(category.c.id), 0)])).scalar()
+        n_updated = s.execute(
+            category.insert().from_select(["scheme", "category", "confidence", "transaction_id"], to_accept)
+        ).rowcount
+
+        new_category_id = (select([category.c.id])
+                           .where(category.c.transaction_id == trx.c.id)
+                           .where(category.c.id > max_id)
+                           .as_scalar()
+                           )
+        s.execute(trx.update()
+                  .values(category_id=new_category_id)
+                  .where(trx.c.category_id.is_(None))
+                  .where(trx.c.id.in_(select([category.c.transaction_id]).where(category.c.id > max_id)))
+                  )
+        s.commit()
+    except Exception:
+        s.rollback()
+        raise
+    finally:
+        s.close()
+    return n_updated
 
 
 @click.group()
@@ -121,7 +305,39 @@ def accept_current(db_path, scheme):
     accept_current_chosen_categories(scheme)
 
 
+@click.command()
+@click.argument("DB_PATH")
+@click.argument("SCHEME")
+@click.option(
+    "--min_confidence",
+    default=None,
+    type=float,
+    help="If set, only accept suggestions with at least this confidence"
+)
+@click.option(
+    "--description",
+    "descriptions",
+    multiple=True,
+    help="If set, only accept suggestions for transactions with this description.  Can be specified multiple times"
+)
+def accept(db_path, scheme, min_confidence, descriptions):
+    """
+    Accept the top suggestion in a scheme as the category of all uncategorized transactions
+
+    Args:\n
+        db_path (str): Path to the DB to be edited\n
+        scheme (str): Scheme of the suggestions to accept
+    """
+    global_init(db_path, False)
+    n_updated = accept_suggestions(scheme,
+                                   min_confidence=min_confidence,
+                                   descriptions=descriptions if descriptions else None,
+                                   )
+    print(f"Accepted suggestions for {n_updated} transactions")
+
+
 cli.add_command(accept_current)
+cli.add_command(accept)
 
 
 if __name__ == '__main__':
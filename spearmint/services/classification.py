@@ -1,15 +1,28 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import click
 import joblib
+import numpy as np
 import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
 
 from spearmint.classifiers.common_usage_classifier import CommonUsageClassifier
+from spearmint.classifiers.featurized_classifier import FeaturizedClassifier
 from spearmint.classifiers.lookup_classifier import LookupClassifier
+from spearmint.classifiers.online_classifier import OnlineClassifier
+from spearmint.classifiers.parallel import ParallelModel
+from spearmint.classifiers.rules_classifier import RulesClassifier
+from spearmint.classifiers.similarity_classifier import SimilarityClassifier
+from spearmint.classifiers.top_k import predict_top_k
 from spearmint.data.category import Category
 from spearmint.data.db_session import create_session, global_init
 from spearmint.data.transaction import Transaction
-from spearmint.services.category import get_categories
+from spearmint.services.category import scheme_exists, write_suggested_categories
+from spearmint.services.classification_server import RemoteModel
 from spearmint.services.transaction import get_transactions_without_category, get_transactions, \
-    transactions_to_dataframe
+    get_transactions_with_category, get_descriptions_by_id, get_labelled_descriptions
 
 
 def classify_by_model(scheme, clf, if_scheme_exists="replace", n_classifications_per_trx=3):
@@ -18,10 +31,12 @@ def classify_by_model(scheme, clf, if_scheme_exists="replace", n_classifications
 
     Args:
         scheme (str): Scheme name to use for suggested categories
-        clf: classification model that has a .predict method for turning descriptions into categories
+        clf: classification model that has a .predict method for turning descriptions into categories.  If it also has
+             .predict_proba and .classes_ (eg: sklearn classifiers), the top n_classifications_per_trx classes are
+             suggested, with their probability stored as the Category.confidence
         if_scheme_exists (str): One of:
-                                    replace: Removes all existing classifications with scheme==scheme and then commits
-                                             the new classifications
+                                    replace: Removes all existing classifications with scheme==scheme, replacing them
+                                             with the new classifications in the same db transaction
                                     raise: Raises a ValueError if any transactions already have suggested categories
                                            with this scheme
                                     ignore: Does nothing (these transactions will then be "added" to the existing ones
@@ -31,54 +46,59 @@ def classify_by_model(scheme, clf, if_scheme_exists="replace", n_classifications
     Side Effects:
         db suggested categories table is updated
 
+    Returns:
+        None
+    """
+    if if_scheme_exists == 'raise' and scheme_exists(scheme):
+        # Check early to avoid an expensive classification.  write_suggested_categories checks again when writing
+        raise ValueError("Scheme already in use")
+
+    descriptions = get_descriptions_by_id()
+
+    predictions, confidences = predict_suggestions(clf, descriptions.to_numpy(), n_classifications_per_trx)
+    rows = predictions_to_category_rows(predictions, transaction_ids=descriptions.index, confidences=confidences)
+
+    write_suggested_categories({scheme: rows}, if_scheme_exists=if_scheme_exists)
+
+
+def classify_by_models(classifiers, if_scheme_exists="replace", n_classifications_per_trx=3, n_threads=1):
+    """
+    Classifies transactions in the DB with several models in one pass, writing all schemes in a single db transaction
+
+    Transactions are read once and shared by all models.  Either every scheme is written or (on any error) none are
+
+    Args:
+        classifiers (dict): {scheme: clf}, where each clf is anything supported by classify_by_model
+        if_scheme_exists (str): See classify_by_model.  Applies to every scheme
+        n_classifications_per_trx (int): Maximum number suggested categories to create per transactions
+        n_threads (int): Number of models to run concurrently.  Threads help where models release the GIL (eg: numpy
+                         and most sklearn predictions) or wait on another process (eg: RemoteModel, ParallelModel)
+
+    Side Effects:
+        db suggested categories table is updated
+
     Returns:
         None
     """
     if if_scheme_exists == 'raise':
-        if get_categories(scheme=scheme):
-            raise ValueError("Scheme already in use")
-        else:
-            suggested_to_delete = []
-    elif if_scheme_exists == 'ignore':
-        suggested_to_delete = []
-    elif if_scheme_exists == 'replace':
-        # Get all suggested categories already in this scheme.  If the classification goes successfully, we will remove
-        # these records
-        # TODO: Delay this till after clf but before committing new categories?
-        suggested_to_delete = [s.id for s in get_categories(scheme=scheme)]
-    else:
-        raise ValueError(f"Invalid value for if_scheme_exists '{if_scheme_exists}")
+        in_use = [scheme for scheme in classifiers if scheme_exists(scheme)]
+        if in_use:
+            raise ValueError(f"Schemes already in use: {in_use}")
 
-    trxs = get_transactions()
+    descriptions = get_descriptions_by_id()
+    x = descriptions.to_numpy()
 
-    df_trxs = transactions_to_dataframe(trxs)
+    def classify(clf):
+        predictions, confidences = predict_suggestions(clf, x, n_classifications_per_trx)
+        return predictions_to_category_rows(predictions, transaction_ids=descriptions.index, confidences=confidences)
 
-    # TODO: Need to change the CommonUsageClassifier to use the sklearn standards...
-    if isinstance(clf, CommonUsageClassifier):
-        predictions = clf.predict(df_trxs['description'], n=n_classifications_per_trx)
+    if n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            rows = list(executor.map(classify, classifiers.values()))
     else:
-        if n_classifications_per_trx != 1:
-            raise NotImplementedError(f"n_classifications_per_trx for general models not yet implemented")
-        predictions = clf.predict(df_trxs['description'])
-        predictions = pd.DataFrame(predictions, index=df_trxs['description'])
-    category_objs_by_trx = predictions_to_category_objs(predictions, scheme=scheme)
+        rows = [classify(clf) for clf in classifiers.values()]
 
-    for trx, this_category_list in zip(trxs, category_objs_by_trx):
-        trx.categories_suggested.extend(this_category_list)
-
-    s = create_session()
-    # This requires a separate insert per category, but bulk_save_objects() doesn't work across relationships.  To speed
-    # this up, I'd have to build my own logic for inserting things separately as bulk ops and then updating them
-    # accordingly(?).  But thankfully the scale I need now is fine as is.
-    s.add_all(trxs)
-    s.commit()
-
-    # Remove old categories that shouldn't be there anymore
-    if suggested_to_delete:
-        # Delete, avoiding the ORM because it'll do each delete separately!
-        delete_q = Category.__table__.delete().where(Category.id.in_(suggested_to_delete))
-        s.execute(delete_q)
-        s.commit()
+    write_suggested_categories(dict(zip(classifiers, rows)), if_scheme_exists=if_scheme_exists)
 
 
 def classify_by_most_common(scheme, if_scheme_exists="replace", n_classifications_per_trx=3):
@@ -110,14 +130,257 @@ def classify_by_most_common(scheme, if_scheme_exists="replace", n_classification
                       )
 
 
-def _to_categories(row, scheme):
-    cat_names = row[row.notna()].values
-    categories = [Category(scheme=scheme, category=cat_name) for cat_name in cat_names]
-    return categories
+def predict_suggestions(clf, x, n=1):
+    """
+    Returns the top n predictions (and their confidences, if available) from a model as DataFrames
 
+    Args:
+        clf: A model with a .predict method.  Four flavours are supported:
+                models with .predict_with_confidence(x, n) (eg: SimilarityClassifier): used directly
+                models with predicts_top_n=True (eg: CommonUsageClassifier, RulesClassifier): uses .predict(x, n=n)
+                    directly (no confidences)
+                models with .predict_proba and .classes_: the top n classes by probability
+                anything else: .predict(x), which only supports n==1
+             Wrappers of another model (eg: ParallelModel, RemoteModel) declare what the wrapped model supports through
+             supports_predict_with_confidence, predicts_top_n and supports_predict_proba
+        x (iterable): 1D iterable of features (likely descriptions)
+        n (int): Number of predictions per feature
 
-def predictions_to_category_objs(predictions, scheme):
-    return predictions.apply(_to_categories, axis=1, scheme=scheme)
+    Returns:
+        (pd.DataFrame, pd.DataFrame or None): Predictions with a row per element of x and columns of rank (0 to n-1),
+                                              and confidences of the same shape (or None if the model does not
+                                              provide them)
+    """
+    # TODO: Need to change the CommonUsageClassifier to use the sklearn standards...
+    if getattr(clf, "supports_predict_with_confidence", hasattr(clf, "predict_with_confidence")):
+        return clf.predict_with_confidence(x, n=n)
+    elif getattr(clf, "predicts_top_n", False):
+        return clf.predict(x, n=n), None
+    elif getattr(clf, "supports_predict_proba", hasattr(clf, "predict_proba")):
+        return predict_top_k(clf, x, k=n)
+    else:
+        if n != 1:
+            raise NotImplementedError(f"n_classifications_per_trx != 1 requires a model with predict_proba")
+        predictions = clf.predict(x)
+        return pd.DataFrame(predictions, index=x), None
+
+
+def predictions_to_category_rows(predictions, transaction_ids, confidences=None):
+    """
+    Returns a list of category row dicts (for a bulk insert) from a DataFrame of predictions
+
+    Args:
+        predictions (pd.DataFrame): Predicted category names, with a row per transaction and columns in order of rank.
+                                    Null entries are skipped
+        transaction_ids (iterable): Transaction id for each row of predictions
+        confidences (pd.DataFrame): Optional confidences of the same shape as predictions
+
+    Returns:
+        (list): List of {"transaction_id": int, "category": str, "rank": int, "confidence": float or None} dicts,
+                ordered by transaction and then rank
+    """
+    labels = predictions.to_numpy(dtype=object)
+    transaction_ids = np.asarray(transaction_ids)
+    if confidences is not None:
+        confidences = confidences.to_numpy(dtype=float)
+
+    # np.nonzero returns row-major order, so rows come out grouped by transaction and ordered by rank
+    row_idx, rank_idx = np.nonzero(~pd.isnull(labels))
+    return [
+        {"transaction_id": int(transaction_ids[i]),
+         "category": labels[i, rank],
+         "rank": int(rank),
+         "confidence": None if confidences is None or np.isnan(confidences[i, rank]) else float(confidences[i, rank]),
+         }
+        for i, rank in zip(row_idx, rank_idx)
+    ]
+
+
+def classify_by_similarity(scheme, if_scheme_exists="replace", n_classifications_per_trx=3, min_similarity=0.3):
+    """
+    Adds suggested categories to all transactions in database based on the categories of similar descriptions
+
+    Suggestions are the accepted categories of the most similar descriptions (by character n-grams), with the
+    similarity stored as the confidence.  Unlike classify_by_most_common, this can suggest categories for descriptions
+    that have never been seen before
+
+    Args:
+        scheme (str): Scheme name to use for suggested categories
+        if_scheme_exists (str): See classify_by_model
+        n_classifications_per_trx (int): Maximum number suggested categories to create per transactions
+        min_similarity (float): Minimum similarity (0 to 1) for a description to be used as a suggestion
+
+    Side Effects:
+        db suggested categories table is updated
+
+    Returns:
+        None
+    """
+    clf = SimilarityClassifier.from_db(min_similarity=min_similarity)
+    classify_by_model(scheme=scheme,
+                      clf=clf,
+                      if_scheme_exists=if_scheme_exists,
+                      n_classifications_per_trx=n_classifications_per_trx
+                      )
+
+
+def classify_by_rules(scheme, rules_file, if_scheme_exists="replace", n_classifications_per_trx=1,
+                      case_sensitive=False):
+    """
+    Adds suggested categories to all transactions in database under scheme name scheme using "contains" rules
+
+    Args:
+        scheme (str): Scheme name to use for suggested categories
+        rules_file (str): Path to a csv of rules.  See RulesClassifier.from_csv
+        if_scheme_exists (str): See classify_by_model
+        n_classifications_per_trx (int): Maximum number suggested categories to create per transactions
+        case_sensitive (bool): If True, rules are matched case-sensitively
+
+    Side Effects:
+        db suggested categories table is updated
+
+    Returns:
+        None
+    """
+    clf = RulesClassifier.from_csv(rules_file, case_sensitive=case_sensitive)
+    classify_by_model(scheme=scheme,
+                      clf=clf,
+                      if_scheme_exists=if_scheme_exists,
+                      n_classifications_per_trx=n_classifications_per_trx
+                      )
+
+
+def train_model(model_path, cache_dir=None, analyzer="char_wb", ngram_range=(2, 4), n_estimators=100,
+                random_state=None):
+    """
+    Trains a text classifier on all transactions with an accepted category and saves it with joblib
+
+    The model is a FeaturizedClassifier (tf-idf description features and a random forest), usable with
+    classify_by_model.  If cache_dir is set, the training feature matrix is cached there (keyed by the description
+    set and vectorizer config) and reused by later training runs on the same descriptions, and predictions from the
+    saved model reuse cached features for descriptions already featurized
+
+    Args:
+        model_path (str): Path to save the trained model to
+        cache_dir (str): Optional directory for cached feature matrices
+        analyzer (str): TfidfVectorizer analyzer ('word', 'char', or 'char_wb')
+        ngram_range (tuple): TfidfVectorizer ngram_range
+        n_estimators (int): Number of trees in the random forest
+        random_state (int): Random state for the random forest
+
+    Returns:
+        (FeaturizedClassifier): The trained model
+    """
+    df = get_transactions_with_category(return_type='df')
+
+    clf = FeaturizedClassifier(
+        vectorizer=TfidfVectorizer(analyzer=analyzer, ngram_range=tuple(ngram_range), lowercase=True),
+        estimator=RandomForestClassifier(n_estimators=n_estimators, n_jobs=-1, random_state=random_state),
+        cache_dir=cache_dir,
+    )
+    clf.fit(df['description'], df['category'])
+    joblib.dump(clf, model_path)
+    return clf
+
+
+# Classifier kinds accepted by parse_classifier_specs, and whether they need an argument
+CLASSIFIER_KINDS = {
+    "model": True,  # model:path_to_joblib_file
+    "rules": True,  # rules:path_to_rules_csv
+    "most-common": False,
+    "similar": False,
+}
+
+
+def parse_classifier_specs(specs, mmap_mode=None):
+    """
+    Returns a {scheme: clf} dict from a list of "scheme=kind[:arg]" strings
+
+    Supported kinds are:
+        model:PATH: A model saved using joblib
+        rules:PATH: A rules csv (see RulesClassifier.from_csv)
+        most-common: CommonUsageClassifier fitted to the accepted categories in the db
+        similar: SimilarityClassifier fitted to the accepted categories in the db
+
+    The accepted categories are read from the db at most once and shared by all classifiers that need them
+
+    Args:
+        specs (iterable): Iterable of str specs, eg: ["rf=model:./rf.joblib", "mc=most-common"]
+        mmap_mode (str): Passed to joblib.load for model specs
+
+    Returns:
+        (dict): {scheme: clf}, in the order of specs
+    """
+    classifiers = {}
+    labelled = None
+    for spec in specs:
+        try:
+            scheme, kind_and_arg = spec.split("=", 1)
+        except ValueError:
+            raise ValueError(f"Expected classifier as scheme=kind[:arg], got '{spec}'")
+        kind, _, arg = kind_and_arg.partition(":")
+        if kind not in CLASSIFIER_KINDS:
+            raise ValueError(f"Unknown classifier kind '{kind}' in '{spec}'.  Expected one of {list(CLASSIFIER_KINDS)}")
+        if CLASSIFIER_KINDS[kind] and not arg:
+            raise ValueError(f"Classifier kind '{kind}' requires an argument, eg: '{scheme}={kind}:path'")
+        if scheme in classifiers:
+            raise ValueError(f"Scheme '{scheme}' specified more than once")
+
+        if kind == "model":
+            clf = joblib.load(arg, mmap_mode=mmap_mode)
+        elif kind == "rules":
+            clf = RulesClassifier.from_csv(arg)
+        else:
+            if labelled is None:
+                labelled = get_labelled_descriptions()
+            clf = CommonUsageClassifier() if kind == "most-common" else SimilarityClassifier()
+            clf.fit(labelled["description"], labelled["category"])
+        classifiers[scheme] = clf
+    return classifiers
+
+
+def update_online_model(model_path, chunk_size=500, **kwargs):
+    """
+    Updates (or creates) a saved OnlineClassifier with only the accepted categories that changed since its last update
+
+    The model remembers the accepted category id it was trained with for each transaction.  On update, only the
+    (transaction id, category id) pairs are read from the db to find new or changed labels, and then only those
+    transactions are loaded and fed to partial_fit.  Relabelled transactions are trained on their new label, but the
+    model is not "untrained" on their old one
+
+    Args:
+        model_path (str): Path to the joblib-saved OnlineClassifier.  If it does not exist, a new model is created
+        chunk_size (int): Number of changed transactions to load and train on at a time
+        kwargs: Passed to OnlineClassifier if creating a new model
+
+    Returns:
+        (int): Number of transactions the model was updated with
+    """
+    if os.path.exists(model_path):
+        clf = joblib.load(model_path)
+    else:
+        clf = OnlineClassifier(**kwargs)
+
+    s = create_session()
+    accepted = s.query(Transaction.id, Transaction.category_id).filter(Transaction.category_id.isnot(None))
+    changed = {trx_id: category_id for trx_id, category_id in accepted
+               if clf.trained_versions.get(trx_id) != category_id}
+
+    changed_ids = list(changed)
+    for i in range(0, len(changed_ids), chunk_size):
+        rows = (s.query(Transaction.description, Category.category)
+                .join(Category, Transaction.category_id == Category.id)
+                .filter(Transaction.id.in_(changed_ids[i:i + chunk_size]))
+                .all()
+                )
+        if rows:
+            descriptions, categories = zip(*rows)
+            clf.partial_fit(descriptions, categories)
+    s.close()
+
+    clf.trained_versions.update(changed)
+    joblib.dump(clf, model_path)
+    return len(changed)
 
 
 def classify_db_by_lookup(label_file, classify_if_not_null=False):
@@ -214,27 +477,274 @@ def classify_by_most_common_cli(db_path, scheme, n_classifications_per_trx, if_s
     type=str,
     help="Define what to do if the scheme exists"
 )
-def classify_by_model_cli(db_path, scheme, model, if_scheme_exists):
+@click.option(
+    "--server",
+    default=None,
+    type=str,
+    help="Address (host:port or Unix socket path) of a running classification server.  If set, MODEL is the name of a "
+         "model resident on the server (if it is not resident and MODEL is a path the server allows, the server loads it "
+         "from there)"
+)
+@click.option(
+    "--mmap_mode",
+    default=None,
+    type=click.Choice(["r", "r+", "c"]),
+    help="If set, memory-map numpy arrays in the model using this joblib mmap_mode"
+)
+@click.option(
+    "--workers",
+    default=1,
+    type=int,
+    help="Number of worker processes to predict with.  If >1, descriptions are split into chunks and predicted in a "
+         "process pool, with each worker loading MODEL once (memory-mapped, unless --mmap_mode is set otherwise)"
+)
+@click.option(
+    "--n_classifications_per_trx",
+    default=1,
+    type=int,
+    help="Number of suggested categories to create per transaction.  Values >1 require a model with predict_proba"
+)
+def classify_by_model_cli(db_path, scheme, model, if_scheme_exists, server, mmap_mode, workers,
+                          n_classifications_per_trx):
     """
     Create suggested categories in a db by using a sklearn model
 
     Args:\n
         db_path (str): Path to the database to classify data in\n
-        scheme (str): Scheme name for the created suggested categories
-        model (str): Path to a model saved using joblib
+        scheme (str): Scheme name for the created suggested categories\n
+        model (str): Path to a model saved using joblib (or name of a model on the classification server)
     """
+    if server and workers > 1:
+        raise click.UsageError("--server and --workers cannot be used together (the server does the predicting)")
     global_init(db_path)
-    clf = joblib.load(model)
+    if server:
+        path = model if os.path.exists(model) else None
+        clf = RemoteModel.from_server(model, address=server, path=path, mmap_mode=mmap_mode)
+    elif workers > 1:
+        clf = ParallelModel(model, n_workers=workers, mmap_mode=mmap_mode if mmap_mode else "r")
+    else:
+        clf = joblib.load(model, mmap_mode=mmap_mode)
     classify_by_model(scheme=scheme,
                       clf=clf,
                       if_scheme_exists=if_scheme_exists,
-                      n_classifications_per_trx=1
+                      n_classifications_per_trx=n_classifications_per_trx
                       )
 
 
+@click.command()
+@click.argument("DB_PATH")
+@click.argument("scheme")
+@click.option(
+    "--n_classifications_per_trx",
+    default=2,
+    type=int,
+    help="Number of suggested categories to create per transaction"
+)
+@click.option(
+    "--if_scheme_exists",
+    default="raise",
+    type=str,
+    help="Define what to do if the scheme exists"
+)
+@click.option(
+    "--min_similarity",
+    default=0.3,
+    type=float,
+    help="Minimum similarity (0 to 1) for a previously categorized description to be used as a suggestion"
+)
+def classify_by_similarity_cli(db_path, scheme, n_classifications_per_trx, if_scheme_exists, min_similarity):
+    """
+    Create suggested categories in a db from the accepted categories of the most similar descriptions
+
+    Args:\n
+        db_path (str): Path to the database to classify data in\n
+        scheme (str): Scheme name for the created suggested categories
+    """
+    global_init(db_path)
+    classify_by_similarity(scheme=scheme,
+                           if_scheme_exists=if_scheme_exists,
+                           n_classifications_per_trx=n_classifications_per_trx,
+                           min_similarity=min_similarity,
+                           )
+
+
+@click.command()
+@click.argument("DB_PATH")
+@click.argument("scheme")
+@click.argument("RULES_FILE")
+@click.option(
+    "--n_classifications_per_trx",
+    default=1,
+    type=int,
+    help="Number of suggested categories to create per transaction"
+)
+@click.option(
+    "--if_scheme_exists",
+    default="raise",
+    type=str,
+    help="Define what to do if the scheme exists"
+)
+@click.option(
+    "--case_sensitive",
+    is_flag=True,
+    default=False,
+    help="If set, match rule patterns case-sensitively"
+)
+def classify_by_rules_cli(db_path, scheme, rules_file, n_classifications_per_trx, if_scheme_exists, case_sensitive):
+    """
+    Create suggested categories in a db from "description contains pattern -> category" rules
+
+    Args:\n
+        db_path (str): Path to the database to classify data in\n
+        scheme (str): Scheme name for the created suggested categories\n
+        rules_file (str): Path to a csv with columns of Pattern, Category, and (optionally) Priority.  Where several
+                          rules match, the highest priority wins
+    """
+    global_init(db_path)
+    classify_by_rules(scheme=scheme,
+                      rules_file=rules_file,
+                      if_scheme_exists=if_scheme_exists,
+                      n_classifications_per_trx=n_classifications_per_trx,
+                      case_sensitive=case_sensitive,
+                      )
+
+
+@click.command()
+@click.argument("DB_PATH")
+@click.argument("MODEL_PATH")
+@click.option(
+    "--cache_dir",
+    default=None,
+    type=str,
+    help="Directory to cache description feature matrices in.  If set, training and later predictions reuse features "
+         "for descriptions that have already been featurized"
+)
+@click.option(
+    "--analyzer",
+    default="char_wb",
+    type=click.Choice(["word", "char", "char_wb"]),
+    help="Whether description features are made from word or character n-grams"
+)
+@click.option(
+    "--ngram_range",
+    default=(2, 4),
+    nargs=2,
+    type=int,
+    help="Min and max n-gram length for description features"
+)
+@click.option(
+    "--n_estimators",
+    default=100,
+    type=int,
+    help="Number of trees in the random forest"
+)
+def train_model_cli(db_path, model_path, cache_dir, analyzer, ngram_range, n_estimators):
+    """
+    Train a description classifier on all transactions with an accepted category and save it using joblib
+
+    The saved model can be used with the model command
+
+    Args:\n
+        db_path (str): Path to the database to train from\n
+        model_path (str): Path to save the model to
+    """
+    global_init(db_path)
+    train_model(model_path=model_path,
+                cache_dir=cache_dir,
+                analyzer=analyzer,
+                ngram_range=ngram_range,
+                n_estimators=n_estimators,
+                )
+
+
+@click.command()
+@click.argument("DB_PATH")
+@click.argument("MODEL_PATH")
+@click.option(
+    "--analyzer",
+    default="char_wb",
+    type=click.Choice(["word", "char", "char_wb"]),
+    help="Whether description features are made from word or character n-grams.  Only used when creating a new model"
+)
+@click.option(
+    "--n_features",
+    default=2 ** 18,
+    type=int,
+    help="Number of hashed description features.  Only used when creating a new model"
+)
+def update_online_model_cli(db_path, model_path, analyzer, n_features):
+    """
+    Update an online-learning model with transactions whose accepted category changed since its last update
+
+    If MODEL_PATH does not exist, a new model is trained on all accepted categories.  The saved model can be used with
+    the model command
+
+    Args:\n
+        db_path (str): Path to the database to train from\n
+        model_path (str): Path to the model, saved using joblib
+    """
+    global_init(db_path)
+    n_updated = update_online_model(model_path, analyzer=analyzer, n_features=n_features)
+    print(f"Updated model with {n_updated} transactions")
+
+
+@click.command()
+@click.argument("DB_PATH")
+@click.argument("CLASSIFIERS", nargs=-1, required=True)
+@click.option(
+    "--n_classifications_per_trx",
+    default=1,
+    type=int,
+    help="Number of suggested categories to create per transaction"
+)
+@click.option(
+    "--if_scheme_exists",
+    default="raise",
+    type=str,
+    help="Define what to do if any of the schemes exist"
+)
+@click.option(
+    "--threads",
+    default=1,
+    type=int,
+    help="Number of classifiers to run concurrently"
+)
+@click.option(
+    "--mmap_mode",
+    default=None,
+    type=click.Choice(["r", "r+", "c"]),
+    help="If set, memory-map numpy arrays in model classifiers using this joblib mmap_mode"
+)
+def classify_by_models_cli(db_path, classifiers, n_classifications_per_trx, if_scheme_exists, threads, mmap_mode):
+    """
+    Create suggested categories for several schemes in one pass, reading transactions once and writing all schemes in
+    a single db transaction
+
+    Args:\n
+        db_path (str): Path to the database to classify data in\n
+        classifiers (str): One or more classifiers, each as scheme=kind[:arg] with kind one of model:PATH,
+                           rules:PATH, most-common, or similar.  Eg: rf=model:./rf.joblib mc=most-common
+    """
+    global_init(db_path)
+    try:
+        clfs = parse_classifier_specs(classifiers, mmap_mode=mmap_mode)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    classify_by_models(clfs,
+                       if_scheme_exists=if_scheme_exists,
+                       n_classifications_per_trx=n_classifications_per_trx,
+                       n_threads=threads,
+                       )
+
+
 cli.add_command(classify_db_by_lookup_cli, name="lookup")
 cli.add_command(classify_by_most_common_cli, name="most-common")
 cli.add_command(classify_by_model_cli, name="model")
+cli.add_command(classify_by_models_cli, name="multi")
+cli.add_command(classify_by_rules_cli, name="rules")
+cli.add_command(classify_by_similarity_cli, name="similar")
+cli.add_command(train_model_cli, name="train")
+cli.add_command(update_online_model_cli, name="online")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,475 @@
+"""
+A long-running local process that keeps classification models resident in memory
+
+Loading large models (eg: random forests saved with joblib) can take seconds, which dominates short classification
+runs and makes interactive suggestions impractical.  A ClassificationServer loads models once and then answers batch
+predict requests from other processes over a local socket (a Unix socket path or a localhost host:port), for example:
+
+    # Start the server with a model preloaded
+    python -m spearmint.services.classification_server serve --address localhost:6543 --model rf=./secrets/rf.joblib
+
+    # Classify using the resident model rather than loading it again
+    python -m spearmint.services.classification model db.sqlite rf rf --server localhost:6543
+
+Requests are pickled, so anyone who can connect can run code as the server's user.  To limit who can connect:
+    * The server only binds to loopback addresses (or Unix sockets)
+    * On startup, the server writes a random authentication key to a file readable only by its user (see
+      get_authkey_file).  Clients read the key from there, so only processes of the same user can connect
+    * Clients can only ask the server to load models from paths allowed when the server was started
+"""
+import ipaddress
+import os
+import secrets
+
+import click
+import joblib
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+DEFAULT_ADDRESS = "localhost:6543"
+
+# Directory for the authentication keys of TCP servers (Unix socket servers keep theirs next to the socket)
+AUTHKEY_DIR = os.path.join(os.path.expanduser("~"), ".spearmint")
+AUTHKEY_BYTES = 32
+
+
+def parse_address(address):
+    """
+    Returns a multiprocessing.connection address from a string of "host:port" or a Unix socket path
+
+    Only loopback hosts are allowed, as the server should never be reachable from other machines
+
+    Args:
+        address (str): Either "host:port" (eg: "localhost:6543") or a path to a Unix socket (eg: "/tmp/spearmint.sock")
+
+    Returns:
+        (tuple or str): (host, port) tuple for a TCP socket, or a str path for a Unix socket
+    """
+    if os.sep in address or ":" not in address:
+        return address
+    host, port = address.rsplit(":", 1)
+    host = host.strip("[]")
+    if host != "localhost":
+        try:
+            is_loopback = ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            is_loopback = False
+        if not is_loopback:
+            raise ValueError(f"Classification server address must be localhost, a loopback IP or a Unix socket path, "
+                             f"got '{address}'")
+    return host, int(port)
+
+
+def get_authkey_file(address):
+    """
+    Returns the default path of the authentication key file for a server at address
+
+    For a Unix socket this is the socket path plus ".key", otherwise a file per port in AUTHKEY_DIR
+    """
+    address = parse_address(address)
+    if isinstance(address, str):
+        return f"{address}.key"
+    return os.path.join(AUTHKEY_DIR, f"classification_server_{address[1]}.key")
+
+
+def write_authkey(path):
+    """
+    Writes a new random authentication key to path, readable and writable only by the current user
+
+    Returns:
+        (bytes) the key
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    authkey = secrets.token_bytes(AUTHKEY_BYTES)
+
+    # Create the file with restrictive permissions from the start (never readable by others, even briefly) and move it
+    # into place so clients never read a partial key
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as fout:
+        fout.write(authkey)
+    os.replace(tmp_path, path)
+    return authkey
+
+
+def read_authkey(path):
+    """
+    Returns the authentication key written by write_authkey to path
+    """
+    try:
+        with open(path, "rb") as fin:
+            return fin.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No classification server authentication key at {path}.  Is the server running (as "
+                                f"this user)?")
+
+
+class ClassificationServer:
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None, authkey_file=None, allowed_model_paths=()):
+        """
+        Server that holds named classification models in memory and serves predictions from them
+
+        Requests are dicts sent via multiprocessing.connection, with an "action" key and action-specific arguments (see
+        handle()).  Responses are dicts of {"result": ...} or {"error": "message"}
+
+        Args:
+            address (str): "host:port" or Unix socket path to listen on
+            authkey (bytes): Authentication key that clients must also use.  If None, a random key is generated and
+                             written to authkey_file for clients to read
+            authkey_file (str): Path to write the generated authkey to.  Defaults to get_authkey_file(address)
+            allowed_model_paths (iterable): Paths that clients may ask the server to load models from
+        """
+        self.address = parse_address(address)
+        if authkey is None:
+            authkey = write_authkey(authkey_file or get_authkey_file(address))
+        self.authkey = authkey
+        self.allowed_model_paths = {os.path.realpath(path) for path in allowed_model_paths}
+        self.models = {}
+        self._running = False
+
+    def load_model(self, name, path, mmap_mode=None):
+        """
+        Loads a joblib-saved model from path and keeps it resident as name, replacing any existing model of that name
+
+        Args:
+            name (str): Name to store the model under
+            path (str): Path to a model saved with joblib.dump
+            mmap_mode (str): Passed to joblib.load.  If "r", large numpy arrays in the model are memory-mapped rather
+                             than read into memory
+
+        Returns:
+            None
+        """
+        self.models[name] = joblib.load(path, mmap_mode=mmap_mode)
+
+    def predict(self, name, x, n=None):
+        """
+        Returns predictions from the resident model name for x
+
+        Args:
+            name (str): Name of a loaded model
+            x (list): Features to predict on (likely a list of descriptions)
+            n (int): Number of predictions per feature.  Only used for models that natively support n (those with
+                     predicts_top_n, eg: CommonUsageClassifier and RulesClassifier).  If None, those models return all
+                     their predictions
+
+        Returns:
+            The return of the model's .predict
+        """
+        clf = self.models[name]
+        if getattr(clf, "predicts_top_n", False):
+            return clf.predict(x, n=n)
+        else:
+            return clf.predict(x)
+
+    def describe(self, name):
+        """
+        Returns a dict describing the resident model name, eg:
+            {"type": "RandomForestClassifier", "predict_proba": True, "predicts_top_n": False}
+        """
+        clf = self.models[name]
+        return {
+            "type": type(clf).__name__,
+            "predict_proba": hasattr(clf, "predict_proba"),
+            "predicts_top_n": getattr(clf, "predicts_top_n", False),
+        }
+
+    def predict_proba(self, name, x):
+        """
+        Returns (predict_proba, classes_) from the resident model name for x
+        """
+        clf = self.models[name]
+        return clf.predict_proba(x), clf.classes_
+
+    def handle(self, request):
+        """
+        Returns the result of a single request dict
+
+        Supported requests:
+            {"action": "load", "name": str, "path": str, "mmap_mode": str or None}
+            {"action": "predict", "name": str, "x": list, "n": int or None}
+            {"action": "predict_proba", "name": str, "x": list}
+            {"action": "describe", "name": str}
+            {"action": "list"}
+            {"action": "shutdown"}
+        """
+        action = request.get("action")
+        if action == "predict":
+            return self.predict(request["name"], request["x"], request.get("n"))
+        elif action == "predict_proba":
+            return self.predict_proba(request["name"], request["x"])
+        elif action == "load":
+            # Loading unpickles the file, so only allow paths the server was configured with
+            if os.path.realpath(request["path"]) not in self.allowed_model_paths:
+                raise PermissionError(f"Loading models from '{request['path']}' is not allowed.  Start the server "
+                                      f"with this path allowed to load it")
+            self.load_model(request["name"], request["path"], request.get("mmap_mode"))
+            return None
+        elif action == "describe":
+            return self.describe(request["name"])
+        elif action == "list":
+            return sorted(self.models)
+        elif action == "shutdown":
+            self._running = False
+            return None
+        else:
+            raise ValueError(f"Unknown action '{action}'")
+
+    def serve_forever(self):
+        """
+        Serves requests until a shutdown request is received
+
+        Connections are handled one at a time.  Each connection can send any number of requests before closing.  Failed
+        connections (eg: a wrong authkey, or a client that disconnects mid-handshake) are logged and skipped
+        """
+        self._running = True
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"Classification server listening on {listener.address}")
+            while self._running:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, OSError) as e:
+                    # ConnectionError is an OSError
+                    print(f"Rejected connection: {type(e).__name__}: {e}")
+                    continue
+                with conn:
+                    self._serve_connection(conn)
+        print("Classification server shut down")
+
+    def _serve_connection(self, conn):
+        while self._running:
+            try:
+                request = conn.recv()
+            except EOFError:
+                # Client closed the connection
+                return
+            except OSError as e:
+                print(f"Dropped connection: {type(e).__name__}: {e}")
+                return
+            try:
+                response = {"result": self.handle(request)}
+            except Exception as e:
+                response = {"error": f"{type(e).__name__}: {e}"}
+            try:
+                conn.send(response)
+            except OSError as e:
+                print(f"Dropped connection: {type(e).__name__}: {e}")
+                return
+
+
+class ClassificationClient:
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None, authkey_file=None):
+        """
+        Client for a ClassificationServer
+
+        Args:
+            address (str): "host:port" or Unix socket path of a running ClassificationServer
+            authkey (bytes): Authentication key used by the server.  If None, it is read from authkey_file
+            authkey_file (str): Path to read the authkey from.  Defaults to get_authkey_file(address)
+        """
+        self.address = parse_address(address)
+        if authkey is None:
+            authkey = read_authkey(authkey_file or get_authkey_file(address))
+        self.authkey = authkey
+
+    def _request(self, **request):
+        with Client(self.address, authkey=self.authkey) as conn:
+            conn.send(request)
+            response = conn.recv()
+        if "error" in response:
+            raise RuntimeError(f"Classification server raised {response['error']}")
+        return response["result"]
+
+    def load_model(self, name, path, mmap_mode=None):
+        return self._request(action="load", name=name, path=path, mmap_mode=mmap_mode)
+
+    def list_models(self):
+        return self._request(action="list")
+
+    def describe(self, name):
+        return self._request(action="describe", name=name)
+
+    def predict(self, name, x, n=None):
+        return self._request(action="predict", name=name, x=list(x), n=n)
+
+    def predict_proba(self, name, x):
+        return self._request(action="predict_proba", name=name, x=list(x))
+
+    def shutdown(self):
+        return self._request(action="shutdown")
+
+
+class RemoteModel:
+    def __init__(self, name, client):
+        """
+        A model with a sklearn-like .predict that is served by a ClassificationServer rather than loaded locally
+
+        Args:
+            name (str): Name of the model on the server
+            client (ClassificationClient): Client connected to the server
+        """
+        self.name = name
+        self.client = client
+        self.classes_ = None
+
+        description = client.describe(name)
+        # Whether the served model supports predict_proba (and thus top-k suggestions with confidence)
+        self.supports_predict_proba = description["predict_proba"]
+        # Whether the served model's predict natively returns its top n predictions (see ClassificationServer.predict)
+        self.predicts_top_n = description["predicts_top_n"]
+
+    def predict(self, x, n=None):
+        """
+        Returns the served model's predictions for x.  n is only used if the model predicts_top_n
+        """
+        return self.client.predict(self.name, x, n=n)
+
+    def predict_proba(self, x):
+        proba, self.classes_ = self.client.predict_proba(self.name, x)
+        return proba
+
+    @classmethod
+    def from_server(cls, name, address=DEFAULT_ADDRESS, path=None, mmap_mode=None):
+        """
+        Returns a RemoteModel for name, asking the server to load it from path if it is not already resident
+
+        Args:
+            name (str): Name of the model on the server
+            address (str): Address of the server
+            path (str): Optional path to a joblib-saved model, used only if name is not already loaded
+            mmap_mode (str): See ClassificationServer.load_model
+
+        Returns:
+            RemoteModel
+        """
+        client = ClassificationClient(address)
+        if name not in client.list_models():
+            if path is None:
+                raise KeyError(f"Model '{name}' is not loaded on the server and no path was given to load it from")
+            client.load_model(name, path, mmap_mode=mmap_mode)
+        return cls(name, client)
+
+
+@click.group()
+def cli():
+    pass
+
+
+def _parse_model_specs(model_specs):
+    """
+    Returns a {name: path} dict from a list of "name=path" strings
+    """
+    models = {}
+    for spec in model_specs:
+        try:
+            name, path = spec.split("=", 1)
+        except ValueError:
+            raise click.BadParameter(f"Expected model as name=path, got '{spec}'")
+        models[name] = path
+    return models
+
+
+@click.command()
+@click.option(
+    "--address",
+    default=DEFAULT_ADDRESS,
+    help="host:port or Unix socket path of the server"
+)
+@click.option(
+    "--model",
+    "model_specs",
+    multiple=True,
+    help="Model to preload, specified as name=path_to_joblib_file.  Can be specified multiple times"
+)
+@click.option(
+    "--allow_model_path",
+    "allowed_model_paths",
+    multiple=True,
+    help="Path that clients may ask the server to load a model from (see the load command).  Paths of --model are "
+         "always allowed.  Can be specified multiple times"
+)
+@click.option(
+    "--mmap_mode",
+    default=None,
+    type=click.Choice(["r", "r+", "c"]),
+    help="If set, memory-map numpy arrays in loaded models using this joblib mmap_mode"
+)
+def serve(address, model_specs, allowed_model_paths, mmap_mode):
+    """
+    Run a classification server that keeps models resident in memory
+
+    The server only listens on localhost (or a Unix socket).  Clients authenticate with a random key that the server
+    writes to a file only readable by its user
+    """
+    model_specs = _parse_model_specs(model_specs)
+    server = ClassificationServer(address, allowed_model_paths=list(allowed_model_paths) + list(model_specs.values()))
+    for name, path in model_specs.items():
+        print(f"Loading model '{name}' from {path}")
+        server.load_model(name, path, mmap_mode=mmap_mode)
+    server.serve_forever()
+
+
+@click.command()
+@click.option(
+    "--address",
+    default=DEFAULT_ADDRESS,
+    help="host:port or Unix socket path of the server"
+)
+@click.argument("NAME")
+@click.argument("PATH")
+@click.option(
+    "--mmap_mode",
+    default=None,
+    type=click.Choice(["r", "r+", "c"]),
+    help="If set, memory-map numpy arrays in the loaded model using this joblib mmap_mode"
+)
+def load(address, name, path, mmap_mode):
+    """
+    Load (or replace) a model on a running classification server
+
+    PATH must have been allowed when the server was started (see serve's --allow_model_path)
+
+    Args:\n
+        name (str): Name to store the model under\n
+        path (str): Path to a model saved using joblib
+    """
+    ClassificationClient(address).load_model(name, path, mmap_mode=mmap_mode)
+
+
+@click.command(name="list")
+@click.option(
+    "--address",
+    default=DEFAULT_ADDRESS,
+    help="host:port or Unix socket path of the server"
+)
+def list_models(address):
+    """
+    List models resident on a running classification server
+    """
+    for name in ClassificationClient(address).list_models():
+        print(name)
+
+
+@click.command()
+@click.option(
+    "--address",
+    default=DEFAULT_ADDRESS,
+    help="host:port or Unix socket path of the server"
+)
+def shutdown(address):
+    """
+    Stop a running classification server
+    """
+    ClassificationClient(address).shutdown()
+
+
+cli.add_command(serve)
+cli.add_command(load)
+cli.add_command(list_models)
+cli.add_command(shutdown)
+
+
+if __name__ == '__main__':
+    cli()
@@ -1,4 +1,5 @@
 from typing import List
+import numpy as np
 import pandas as pd
 import click
 from sqlalchemy import inspect
@@ -6,6 +7,7 @@ from sqlalchemy.orm import joinedload
 
 from spearmint.data.category import Category
 from spearmint.data.db_session import create_session, global_init
+from spearmint.data.suggested_category import SuggestedCategory
 from spearmint.data.transaction import Transaction
 from spearmint.etl.transaction_extractor import PARSED_NAME_MAP
 from spearmint.etl.transaction_extractor import TransactionExtractor
@@ -22,14 +24,7 @@ def dataframe_to_transactions(df: pd.DataFrame, accept_category: bool = False, c
 
 
 def _row_dict_to_transaction(row_dict: dict, column_name_map: dict, accept_category: bool = False):
-    # If we have a category specified in the file, create a Category instance
-    if row_dict[column_name_map["category"]]:
-        category = Category(
-            scheme=FROM_FILE,
-            category=row_dict[column_name_map["category"]],
-        )
-    else:
-        category = None
+    category = row_dict[column_name_map["category"]]
 
     transaction = Transaction(
         datetime=row_dict[column_name_map["datetime"]],
@@ -39,21 +34,27 @@ def _row_dict_to_transaction(row_dict: dict, column_name_map: dict, accept_categ
         source_file=row_dict[column_name_map["source_file"]],
     )
 
+    # If we have a category specified in the file, add it as a suggestion (and optionally accept it)
     if category:
-        transaction.categories_suggested.append(category)
+        transaction.categories_suggested.append(SuggestedCategory(scheme=FROM_FILE, rank=0, category=category))
 
         if accept_category:
-            transaction.category = category
+            transaction.category = Category(scheme=FROM_FILE, category=category)
     return transaction
 
 
-def add_transactions_from_dataframe(df: pd.DataFrame, accept_category: bool = False):
+def add_transactions_from_dataframe(df: pd.DataFrame, accept_category: bool = False, classifiers: dict = None,
+                                    n_classifications_per_trx: int = 1):
     """
     Puts rows of df to the transactions db, with any categories added as suggested categories in the category table
 
     Optionally, can accept the categories and attach them to transactions as the selected category.  Otherwise, accepted
     category is left blank
 
+    Optionally, can also classify the new transactions as they are added.  Only the new transactions are classified,
+    and their suggested categories are inserted in the same db transaction as the transactions themselves, so they
+    never exist without their suggestions
+
     TODO: This is directly tied to the transaction extractor (implicitly linked by assuming the df naming conventions),
           should this just be a method on that class?  Or, I should move the nomenclature definition somewhere central
 
@@ -61,6 +62,10 @@ def add_transactions_from_dataframe(df: pd.DataFrame, accept_category: bool = Fa
         df (pd.DataFrame): Pandas dataframe with rows of transactions
         accept_category (bool): If True, any categories in the DataFrame will also be "accepted" on the committed
                                 transactions
+        classifiers (dict): Optional {scheme: clf} of classifiers to suggest categories for the new transactions with,
+                            where each clf is anything supported by services.classification.classify_by_model.  New
+                            suggestions are added alongside any existing suggestions in each scheme
+        n_classifications_per_trx (int): Maximum number suggested categories to create per transaction and scheme
 
     Returns:
         None
@@ -68,9 +73,32 @@ def add_transactions_from_dataframe(df: pd.DataFrame, accept_category: bool = Fa
     transactions = dataframe_to_transactions(df, accept_category)
 
     s = create_session()
-    s.add_all(transactions)
-    s.commit()
-    s.close()
+    try:
+        s.add_all(transactions)
+        if classifiers and transactions:
+            # Flush so the new transactions have ids, without committing them yet
+            s.flush()
+            _add_suggestions_in_session(s, transactions, classifiers, n_classifications_per_trx)
+        s.commit()
+    except Exception:
+        s.rollback()
+        raise
+    finally:
+        s.close()
+
+
+def _add_suggestions_in_session(s, transactions, classifiers, n_classifications_per_trx):
+    # Imported here because services.classification imports this module
+    from spearmint.services.classification import predict_suggestions, predictions_to_category_rows
+
+    descriptions = np.array([trx.description for trx in transactions], dtype=object)
+    transaction_ids = [trx.id for trx in transactions]
+    table = SuggestedCategory.__table__
+    for scheme, clf in classifiers.items():
+        predictions, confidences = predict_suggestions(clf, descriptions, n_classifications_per_trx)
+        rows = predictions_to_category_rows(predictions, transaction_ids=transaction_ids, confidences=confidences)
+        if rows:
+            s.execute(table.insert().values(scheme=scheme), rows)
 
 
 def get_transactions_without_category() -> List[Transaction]:
@@ -85,6 +113,41 @@ def get_transactions_with_category(return_type='list', lazy=False) -> List[Trans
     return get_transactions(return_type=return_type, lazy=lazy, filters=(Transaction.category.has(),))
 
 
+def get_descriptions_by_id() -> pd.Series:
+    """
+    Returns the description of every transaction as a pd.Series indexed by transaction id
+
+    Only the id and description columns are queried, so this is much cheaper than get_transactions() when that is all
+    that is needed (eg: for classification)
+    """
+    s = create_session()
+    rows = s.query(Transaction.id, Transaction.description).order_by(Transaction.id).all()
+    s.close()
+    ids = [r[0] for r in rows]
+    descriptions = [r[1] for r in rows]
+    return pd.Series(descriptions, index=pd.Index(ids, name="id"), name="description", dtype=object)
+
+
+def get_labelled_descriptions() -> pd.DataFrame:
+    """
+    Returns the description and accepted category name of every transaction with an accepted category
+
+    Only those two columns are queried, so this is much cheaper than get_transactions_with_category(return_type='df')
+    when that is all that is needed (eg: for fitting a classifier)
+
+    Returns:
+        (pd.DataFrame): DataFrame with columns of description and category
+    """
+    s = create_session()
+    rows = (s.query(Transaction.description, Category.category)
+            .join(Category, Transaction.category_id == Category.id)
+            .order_by(Transaction.id)
+            .all()
+            )
+    s.close()
+    return pd.DataFrame(rows, columns=["description", "category"])
+
+
 def get_transaction_by_id(transaction_id) -> Transaction:
     s = create_session()
     trx = s.query(Transaction).filter(Transaction.id == transaction_id).first()
@@ -97,18 +160,17 @@ def get_unique_transaction_categories_as_string(category_type='all') -> List[str
     Returns list of all unique categories used in the transaction table as string category labels
 
     Args:
-        category_type (str): all: returns all unique category names from the category table
+        category_type (str): all: returns all unique category names from the accepted and suggested categories
                              accepted: returns only category names from "accepted" categories in the transaction table
     """
     s = create_session()
     if category_type == 'all':
-        categories = s.query(Category.category).distinct().all()
+        categories = s.query(Category.category).union(s.query(SuggestedCategory.category)).all()
     elif category_type == 'accepted':
-        accepted_cat_ids = flatten(s.query(Transaction.category_id).all())
         categories = (s.query(Category.category)
-                       .filter(Category.id.in_(accepted_cat_ids))
-                       .distinct()
-                       .all()
+                      .join(Transaction, Transaction.category_id == Category.id)
+                      .distinct()
+                      .all()
                       )
     else:
         raise ValueError(f"Unsupported category_type '{category_type}'")
@@ -261,7 +323,20 @@ def cli():
     default=False,
     help="Optionally accept categories loaded as accepted categories"
 )
-def add(db_path, csv_file, csv_flavor, account_name, accept):
+@click.option(
+    "--classify",
+    "classifier_specs",
+    multiple=True,
+    help="Classifier to suggest categories for the new transactions with, as scheme=kind[:arg] (see the classification "
+         "multi command).  Can be specified multiple times"
+)
+@click.option(
+    "--n_classifications_per_trx",
+    default=1,
+    type=int,
+    help="Number of suggested categories to create per new transaction and --classify scheme"
+)
+def add(db_path, csv_file, csv_flavor, account_name, accept, classifier_specs, n_classifications_per_trx):
     """
     Add transactions to a database from a csv file, creating the database if required
 
@@ -279,7 +354,20 @@ def add(db_path, csv_file, csv_flavor, account_name, accept):
 
     print(df)
 
-    add_transactions_from_dataframe(df, accept_category=accept)
+    classifiers = None
+    if classifier_specs:
+        # Imported here because services.classification imports this module
+        from spearmint.services.classification import parse_classifier_specs
+        try:
+            classifiers = parse_classifier_specs(classifier_specs)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+
+    add_transactions_from_dataframe(df,
+                                    accept_category=accept,
+                                    classifiers=classifiers,
+                                    n_classifications_per_trx=n_classifications_per_trx,
+                                    )
 
 
 def import_csv_as_df(csv_file, csv_flavor, account_name=None):
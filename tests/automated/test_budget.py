@@ -1,4 +1,9 @@
-from spearmint.data_structures.budget import BudgetCollection, Budget
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from spearmint.data_structures.budget import BudgetCollection, Budget, FrozenBudget, FrozenBudgetCollection
 import pytest
 
 
@@ -124,3 +129,194 @@ def test_budget_aggregate_categories_to_budget():
     assert [b.name] * len(categories) + [None, None] == b.aggregate_categories_to_budget(
         categories + ["not a category", "also not a category"]
     )
+
+
+def test_budget_collection_index_invalidated_by_nested_add():
+    sample = sample_bc()
+    bc = sample['bc']
+    bc_even = sample['bc_even']
+
+    # Build the index before modifying a nested collection
+    assert bc.get_budget_names(depth=1) == ['even', 'odd'] + [f'budget-{i}' for i in (0, 2, 4, 1, 3, 5)]
+    assert bc.aggregate_categories_to_budget(['new-category']) == [None]
+
+    new_budget = Budget(10, ['new-category'], name='new budget')
+    bc_even.add_budget(new_budget)
+
+    assert 'new-category' in bc.categories
+    assert bc.get_leaf_budgets()[3] == new_budget
+    assert bc.get_budget_by_name('new budget') == new_budget
+    assert bc.aggregate_categories_to_budget(['new-category']) == ['new budget']
+    assert bc.aggregate_categories_to_budget(['new-category'], depth='child') == ['even']
+    assert bc.aggregate_categories_to_budget(['new-category'], depth='this') == ['top']
+    assert bc.categories_flat_dict['even'] == ['budget-0', 'budget-2', 'budget-4', 'new budget']
+    assert 'new budget' in bc.get_budget_names(depth=1)
+
+
+def test_budget_collection_index_returns_copies():
+    sample = sample_bc()
+    bc = sample['bc']
+    leaf_categories = sample['leaf_categories']
+
+    bc.categories.append('not a category')
+    bc.get_leaf_budgets().clear()
+    bc.categories_flat_dict['top'].append('not a budget')
+
+    assert sorted(bc.categories) == sorted(leaf_categories)
+    assert len(bc.get_leaf_budgets()) == 6
+    assert bc.categories_flat_dict['top'] == ['even', 'odd']
+
+
+def test_budget_collection_pickle_round_trip():
+    sample = sample_bc()
+    bc = pickle.loads(pickle.dumps(sample['bc']))
+
+    assert bc == sample['bc']
+
+    # Parent links survive the round trip, so nested changes still invalidate the parent
+    bc.get_budget_by_name('even').add_budget(Budget(10, ['new-category'], name='new budget'))
+    assert bc.aggregate_categories_to_budget(['new-category']) == ['new budget']
+
+
+@pytest.mark.parametrize("as_type", [list, np.array, pd.Series, lambda x: pd.Series(x, dtype="category")])
+@pytest.mark.parametrize("depth", ['leaf', 'child', 'this'])
+def test_budget_collection_aggregate_categories_to_budget_codes(as_type, depth):
+    sample = sample_bc()
+    bc = sample['bc']
+    categories = sample['leaf_categories'] + ["Not a cat", None]
+
+    expected = bc.aggregate_categories_to_budget(categories, depth=depth)
+    budgets = bc.aggregate_categories_to_budget_codes(as_type(categories), depth=depth)
+
+    assert isinstance(budgets, pd.Categorical)
+    assert [None if pd.isna(b) else b for b in budgets] == expected
+    assert list(budgets.codes[-2:]) == [-1, -1]
+
+
+def test_budget_aggregate_categories_to_budget_codes():
+    sample = sample_b()
+    categories = sample['categories']
+    b = sample['b']
+
+    budgets = b.aggregate_categories_to_budget_codes(pd.Series(categories + ["not a category"]))
+    assert list(budgets.codes) == [0] * len(categories) + [-1]
+    assert list(budgets.categories) == [b.name]
+
+
+def test_budget_collection_add_budget_raises_on_nested_duplicates():
+    sample = sample_bc()
+    bc = sample['bc']
+    bc_even = sample['bc_even']
+
+    # Category already in a grandchild
+    with pytest.raises(ValueError):
+        bc.add_budget(Budget(1, ['category_0-0'], name='duplicate category'))
+
+    # Budget name shared with a grandchild, nested inside the added collection
+    nested = BudgetCollection('nested')
+    nested.add_budget(Budget(1, ['new-category'], name='budget-1'))
+    with pytest.raises(ValueError):
+        bc.add_budget(nested)
+
+    # Names added to a nested collection after it was added are known to its parents
+    bc_even.add_budget(Budget(1, ['new-category'], name='new budget'))
+    with pytest.raises(ValueError):
+        bc.add_budget(Budget(1, ['new-category'], name='another new budget'))
+
+    # Renaming a nested collection frees its old name
+    bc_even.name = 'renamed'
+    bc.add_budget(Budget(1, ['even'], name='even budget'))
+    with pytest.raises(ValueError):
+        bc.add_budget(Budget(1, ['renamed'], name='renamed budget'))
+
+    # raise_on_duplicate=False still allows duplicates
+    bc.add_budget(Budget(1, ['category_0-0'], name='duplicate category'), raise_on_duplicate=False)
+    assert bc.has_duplicates()
+
+
+def test_budget_collection_freeze():
+    sample = sample_bc()
+    bc = sample['bc']
+    frozen = bc.freeze()
+
+    assert isinstance(frozen, FrozenBudgetCollection)
+    assert isinstance(frozen.get_budget_by_name('budget-0'), FrozenBudget)
+    assert frozen.categories == bc.categories
+    assert frozen.categories_flat_dict == bc.categories_flat_dict
+    assert frozen.get_budget_names(depth=np.inf) == bc.get_budget_names(depth=np.inf)
+    assert [b.name for b in frozen.get_leaf_budgets()] == [b.name for b in bc.get_leaf_budgets()]
+    assert frozen.amount == bc.amount
+    categories = sample['leaf_categories'] + ["Not a cat"]
+    for depth in ('leaf', 'child', 'this'):
+        assert (frozen.aggregate_categories_to_budget(categories, depth=depth) ==
+                bc.aggregate_categories_to_budget(categories, depth=depth))
+    assert frozen.thaw() == bc
+
+    with pytest.raises(AttributeError):
+        frozen.name = 'new name'
+    with pytest.raises(AttributeError):
+        frozen.get_budget_by_name('budget-0').amount = 100
+
+
+def test_frozen_budget_collection_hash():
+    frozen = sample_bc()['bc'].freeze()
+
+    # Equal contents give equal (and process-independent) hashes
+    assert frozen == sample_bc()['bc'].freeze()
+    assert hash(frozen) == hash(sample_bc()['bc'].freeze())
+    assert frozen.content_hash == sample_bc()['bc'].freeze().content_hash
+
+    changed = sample_bc()
+    changed['bc_even'].add_budget(Budget(1, ['new-category'], name='new budget'))
+    assert frozen != changed['bc'].freeze()
+
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+
+
+def test_freeze_numpy_amounts():
+    # Amounts read from DataFrames are numpy scalars.  They hash the same as python numbers
+    frozen = Budget(np.int64(-100), ["a"], schedule=[("2021-01-01", np.float64(-150.0))]).freeze()
+    assert frozen == Budget(-100, ["a"], schedule=[("2021-01-01", -150.0)]).freeze()
+    assert list(frozen.get_amounts(["2020-12-01", "2021-01-01"])) == [-100, -150]
+
+
+def test_frozen_budget_collection_slice_by_budgets_is_memoized():
+    sample = sample_bc()
+    frozen = sample['bc'].freeze()
+    names = [b.name for b in sample['bc_flat'].budgets]
+
+    sliced = frozen.slice_by_budgets(names)
+    assert sliced == sample['bc'].slice_by_budgets(names).freeze()
+    assert frozen.slice_by_budgets(names) is sliced
+
+
+def test_budget_get_amounts_follows_schedule():
+    b = Budget(1200, ['rent'], amount_type='Yearly', schedule=[('2020-06-01', 2400), ('2020-03-15', 1800)])
+    months = pd.date_range('2020-01-01', '2020-07-01', freq='MS')
+
+    # Changes apply from the first month starting on or after their effective date
+    np.testing.assert_array_equal(b.get_amounts(months), [100, 100, 100, 150, 150, 200, 200])
+    assert b.freeze().thaw() == b
+    assert b.freeze() != Budget(1200, ['rent'], amount_type='Yearly').freeze()
+
+
+def test_budget_collection_get_amount_matrix():
+    sample = sample_bc()
+    bc = sample['bc']
+    bc_even = sample['bc_even']
+    months = pd.date_range('2020-01-01', periods=3, freq='MS')
+
+    bc_even.add_budget(Budget(10, ['new-category'], name='new budget', schedule=[('2020-02-01', 20)]))
+
+    # even: 0 + 2 + 4 + (10, 20, 20), odd: 1 + 3 + 5
+    expected = np.array([[16, 26, 26], [9, 9, 9]])
+    for b in (bc, bc.freeze()):
+        matrix = b.get_amount_matrix(months)
+        np.testing.assert_array_equal(matrix, expected)
+        np.testing.assert_array_equal(b.get_amount_matrix(months, depth='this'), expected.sum(axis=0, keepdims=True))
+        assert b.get_amount_matrix(months, depth='leaf').shape == (7, 3)
+
+        # Cached (and so read-only)
+        assert b.get_amount_matrix(months) is matrix
+        with pytest.raises(ValueError):
+            matrix[0, 0] = 1
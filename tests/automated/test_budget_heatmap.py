@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spearmint.data_structures.budget import Budget, BudgetCollection
+from spearmint.data_structures.spend_cube import SpendCube
+
+# The dashboard needs dash to import
+budget_heatmap = pytest.importorskip("spearmint.dashboard.budget_heatmap", exc_type=ImportError)
+
+
+@pytest.fixture
+def budget():
+    bc = BudgetCollection("Overall")
+    income = BudgetCollection("Income")
+    income.add_budget(Budget(1000, ["Paycheck"]))
+    expenses = BudgetCollection("Expenses")
+    expenses.add_budget(Budget(-300, ["Groceries"]))
+    bc.add_budget(income)
+    bc.add_budget(expenses)
+    return bc.freeze()
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame([
+        ("2020-01-15", "Paycheck", 1000),
+        ("2020-01-20", "Groceries", -350),
+        ("2020-02-20", "Groceries", -200),
+    ], columns=["datetime", "category", "amount"]).assign(datetime=lambda df: pd.to_datetime(df["datetime"]))
+
+
+def test_toggling_a_budget_only_computes_its_row(budget, transactions):
+    budget_heatmap._get_budget_row.cache_clear()
+    cube = SpendCube.from_transactions(transactions)
+
+    budget_heatmap.aggregate_to_budget_deltas(cube, budget=budget.slice_by_budgets(["Income"]))
+    assert budget_heatmap._get_budget_row.cache_info().misses == 1
+
+    # Toggling Expenses on computes only its row, reusing Income's
+    df = budget_heatmap.aggregate_to_budget_deltas(cube, budget=budget.slice_by_budgets(["Income", "Expenses"]))
+    cache_info = budget_heatmap._get_budget_row.cache_info()
+    assert (cache_info.hits, cache_info.misses) == (1, 2)
+
+    # Subtotal is rebuilt from the cached rows
+    np.testing.assert_array_equal(df.loc["Income", "delta"], [0, -1000])
+    np.testing.assert_array_equal(df.loc["Expenses", "delta"], [-50, 100])
+    np.testing.assert_array_equal(df.loc[budget_heatmap.SUBTOTAL_BUDGET_NAME, "delta"], [-50, -900])
+
+    # Same as aggregating from scratch
+    pd.testing.assert_frame_equal(df, budget_heatmap.aggregate_to_budget_deltas(
+        transactions, budget=budget.slice_by_budgets(["Income", "Expenses"])))
+
+
+def test_monthly_bar_follows_budget_schedule(transactions):
+    groceries = Budget(-300, ["Groceries"], schedule=[("2020-02-01", -150)])
+    months = pd.date_range("2020-01-01", "2020-03-01", freq="MS")
+    df = transactions.loc[transactions["category"] == "Groceries"]
+
+    fig = budget_heatmap.monthly_bar(df, "datetime", "amount", "delta",
+                                     budget=pd.Series(groceries.get_amounts(months), index=months),
+                                     moving_average_window=1, start_date=months[0], end_date=months[-1])
+
+    budget_line = next(trace for trace in fig.data if trace.name == "Budget")
+    np.testing.assert_array_equal(budget_line.y, [-300, -150, -150])
+    assert budget_line.line.shape == "hvh"
+
+    # Moving average is compared to each month's budget, not a single amount
+    moving_average = next(trace for trace in fig.data if trace.name == "1 Month Moving Average")
+    assert list(moving_average.marker.color) == ["red", "red", "green"]
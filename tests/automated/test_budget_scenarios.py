@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spearmint.data_structures.budget import Budget, BudgetCollection
+from spearmint.services.budget_scenarios import apply_scenario, compare_scenarios, get_actuals_matrix, get_months, \
+    summarize_scenarios
+
+
+@pytest.fixture
+def budget():
+    bc = BudgetCollection("Overall")
+    income = BudgetCollection("Income")
+    income.add_budget(Budget(1000, ["Paycheck"]))
+    expenses = BudgetCollection("Expenses")
+    expenses.add_budget(Budget(-300, ["Groceries"]))
+    expenses.add_budget(Budget(-200, ["Restaurants", "Coffee Shops"], name="Food Out"))
+    bc.add_budget(income)
+    bc.add_budget(expenses)
+    return bc.freeze()
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame([
+        ("2020-01-15", "Paycheck", 1000),
+        ("2020-01-20", "Groceries", -350),
+        ("2020-01-21", "Coffee Shops", -20),
+        ("2020-02-15", "Paycheck", 1000),
+        ("2020-02-20", "Restaurants", -250),
+        ("2020-02-21", "Not budgeted", -5000),
+        ("2020-03-01", "Groceries", -100),
+    ], columns=["datetime", "category", "amount"]).assign(datetime=lambda df: pd.to_datetime(df["datetime"]))
+
+
+def test_get_actuals_matrix(budget, transactions):
+    months = get_months("2020-01-10", "2020-02-10")
+    np.testing.assert_array_equal(get_months("2020-01-10", "2020-03-01"), pd.date_range("2020-01-01", "2020-03-01",
+                                                                                         freq="MS"))
+
+    # March is outside months and "Not budgeted" is outside the budget, so both are ignored
+    np.testing.assert_array_equal(get_actuals_matrix(transactions, budget, months), [[1000, 1000], [-370, -250]])
+    np.testing.assert_array_equal(get_actuals_matrix(transactions, budget, months, depth='leaf'),
+                                  [[1000, 1000], [-350, 0], [-20, -250]])
+
+
+def test_apply_scenario(budget):
+    scenario = apply_scenario(budget, {
+        "Groceries_": -400,
+        "Paycheck_": {"schedule": [{"from": "2020-02-01", "amount": 1200}]},
+    })
+
+    months = get_months("2020-01-01", "2020-02-01")
+    np.testing.assert_array_equal(scenario.get_amount_matrix(months, depth='leaf'),
+                                  [[1000, 1200], [-400, -400], [-200, -200]])
+    # Original is unchanged
+    assert budget.get_budget_by_name("Groceries_").amount == -300
+
+    with pytest.raises(ValueError):
+        apply_scenario(budget, {"Not a budget": 1})
+
+
+def test_compare_scenarios(budget, transactions):
+    results = compare_scenarios(transactions, {"more food": {"Groceries_": -400, "Food Out": -300}}, budget=budget)
+
+    assert results["scenarios"] == ["baseline", "more food"]
+    assert results["budgets"] == ["Income", "Expenses"]
+    assert results["deltas"].shape == (2, 2, 3)
+
+    # Expenses deltas: actual - budgeted for each month
+    np.testing.assert_array_equal(results["deltas"][0, 1], [-370 + 500, -250 + 500, -100 + 500])
+    np.testing.assert_array_equal(results["deltas"][1, 1], [-370 + 700, -250 + 700, -100 + 700])
+    # Income missed its budget in March
+    np.testing.assert_array_equal(results["n_over_budget"], [[1, 0], [1, 0]])
+    np.testing.assert_array_equal(results["subtotals"][:, 2], [-1000 + 400, -1000 + 600])
+
+    summary = summarize_scenarios(results)
+    assert list(summary.index) == ["baseline", "more food"]
+    assert summary.loc["more food", "total delta"] - summary.loc["baseline", "total delta"] == 600
+
+
+def test_compare_scenarios_without_transactions(budget, transactions):
+    empty = transactions.iloc[:0]
+    with pytest.raises(ValueError, match="start_date and end_date"):
+        compare_scenarios(empty, {}, budget=budget)
+
+    # With the dates given, every month has zero actuals
+    results = compare_scenarios(empty, {}, budget=budget, start_date="2020-01-01", end_date="2020-02-01")
+    np.testing.assert_array_equal(results["actuals"], np.zeros((2, 2)))
+    assert results["deltas"].shape == (1, 2, 2)
@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from spearmint.data_structures.budget import FrozenBudgetCollection
+from spearmint.services import budget as budget_service
+from spearmint.services.budget import load_budget_definition, budget_to_definition, get_overall_budget_collection, \
+    get_unbudgeted_categories, BUDGET_DEFINITION_ENV
+
+
+def sample_definition(rent=-1800):
+    return {
+        "income": {"name": "Income", "budgets": [{"amount": 5000, "categories": ["Paycheck"]}]},
+        "expense": {"name": "Expenses", "budgets": [
+            {"name": "Home", "budgets": [
+                {"amount": rent, "categories": ["Mortgage & Rent"],
+                 "schedule": [{"from": "2021-01-01", "amount": rent - 100}]},
+                {"amount": -1200, "amount_type": "Yearly", "categories": ["Home Insurance"], "name": "Insurance"},
+            ]},
+            {"amount": -500, "categories": ["Groceries", "Restaurants"], "name": "Food"},
+        ]},
+        "excluded": {"name": "Excluded Transactions", "budgets": [{"categories": ["Transfer"]}]},
+    }
+
+
+@pytest.fixture
+def definition_file():
+    with tempfile.TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, "budget.json")
+        with open(path, "w") as fout:
+            json.dump(sample_definition(), fout)
+        yield path
+        budget_service._loaded_definitions.pop(path, None)
+
+
+def _rewrite(path, definition):
+    # Make sure the mtime changes even on filesystems with coarse timestamps
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, "w") as fout:
+        if isinstance(definition, str):
+            fout.write(definition)
+        else:
+            json.dump(definition, fout)
+    os.utime(path, ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+
+
+def test_load_budget_definition(definition_file):
+    budgets = load_budget_definition(definition_file)
+
+    overall = budgets["overall"]
+    assert isinstance(overall, FrozenBudgetCollection)
+    assert overall.get_budget_names() == ["Income", "Expenses", "Excluded Transactions"]
+    assert overall.get_budget_by_name("Insurance").amount == -100
+    assert overall.get_budget_by_name("Food").categories == ("Groceries", "Restaurants")
+    assert budgets["expense"].categories_flat_dict["Home"] == ["Mortgage & Rent_", "Insurance"]
+    assert list(overall.get_budget_by_name("Mortgage & Rent_").get_amounts(["2020-12-01", "2021-01-01"])) == \
+        [-1800, -1900]
+
+    # Round trips through the definition format
+    assert budget_service.definition_to_budget(budget_to_definition(budgets["expense"])) == budgets["expense"]
+
+    # Compiled cache is written next to the file
+    assert os.path.exists(budget_service._get_compiled_cache_path(definition_file))
+
+
+def test_load_budget_definition_caches(definition_file, monkeypatch):
+    budgets = load_budget_definition(definition_file)
+
+    # Unchanged file returns the same objects without compiling again
+    assert load_budget_definition(definition_file) is budgets
+
+    # A new process (nothing loaded in memory) uses the compiled cache file rather than compiling
+    budget_service._loaded_definitions.pop(definition_file)
+
+    def fail(definition):
+        raise AssertionError("Should not compile")
+
+    monkeypatch.setattr(budget_service, "compile_budget_definition", fail)
+    assert load_budget_definition(definition_file) == budgets
+    monkeypatch.undo()
+
+    # Changing the file gives a new budget
+    _rewrite(definition_file, sample_definition(rent=-2000))
+    new_budgets = load_budget_definition(definition_file)
+    assert new_budgets["overall"].content_hash != budgets["overall"].content_hash
+    assert new_budgets["overall"].get_budget_by_name("Mortgage & Rent_").amount == -2000
+
+
+def test_load_budget_definition_raises_on_duplicates(definition_file):
+    definition = sample_definition()
+    definition["excluded"]["budgets"].append({"categories": ["Groceries"], "name": "Not Food"})
+    _rewrite(definition_file, definition)
+
+    with pytest.raises(ValueError):
+        load_budget_definition(definition_file)
+
+
+def test_load_budget_definition_keeps_last_good(definition_file, capsys):
+    budgets = load_budget_definition(definition_file)
+
+    # A half-written save or a broken definition keeps the last good budgets
+    _rewrite(definition_file, json.dumps(sample_definition(rent=-2000))[:50])
+    assert load_budget_definition(definition_file) is budgets
+    assert "WARNING" in capsys.readouterr().out
+
+    broken = sample_definition(rent=-2000)
+    del broken["excluded"]
+    _rewrite(definition_file, broken)
+    assert load_budget_definition(definition_file) is budgets
+
+    # The error is reported once per change to the file
+    capsys.readouterr()
+    assert load_budget_definition(definition_file) is budgets
+    assert capsys.readouterr().out == ""
+
+    # Once fixed, the new budgets are swapped in
+    _rewrite(definition_file, sample_definition(rent=-2000))
+    assert load_budget_definition(definition_file)["overall"].get_budget_by_name("Mortgage & Rent_").amount == -2000
+
+    # The compiled cache is written via a temporary file
+    assert not [f for f in os.listdir(os.path.dirname(definition_file)) if f.endswith(".tmp")]
+
+
+def test_budget_getters_use_definition_file(definition_file, monkeypatch):
+    monkeypatch.setenv(BUDGET_DEFINITION_ENV, definition_file)
+
+    assert get_overall_budget_collection(frozen=True) is load_budget_definition(definition_file)["overall"]
+    assert get_overall_budget_collection() == load_budget_definition(definition_file)["overall"].thaw()
+    assert get_unbudgeted_categories(["Paycheck", "Coffee Shops", "Transfer"]) == ["Coffee Shops"]
@@ -0,0 +1,99 @@
+import pytest
+
+from spearmint.data.category import Category
+from spearmint.data.suggested_category import SuggestedCategory
+from spearmint.data.db_session import global_init, global_forget, create_session
+from spearmint.data.transaction import Transaction
+from spearmint.services.category import accept_current_chosen_categories, get_accepted_categories, \
+    accept_suggestions
+
+
+@pytest.fixture
+def db_init():
+    # global_init builds tables and populates session factory
+    global_init('', echo=True)
+    yield
+    global_forget()
+
+
+@pytest.fixture
+def db_with_accepted_and_stale(db_init):
+    s = create_session()
+    # Two transactions with accepted categories from another scheme, one with only a suggestion, and one that is
+    # uncategorized (which used to make the NOT IN based stale check delete nothing)
+    for description, category_name in [("a", "cat_a"), ("b", "cat_b")]:
+        trx = Transaction(description=description)
+        trx.categories_suggested.append(SuggestedCategory(scheme="from_file", rank=0, category=category_name))
+        trx.category = Category(scheme="from_file", category=category_name)
+        s.add(trx)
+    trx = Transaction(description="c")
+    trx.categories_suggested.append(SuggestedCategory(scheme="from_file", rank=0, category="cat_c"))
+    s.add(trx)
+    s.add(Transaction(description="d"))
+
+    # Stale: in the accepted scheme but no longer accepted by any transaction
+    s.add(Category(scheme="accepted", category="stale"))
+    s.commit()
+    s.close()
+
+
+def categories_by_scheme():
+    s = create_session()
+    result = {}
+    for scheme, category in s.query(Category.scheme, Category.category).order_by(Category.category):
+        result.setdefault(scheme, []).append(category)
+    s.close()
+    return result
+
+
+def test_accept_current_chosen_categories(db_with_accepted_and_stale):
+    n_updated, n_deleted = accept_current_chosen_categories("accepted")
+
+    assert (n_updated, n_deleted) == (2, 1)
+    assert categories_by_scheme() == {"accepted": ["cat_a", "cat_b"]}
+    assert sorted(c.category for c in get_accepted_categories()) == ["cat_a", "cat_b"]
+
+    # Repeating changes nothing
+    assert accept_current_chosen_categories("accepted") == (0, 0)
+    assert categories_by_scheme() == {"accepted": ["cat_a", "cat_b"]}
+
+
+@pytest.fixture
+def db_with_ranked_suggestions(db_init):
+    s = create_session()
+    suggestions = {
+        "coffee": [("Coffee Shops", 0, 0.9), ("Restaurants", 1, 0.1)],
+        "grocery": [("Groceries", 0, 0.4), ("Restaurants", 1, 0.3)],
+        "unscored": [("Misc", 0, None)],
+        "already categorized": [("Gas", 0, 0.99)],
+        "no suggestions": [],
+    }
+    for description, categories in suggestions.items():
+        trx = Transaction(description=description)
+        for category, rank, confidence in categories:
+            trx.categories_suggested.append(SuggestedCategory(scheme="clf", category=category, rank=rank,
+                                                              confidence=confidence))
+        if description == "already categorized":
+            trx.category = Category(scheme="accepted", category="Auto")
+        s.add(trx)
+    s.commit()
+    s.close()
+
+
+def accepted_by_description():
+    s = create_session()
+    rows = s.query(Transaction.description, Category.category).join(Category, Transaction.category_id == Category.id)
+    result = dict(rows)
+    s.close()
+    return result
+
+
+def test_accept_suggestions(db_with_ranked_suggestions):
+    assert accept_suggestions("clf", descriptions=["coffee"]) == 1
+    assert accepted_by_description() == {"coffee": "Coffee Shops", "already categorized": "Auto"}
+
+    assert accept_suggestions("clf", min_confidence=0.5) == 0
+
+    assert accept_suggestions("clf") == 2
+    assert accepted_by_description() == {"coffee": "Coffee Shops", "grocery": "Groceries", "unscored": "Misc",
+                                         "already categorized": "Auto"}
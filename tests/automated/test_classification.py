@@ -1,10 +1,22 @@
+import os
+
+import joblib
 import pandas as pd
+from click.testing import CliRunner
 import pytest
 import tempfile
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import make_pipeline
 
+from spearmint.classifiers.lookup_classifier import LookupClassifier
+from spearmint.classifiers.rules_classifier import RulesClassifier
+from spearmint.data.category import Category
 from spearmint.data.db_session import global_init, global_forget, create_session
 from spearmint.data.transaction import Transaction
-from spearmint.services.classification import classify_db_by_lookup
+from spearmint.services.category import get_suggested_categories_by_transaction, write_suggested_categories
+from spearmint.services.classification import classify_db_by_lookup, classify_by_model, train_model, \
+    update_online_model, classify_by_models, parse_classifier_specs, classify_by_model_cli
 from spearmint.services.transaction import get_transactions_without_category
 
 
@@ -66,3 +78,191 @@ def test_lookup_classifier(db_with_unclassified, create_label_file):
     all_trxs = s.query(Transaction).all()
     # TODO: Update this to use category table
     assert all_trxs[0].category == "something"
+
+
+DESCRIPTIONS_AND_CATEGORIES = [
+    ("coffee shop", "Coffee Shops"),
+    ("coffee beans shop", "Coffee Shops"),
+    ("grocery store", "Groceries"),
+    ("big grocery market", "Groceries"),
+    ("gas station", "Gas & Fuel"),
+]
+
+
+@pytest.fixture
+def db_with_descriptions(db_init):
+    s = create_session()
+    s.add_all([Transaction(description=description) for description, _ in DESCRIPTIONS_AND_CATEGORIES])
+    s.commit()
+    s.close()
+
+
+def fitted_text_model():
+    clf = make_pipeline(CountVectorizer(), MultinomialNB())
+    descriptions, categories = zip(*DESCRIPTIONS_AND_CATEGORIES)
+    clf.fit(descriptions, categories)
+    return clf
+
+
+def test_classify_by_model_top_k_with_confidence(db_with_descriptions):
+    classify_by_model("nb", fitted_text_model(), n_classifications_per_trx=2)
+
+    suggestions = get_suggested_categories_by_transaction("nb", order_by="confidence")
+    assert len(suggestions) == len(DESCRIPTIONS_AND_CATEGORIES)
+
+    for (description, category), trx_id in zip(DESCRIPTIONS_AND_CATEGORIES, sorted(suggestions)):
+        these_suggestions = suggestions[trx_id]
+        assert [c.rank for c in these_suggestions] == [0, 1]
+        assert these_suggestions[0].category == category
+        assert these_suggestions[0].confidence >= these_suggestions[1].confidence
+
+
+def test_classify_by_model_without_predict_proba(db_with_descriptions):
+    clf = LookupClassifier(pd.Series(dict(DESCRIPTIONS_AND_CATEGORIES)))
+
+    with pytest.raises(NotImplementedError):
+        classify_by_model("lookup", clf, n_classifications_per_trx=2)
+
+    classify_by_model("lookup", clf, n_classifications_per_trx=1)
+    suggestions = get_suggested_categories_by_transaction("lookup", order_by="rank")
+    assert [c[0].category for _, c in sorted(suggestions.items())] == [c for _, c in DESCRIPTIONS_AND_CATEGORIES]
+    assert all(c[0].confidence is None for c in suggestions.values())
+
+
+def test_classify_by_model_with_rules(db_with_descriptions):
+    clf = RulesClassifier([("coffee", "Coffee Shops"), ("grocery", "Groceries", 1), ("shop", "Shopping")])
+
+    classify_by_model("rules", clf, n_classifications_per_trx=2)
+
+    suggestions = get_suggested_categories_by_transaction("rules", order_by="rank")
+    suggested_names = {trx_id: [c.category for c in categories] for trx_id, categories in suggestions.items()}
+    assert list(suggested_names.values()) == [
+        ["Coffee Shops", "Shopping"],
+        ["Coffee Shops", "Shopping"],
+        ["Groceries"],
+        ["Groceries"],
+    ]
+
+
+@pytest.mark.parametrize("n", [1, 2])
+def test_classify_by_model_cli_with_workers(db_with_descriptions, n):
+    clf = RulesClassifier([("coffee", "Coffee Shops"), ("grocery", "Groceries", 1), ("shop", "Shopping")])
+    classify_by_model("expected", clf, n_classifications_per_trx=n)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        model_path = os.path.join(tempdir, "rules.joblib")
+        joblib.dump(clf, model_path)
+        # db is already initialized (in memory), so the cli's global_init is a no-op
+        result = CliRunner().invoke(classify_by_model_cli, ["db.sqlite", "rules", model_path, "--workers", "2",
+                                                            "--n_classifications_per_trx", str(n)])
+    assert result.exit_code == 0, result.output
+
+    def names(scheme):
+        suggestions = get_suggested_categories_by_transaction(scheme, order_by="rank")
+        return {trx_id: [c.category for c in categories] for trx_id, categories in suggestions.items()}
+
+    assert names("rules") == names("expected")
+    assert max(len(categories) for categories in names("rules").values()) == n
+
+
+@pytest.fixture
+def db_with_accepted_categories(db_init):
+    s = create_session()
+    for description, category_name in DESCRIPTIONS_AND_CATEGORIES:
+        category = Category(scheme="accepted", category=category_name)
+        trx = Transaction(description=description)
+        trx.category = category
+        s.add(trx)
+    s.commit()
+    s.close()
+
+
+def test_train_model(db_with_accepted_categories):
+    with tempfile.TemporaryDirectory() as tempdir:
+        model_path = os.path.join(tempdir, "model.joblib")
+        train_model(model_path, cache_dir=os.path.join(tempdir, "cache"), n_estimators=10, random_state=0)
+
+        clf = joblib.load(model_path)
+        assert set(clf.classes_) == set(c for _, c in DESCRIPTIONS_AND_CATEGORIES)
+
+        classify_by_model("rf", clf, n_classifications_per_trx=1)
+        suggestions = get_suggested_categories_by_transaction("rf")
+        assert len(suggestions) == len(DESCRIPTIONS_AND_CATEGORIES)
+
+
+def test_update_online_model(db_with_accepted_categories):
+    with tempfile.TemporaryDirectory() as tempdir:
+        model_path = os.path.join(tempdir, "online.joblib")
+
+        assert update_online_model(model_path) == len(DESCRIPTIONS_AND_CATEGORIES)
+        # Nothing has changed, so nothing is trained on
+        assert update_online_model(model_path) == 0
+
+        # Relabel one transaction and add a new category.  Only that transaction is trained on
+        s = create_session()
+        trx = s.query(Transaction).filter(Transaction.description == "gas station").one()
+        trx.category = Category(scheme="accepted", category="Auto")
+        s.commit()
+        s.close()
+        assert update_online_model(model_path) == 1
+
+        clf = joblib.load(model_path)
+        assert "Auto" in clf.classes_
+        classify_by_model("online", clf, n_classifications_per_trx=2)
+        assert len(get_suggested_categories_by_transaction("online")) == len(DESCRIPTIONS_AND_CATEGORIES)
+
+
+def test_classify_by_model_replace_is_atomic(db_with_descriptions):
+    classify_by_model("rules", RulesClassifier([("coffee", "Coffee Shops")]), n_classifications_per_trx=1)
+    before = get_suggested_categories_by_transaction("rules")
+
+    # A failed write (here, a row missing its required category) leaves the old scheme untouched
+    with pytest.raises(Exception):
+        write_suggested_categories({"rules": [{"transaction_id": 1, "category": None, "rank": 0, "confidence": None}]})
+    assert {k: [(c.category, c.rank) for c in v] for k, v in get_suggested_categories_by_transaction("rules").items()} \
+           == {k: [(c.category, c.rank) for c in v] for k, v in before.items()}
+
+    classify_by_model("rules", RulesClassifier([("grocery", "Groceries")]), n_classifications_per_trx=1)
+    suggestions = get_suggested_categories_by_transaction("rules")
+    assert [c.category for categories in suggestions.values() for c in categories] == ["Groceries", "Groceries"]
+
+    with pytest.raises(ValueError):
+        classify_by_model("rules", RulesClassifier([("grocery", "Groceries")]), if_scheme_exists="raise")
+
+    classify_by_model("rules", RulesClassifier([("gas", "Gas & Fuel")]), if_scheme_exists="ignore")
+    assert len(get_suggested_categories_by_transaction("rules")) == 3
+
+
+def test_classify_by_models(db_with_accepted_categories):
+    with tempfile.TemporaryDirectory() as tempdir:
+        rules_file = os.path.join(tempdir, "rules.csv")
+        pd.DataFrame({"Pattern": ["coffee"], "Category": ["Coffee Shops"]}).to_csv(rules_file, index=False)
+        model_file = os.path.join(tempdir, "nb.joblib")
+        joblib.dump(fitted_text_model(), model_file)
+
+        clfs = parse_classifier_specs([f"rules=rules:{rules_file}", f"nb=model:{model_file}", "mc=most-common",
+                                       "sim=similar"])
+        classify_by_models(clfs, n_classifications_per_trx=1, n_threads=2)
+
+    for scheme in ["nb", "mc", "sim"]:
+        suggestions = get_suggested_categories_by_transaction(scheme)
+        assert [c[0].category for _, c in sorted(suggestions.items())] == [c for _, c in DESCRIPTIONS_AND_CATEGORIES]
+    assert len(get_suggested_categories_by_transaction("rules")) == 2
+
+    # Schemes are checked together, so nothing is written if any already exists
+    with pytest.raises(ValueError):
+        classify_by_models({"new": clfs["mc"], "nb": clfs["nb"]}, if_scheme_exists="raise")
+    assert get_suggested_categories_by_transaction("new") == {}
+
+
+def test_parse_classifier_specs_errors():
+    for spec in ["no_kind", "x=unknown", "x=model"]:
+        with pytest.raises(ValueError):
+            parse_classifier_specs([spec])
+
+
+def test_classify_by_model_cli_rejects_server_with_workers():
+    result = CliRunner().invoke(classify_by_model_cli, ["db.sqlite", "scheme", "model", "--server", "localhost:6543",
+                                                        "--workers", "2"])
+    assert result.exit_code == 2
+    assert "--server and --workers" in result.output
@@ -0,0 +1,154 @@
+import os
+import tempfile
+import threading
+
+import joblib
+import pandas as pd
+import pytest
+from multiprocessing import AuthenticationError
+
+from spearmint.classifiers.common_usage_classifier import CommonUsageClassifier
+from spearmint.classifiers.lookup_classifier import LookupClassifier
+from spearmint.classifiers.rules_classifier import RulesClassifier
+from spearmint.classifiers.similarity_classifier import SimilarityClassifier
+from spearmint.services.classification_server import ClassificationServer, ClassificationClient, RemoteModel, \
+    get_authkey_file, parse_address
+from spearmint.services.classification import predict_suggestions
+
+
+RULES = [("x", "has x"), ("0", "has 0"), ("1", "has 1")]
+
+
+def fitted_common_usage():
+    clf = CommonUsageClassifier()
+    clf.fit(["x0", "x0", "x0", "x1"], ["a", "a", "b", "c"])
+    return clf
+
+
+def fitted_similarity():
+    clf = SimilarityClassifier()
+    clf.fit(["TIM HORTONS #123 TORONTO", "TIM HORTONS #124 TORONTO", "LOBLAWS GROCERY 12"],
+            ["Coffee Shops", "Restaurants", "Groceries"])
+    return clf
+
+
+@pytest.fixture
+def running_server():
+    with tempfile.TemporaryDirectory() as tempdir:
+        models = {
+            "lookup": LookupClassifier(pd.Series(["a", "b"], index=["x0", "x1"])),
+            "common_usage": fitted_common_usage(),
+            "rules": RulesClassifier(RULES),
+            "similarity": fitted_similarity(),
+        }
+        model_paths = {}
+        for name, clf in models.items():
+            model_paths[name] = os.path.join(tempdir, f"{name}.joblib")
+            joblib.dump(clf, model_paths[name])
+
+        address = os.path.join(tempdir, "server.sock")
+        server = ClassificationServer(address, allowed_model_paths=model_paths.values())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        # Wait for the socket to be created
+        for _ in range(100):
+            if os.path.exists(address):
+                break
+            thread.join(0.05)
+
+        yield address, model_paths
+
+        ClassificationClient(address).shutdown()
+        thread.join(5)
+
+
+def test_parse_address():
+    assert parse_address("localhost:6543") == ("localhost", 6543)
+    assert parse_address("127.0.0.1:6543") == ("127.0.0.1", 6543)
+    assert parse_address("[::1]:6543") == ("::1", 6543)
+    assert parse_address("/tmp/server.sock") == "/tmp/server.sock"
+
+    for address in ("0.0.0.0:6543", "192.168.1.2:6543", "example.com:6543"):
+        with pytest.raises(ValueError):
+            parse_address(address)
+
+
+def test_authkey_file(running_server):
+    address, _ = running_server
+
+    authkey_file = get_authkey_file(address)
+    assert os.stat(authkey_file).st_mode & 0o777 == 0o600
+
+    # A client with the wrong key is rejected without taking down the server
+    with pytest.raises(AuthenticationError):
+        ClassificationClient(address, authkey=b"wrong").list_models()
+    assert ClassificationClient(address).list_models() == []
+
+
+def test_remote_model_predict(running_server):
+    address, model_paths = running_server
+
+    clf = RemoteModel.from_server("lookup", address=address, path=model_paths["lookup"])
+    assert list(clf.predict(["x1", "x0", "not seen"])) == ["b", "a", None]
+
+    # Model stays resident, so a second client does not need a path
+    client = ClassificationClient(address)
+    assert client.list_models() == ["lookup"]
+    assert list(RemoteModel.from_server("lookup", address=address).predict(["x0"])) == ["a"]
+
+
+def test_remote_model_errors(running_server):
+    address, _ = running_server
+
+    with pytest.raises(KeyError):
+        RemoteModel.from_server("not loaded", address=address)
+
+    with pytest.raises(RuntimeError):
+        ClassificationClient(address).predict("not loaded", ["x0"])
+
+    # Only allowed paths can be loaded
+    with pytest.raises(RuntimeError, match="PermissionError"):
+        ClassificationClient(address).load_model("other", os.path.join(os.path.dirname(address), "other.joblib"))
+
+
+def test_remote_model_predict_suggestions(running_server):
+    address, model_paths = running_server
+    x = ["x0", "x1", "not seen"]
+
+    # Served models that natively predict their top n are given n, matching the local model
+    clf = RemoteModel.from_server("common_usage", address=address, path=model_paths["common_usage"])
+    assert clf.predicts_top_n
+    for n in (1, 2):
+        predictions, confidences = predict_suggestions(clf, x, n=n)
+        pd.testing.assert_frame_equal(predictions, predict_suggestions(fitted_common_usage(), x, n=n)[0])
+        assert predictions.shape == (3, n)
+        assert confidences is None
+
+
+def test_remote_rules_classifier(running_server):
+    address, model_paths = running_server
+    x = ["x0", "x1", "not seen"]
+
+    # Without n, the server asks for every matching category
+    clf = RemoteModel.from_server("rules", address=address, path=model_paths["rules"])
+    expected = pd.DataFrame([["has x", "has 0"], ["has x", "has 1"], [None, None]], index=x, dtype=object)
+    pd.testing.assert_frame_equal(clf.predict(x), expected)
+
+    predictions, _ = predict_suggestions(clf, x, n=1)
+    pd.testing.assert_frame_equal(predictions, expected[[0]])
+
+
+def test_remote_similarity_classifier(running_server):
+    address, model_paths = running_server
+    x = ["TIM HORTONS #123 TORONTO", "LOBLAWS GROCERY 12", "ACME WIDGETS"]
+
+    # Without n, the server asks for every similar category
+    clf = RemoteModel.from_server("similarity", address=address, path=model_paths["similarity"])
+    expected = fitted_similarity().predict(x, n=None)
+    assert expected.shape == (3, 2)
+    assert expected.iloc[0].tolist() == ["Coffee Shops", "Restaurants"]
+    pd.testing.assert_frame_equal(clf.predict(x), expected)
+
+    predictions, _ = predict_suggestions(clf, x, n=1)
+    pd.testing.assert_frame_equal(predictions, expected[[0]])
@@ -0,0 +1,259 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+from spearmint.classifiers.common_usage_classifier import CommonUsageClassifier
+from spearmint.classifiers import featurized_classifier
+from spearmint.classifiers.featurized_classifier import FeaturizedClassifier, FeatureCache
+from spearmint.classifiers.online_classifier import OnlineClassifier
+from spearmint.classifiers.lookup_classifier import LookupClassifier
+from spearmint.classifiers.parallel import ParallelModel
+from spearmint.classifiers.rules_classifier import RulesClassifier
+from spearmint.classifiers.similarity_classifier import SimilarityClassifier
+from spearmint.classifiers.top_k import top_k_from_proba
+
+
+FEATURES = [f"x{i}" for i in [0, 0, 0, 0, 1, 1, 1]]
+LABELS = [f"y{i}" for i in [0, 1, 1, 2, 1, 2, 2]]
+
+
+def fitted_common_usage_classifier():
+    clf = CommonUsageClassifier()
+    clf.fit(FEATURES, LABELS)
+    return clf
+
+
+def test_common_usage_predict_one():
+    clf = fitted_common_usage_classifier()
+
+    assert clf.predict_one("x0") == ["y1"]
+    assert clf.predict_one("x1", n=2) == ["y2", "y1"]
+    assert clf.predict_one("x1", n=4) == ["y2", "y1", None, None]
+    assert clf.predict_one("x0", n=None) == ["y1", "y0", "y2"]
+    assert clf.predict_one("not seen", n=2) == [None, None]
+
+
+def test_common_usage_predict_one_matches_predict():
+    clf = fitted_common_usage_classifier()
+    x = ["x1", "not seen", "x0"]
+
+    expected = clf.predict(x, n=3)
+    expected = expected.where(expected.notna(), None).values.tolist()
+
+    assert expected == clf.predict_many(x, n=3)
+
+
+def test_lookup_predict_one():
+    clf = LookupClassifier(pd.Series(["a", np.nan], index=["x0", "x1"]))
+
+    assert clf.predict_one("x0") == "a"
+    assert clf.predict_one("x1") is None
+    assert clf.predict_one("not seen") is None
+    assert clf.predict_many(["x0", "x1", "not seen"]) == list(clf.predict(["x0", "x1", "not seen"]))
+
+
+def test_parallel_model_predict_keeps_order():
+    clf = LookupClassifier(pd.Series([f"y{i}" for i in range(10)], index=[f"x{i}" for i in range(10)]))
+    x = [f"x{i % 12}" for i in range(50)]
+
+    with ParallelModel.from_model(clf, n_workers=2) as parallel_clf:
+        predicted = parallel_clf.predict(x)
+
+    assert list(predicted) == list(clf.predict(x))
+
+
+def test_parallel_model_forwards_top_n():
+    clf = RulesClassifier(RULES)
+    x = ["grocer A", "nothing", "tim hortons coffee", "shell"] * 5
+
+    with ParallelModel.from_model(clf, n_workers=2) as parallel_clf:
+        assert parallel_clf.predicts_top_n
+        assert not parallel_clf.supports_predict_proba
+        assert not parallel_clf.supports_predict_with_confidence
+        pd.testing.assert_frame_equal(parallel_clf.predict(x, n=2), clf.predict(x, n=2))
+
+    similarity = SimilarityClassifier()
+    similarity.fit(["LOBLAWS GROCERY 12", "SHELL STATION 9"], ["Groceries", "Gas & Fuel"])
+    with ParallelModel.from_model(similarity, n_workers=2) as parallel_clf:
+        assert parallel_clf.supports_predict_with_confidence
+        for parallel_result, result in zip(parallel_clf.predict_with_confidence(x, n=2),
+                                           similarity.predict_with_confidence(x, n=2)):
+            pd.testing.assert_frame_equal(parallel_result, result)
+
+
+def test_top_k_from_proba():
+    proba = np.array([[0.1, 0.7, 0.2, 0.0],
+                      [0.5, 0.2, 0.3, 0.0],
+                      [0.0, 0.0, 0.4, 0.6]])
+    classes = np.array(["a", "b", "c", "d"])
+
+    labels, confidences = top_k_from_proba(proba, classes, k=2)
+
+    assert labels.tolist() == [["b", "c"], ["a", "c"], ["d", "c"]]
+    assert confidences.tolist() == [[0.7, 0.2], [0.5, 0.3], [0.6, 0.4]]
+
+    # k larger than the number of classes returns everything, fully sorted
+    labels, confidences = top_k_from_proba(proba, classes, k=10)
+    assert labels[0].tolist() == ["b", "c", "a", "d"]
+    assert (np.diff(confidences, axis=1) <= 0).all()
+
+
+RULES = [
+    ("coffee", "Coffee Shops"),
+    ("tim hortons", "Coffee Shops", 1),
+    ("grocer", "Groceries"),
+    ("shell", "Gas & Fuel"),
+    ("hortons", "Restaurants", 2),
+]
+
+
+def test_rules_classifier_predict_one():
+    clf = RulesClassifier(RULES)
+
+    assert clf.predict_one("SHELL #123") == ["Gas & Fuel"]
+    assert clf.predict_one("no rule matches this") == [None]
+    # Higher priority wins, and each category is returned once
+    assert clf.predict_one("Tim Hortons Coffee", n=3) == ["Restaurants", "Coffee Shops", None]
+    # Overlapping patterns are all found
+    assert clf.predict_one("coffee grocery shell", n=None) == ["Coffee Shops", "Groceries", "Gas & Fuel"]
+
+
+def test_rules_classifier_case_sensitive():
+    clf = RulesClassifier(RULES, case_sensitive=True)
+
+    assert clf.predict_one("SHELL") == [None]
+    assert clf.predict_one("shell") == ["Gas & Fuel"]
+
+
+def test_rules_classifier_predict():
+    clf = RulesClassifier(RULES)
+    x = ["grocer A", "nothing", "grocer A", "tim hortons"]
+
+    predicted = clf.predict(x, n=2)
+
+    assert list(predicted.index) == x
+    assert predicted.where(predicted.notna(), None).values.tolist() == [
+        ["Groceries", None],
+        [None, None],
+        ["Groceries", None],
+        ["Restaurants", "Coffee Shops"],
+    ]
+
+    # n=None returns all matches, with as many columns as the most matches
+    assert clf.predict(x, n=None).shape == (4, 2)
+    assert clf.predict(["nothing"], n=None).shape == (1, 0)
+
+
+def test_similarity_classifier():
+    clf = SimilarityClassifier()
+    clf.fit(
+        ["TIM HORTONS #123 TORONTO", "TIM HORTONS #123 TORONTO", "TIM HORTONS #123 TORONTO", "LOBLAWS GROCERY 12"],
+        ["Coffee Shops", "Coffee Shops", "Restaurants", "Groceries"],
+    )
+
+    # Previously seen descriptions are an exact match to their most common label
+    assert clf.predict_one_with_confidence("TIM HORTONS #123 TORONTO") == (["Coffee Shops"], [1.0])
+
+    # Never seen, but similar
+    categories, confidences = clf.predict_one_with_confidence("Tim Hortons #124 Toronto", n=2)
+    assert categories == ["Coffee Shops", None]
+    assert 0.3 < confidences[0] < 1.0
+
+    # Nothing similar
+    assert clf.predict_one("ACME WIDGETS", n=2) == [None, None]
+
+
+def test_similarity_classifier_predict_with_confidence():
+    clf = SimilarityClassifier()
+    clf.fit(["LOBLAWS GROCERY 12", "SHELL STATION 9"], ["Groceries", "Gas & Fuel"])
+    x = ["SHELL STATION 9", "nothing alike", "SHELL STATION 9"]
+
+    categories, confidences = clf.predict_with_confidence(x, n=1)
+
+    assert list(categories.index) == x
+    assert categories[0].tolist() == ["Gas & Fuel", None, "Gas & Fuel"]
+    assert confidences[0].tolist()[::2] == [1.0, 1.0]
+    assert np.isnan(confidences[0].iloc[1])
+
+    # n=None returns all similar categories, with as many columns as the most similar categories
+    categories, confidences = clf.predict_with_confidence(x, n=None)
+    assert categories.shape == confidences.shape == (3, 1)
+    assert clf.predict(["nothing alike"], n=None).shape == (1, 0)
+
+
+TEXT_FEATURES = ["coffee shop", "coffee beans", "grocery store", "grocery market", "coffee shop"]
+TEXT_LABELS = ["Coffee Shops", "Coffee Shops", "Groceries", "Groceries", "Coffee Shops"]
+
+
+def test_featurized_classifier_without_cache():
+    clf = FeaturizedClassifier(CountVectorizer(), MultinomialNB())
+    clf.fit(TEXT_FEATURES, TEXT_LABELS)
+
+    assert list(clf.predict(["coffee", "grocery", "coffee"])) == ["Coffee Shops", "Groceries", "Coffee Shops"]
+    assert clf.predict_proba(["coffee"]).shape == (1, 2)
+
+
+def test_featurized_classifier_caches_features():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        clf = FeaturizedClassifier(CountVectorizer(), MultinomialNB(), cache_dir=cache_dir)
+        clf.fit(TEXT_FEATURES, TEXT_LABELS)
+        n_files_after_fit = len(os.listdir(cache_dir))
+        assert n_files_after_fit == 2
+
+        # Refitting on the same descriptions reuses the cached (already fitted) vectorizer and features
+        refit = FeaturizedClassifier(CountVectorizer(), MultinomialNB(), cache_dir=cache_dir)
+        refit.fit(TEXT_FEATURES, TEXT_LABELS)
+        assert refit.vectorizer.vocabulary_ == clf.vectorizer.vocabulary_
+        assert len(os.listdir(cache_dir)) == n_files_after_fit
+
+        assert list(clf.predict(["coffee", "grocery"])) == ["Coffee Shops", "Groceries"]
+        # A second prediction featurizes only the new description, appending it to the cached matrix
+        assert list(clf.predict(["grocery", "coffee shop"])) == ["Groceries", "Coffee Shops"]
+        prediction_entries = [f[:-len(".npz")] for f in os.listdir(cache_dir) if f.endswith(".npz")
+                              and not os.path.exists(os.path.join(cache_dir, f[:-len(".npz")] + ".vectorizer.joblib"))]
+        descriptions, matrix, vectorizer = FeatureCache(cache_dir).load(prediction_entries[0])
+        assert descriptions == ["coffee", "grocery", "coffee shop"]
+        assert matrix.shape[0] == 3
+        assert vectorizer is None
+
+        # Files are written via temporary files that are moved into place
+        assert not [f for f in os.listdir(cache_dir) if f.endswith(".tmp")]
+
+
+def test_featurized_classifier_caps_predict_cache(monkeypatch):
+    monkeypatch.setattr(featurized_classifier, "MAX_CACHED_PREDICT_DESCRIPTIONS", 2)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        clf = FeaturizedClassifier(CountVectorizer(), MultinomialNB(), cache_dir=cache_dir)
+        clf.fit(TEXT_FEATURES, TEXT_LABELS)
+        uncached = FeaturizedClassifier(CountVectorizer(), MultinomialNB()).fit(TEXT_FEATURES, TEXT_LABELS)
+
+        x = ["coffee", "grocery", "coffee shop", "coffee"]
+        assert (clf.transform(x) != uncached.transform(x)).nnz == 0
+
+        # Only the most recent descriptions are kept, and predictions are unaffected
+        key = featurized_classifier._hash("predict", clf._vectorizer_key)
+        descriptions, matrix, _ = FeatureCache(cache_dir).load(key)
+        assert descriptions == ["grocery", "coffee shop"]
+        assert (matrix != uncached.transform(descriptions)).nnz == 0
+        assert list(clf.predict(x)) == list(uncached.predict(x))
+
+
+def test_online_classifier_adds_new_classes():
+    clf = OnlineClassifier()
+
+    # A single category cannot be fit yet, so it is held until a second one arrives
+    clf.partial_fit(["coffee shop"], ["Coffee Shops"])
+    assert list(clf.predict(["anything"])) == ["Coffee Shops"]
+
+    clf.partial_fit(["grocery store"], ["Groceries"])
+    assert list(clf.classes_) == ["Coffee Shops", "Groceries"]
+
+    for _ in range(5):
+        clf.partial_fit(["gas station", "coffee shop", "grocery store"], ["Gas", "Coffee Shops", "Groceries"])
+    assert list(clf.classes_) == ["Coffee Shops", "Gas", "Groceries"]
+    assert list(clf.predict(["coffee shop", "grocery store", "gas station"])) == ["Coffee Shops", "Groceries", "Gas"]
+    assert clf.predict_proba(["gas station"]).shape == (1, 3)
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from spearmint.dashboard import data_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    data_cache.clear()
+    yield
+    data_cache.clear()
+
+
+def test_put_get():
+    df = pd.DataFrame({"a": [1, 2]})
+    token = data_cache.put(df)
+
+    assert isinstance(token, str)
+    assert data_cache.get(token) is df
+
+    # Replacing under the same token
+    df2 = pd.DataFrame({"a": [3]})
+    assert data_cache.put(df2, token=token) == token
+    assert data_cache.get(token) is df2
+
+
+def test_get_missing_token():
+    with pytest.raises(KeyError):
+        data_cache.get("not a token")
+
+    assert data_cache.get("not a token", default_factory=lambda: "reloaded") == "reloaded"
+    # The reloaded data is cached under the token
+    assert data_cache.get("not a token") == "reloaded"
+
+
+def test_least_recently_used_is_evicted(monkeypatch):
+    monkeypatch.setattr(data_cache, "MAX_ENTRIES", 2)
+    first = data_cache.put(1)
+    second = data_cache.put(2)
+
+    # Using first makes second the least recently used
+    data_cache.get(first)
+    data_cache.put(3)
+
+    assert data_cache.get(first) == 1
+    with pytest.raises(KeyError):
+        data_cache.get(second)
+
+
+def test_is_valid_token(empty_cache):
+    token = data_cache.put("data")
+    assert data_cache.is_valid_token(token)
+
+    # Anything a client could send that put did not make (eg: a derived token) is not valid
+    for token in (token + "-spend-cube", "raw-data", "", None, 1):
+        assert not data_cache.is_valid_token(token)
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from spearmint.data.db_session import global_init, global_forget
+
+
+@pytest.fixture
+def old_db_file():
+    with tempfile.TemporaryDirectory() as tempdir:
+        db_file = os.path.join(tempdir, "old.sqlite")
+        conn = sqlite3.connect(db_file)
+        # Tables as created when suggestions were stored in the category table, before the confidence column existed
+        conn.execute("CREATE TABLE category (id INTEGER NOT NULL, datetime DATETIME, scheme VARCHAR NOT NULL, "
+                     "category VARCHAR NOT NULL, transaction_id INTEGER, PRIMARY KEY (id))")
+        conn.execute('CREATE TABLE "transaction" (id INTEGER NOT NULL, datetime DATETIME, description VARCHAR, '
+                     'amount FLOAT, account_name VARCHAR, source_file VARCHAR, category_id INTEGER, '
+                     'categories_suggested_id INTEGER, PRIMARY KEY (id))')
+        conn.executemany('INSERT INTO "transaction" (id, description, category_id) VALUES (?, ?, ?)',
+                         [(1, "coffee", 1), (2, "grocery", None)])
+        conn.executemany("INSERT INTO category (id, scheme, category, transaction_id) VALUES (?, ?, ?, ?)",
+                         [
+                             # Suggested from file and also accepted by transaction 1
+                             (1, "from_file", "Coffee Shops", 1),
+                             # Suggestions only
+                             (2, "most_common", "Coffee Shops", 1),
+                             (3, "most_common", "Restaurants", 1),
+                             (4, "most_common", "Groceries", 2),
+                         ])
+        conn.commit()
+        conn.close()
+        yield db_file
+        global_forget()
+
+
+def test_global_init_migrates_old_db(old_db_file):
+    global_init(old_db_file, echo=False)
+
+    conn = sqlite3.connect(old_db_file)
+    category_columns = [row[1] for row in conn.execute("PRAGMA table_info(category)")]
+    transaction_indexes = [row[1] for row in conn.execute('PRAGMA index_list("transaction")')]
+    categories = conn.execute("SELECT id, scheme, category FROM category ORDER BY id").fetchall()
+    suggestions = conn.execute("SELECT transaction_id, scheme, rank, category FROM suggested_category "
+                               "ORDER BY transaction_id, scheme, rank").fetchall()
+    conn.close()
+
+    # Missing columns and indexes are added
+    assert "confidence" in category_columns
+    assert "ix_transaction_category_id" in transaction_indexes
+
+    # Suggestions are moved to their own table and ranked, leaving only accepted categories behind
+    assert categories == [(1, "from_file", "Coffee Shops")]
+    assert suggestions == [
+        (1, "from_file", 0, "Coffee Shops"),
+        (1, "most_common", 0, "Coffee Shops"),
+        (1, "most_common", 1, "Restaurants"),
+        (2, "most_common", 0, "Groceries"),
+    ]
+
+
+def test_global_init_refuses_non_nullable_column():
+    with tempfile.TemporaryDirectory() as tempdir:
+        db_file = os.path.join(tempdir, "old.sqlite")
+        conn = sqlite3.connect(db_file)
+        # Missing the non-nullable scheme column (and confidence, which could be added)
+        conn.execute("CREATE TABLE category (id INTEGER NOT NULL, datetime DATETIME, category VARCHAR NOT NULL, "
+                     "transaction_id INTEGER, PRIMARY KEY (id))")
+        conn.commit()
+        conn.close()
+
+        with pytest.raises(RuntimeError, match="category.scheme"):
+            global_init(db_file, echo=False)
+
+        # Nothing is changed
+        conn = sqlite3.connect(db_file)
+        category_columns = [row[1] for row in conn.execute("PRAGMA table_info(category)")]
+        conn.close()
+        assert "confidence" not in category_columns
@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from spearmint.dashboard import data_cache
+from spearmint.data_structures.spend_cube import SpendCube
+
+# The dashboard needs dash to import
+scenario_comparison = pytest.importorskip("spearmint.dashboard.scenario_comparison", exc_type=ImportError)
+
+
+def test_spend_cube_is_cached_per_session():
+    transactions = pd.DataFrame([
+        ("2020-01-15", "Paycheck", 1000),
+    ], columns=["datetime", "category", "amount"]).assign(datetime=lambda df: pd.to_datetime(df["datetime"]))
+    token = data_cache.put(transactions)
+
+    cube = scenario_comparison._get_spend_cube(token)
+    assert isinstance(cube, SpendCube)
+    assert scenario_comparison._get_spend_cube(token) is cube
+
+    # Another session's data gets its own cube
+    assert scenario_comparison._get_spend_cube(data_cache.put(transactions)) is not cube
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spearmint.data_structures.budget import Budget, BudgetCollection
+from spearmint.data_structures.spend_cube import SpendCube
+
+
+@pytest.fixture
+def budget():
+    bc = BudgetCollection("Overall")
+    income = BudgetCollection("Income")
+    income.add_budget(Budget(1000, ["Paycheck"]))
+    expenses = BudgetCollection("Expenses")
+    expenses.add_budget(Budget(-300, ["Groceries"]))
+    expenses.add_budget(Budget(-200, ["Restaurants", "Coffee Shops"], name="Food Out"))
+    # Listed before any budget with categories to check rows follow the budget order, not the category order
+    bc.add_budget(BudgetCollection("Empty"))
+    bc.add_budget(income)
+    bc.add_budget(expenses)
+    return bc
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame([
+        ("2020-01-20", "Groceries", -350),
+        ("2020-01-15", "Paycheck", 1000),
+        ("2020-01-21", "Coffee Shops", -20),
+        ("2020-01-22", "Groceries", -10),
+        ("2020-03-20", "Restaurants", -250),
+        ("2020-03-21", "Not budgeted", -5000),
+        ("2020-03-22", None, -1),
+        (None, "Groceries", -1),
+    ], columns=["datetime", "category", "amount"]).assign(datetime=lambda df: pd.to_datetime(df["datetime"]))
+
+
+def test_from_transactions(transactions):
+    cube = SpendCube.from_transactions(transactions)
+
+    # Months are contiguous, even without transactions in February.  Missing categories/dates are left out
+    np.testing.assert_array_equal(cube.months, pd.date_range("2020-01-01", "2020-03-01", freq="MS"))
+    assert list(cube.categories) == ["Groceries", "Paycheck", "Coffee Shops", "Restaurants", "Not budgeted"]
+    np.testing.assert_array_equal(cube.sums, [[-360, 0, 0], [1000, 0, 0], [-20, 0, 0], [0, 0, -250], [0, 0, -5000]])
+    np.testing.assert_array_equal(cube.counts, [[2, 0, 0], [1, 0, 0], [1, 0, 0], [0, 0, 1], [0, 0, 1]])
+
+    # Months outside the cube are zero
+    months = pd.to_datetime(["2019-12-01", "2020-03-01"])
+    np.testing.assert_array_equal(cube.get_sums(months)[:, 1], cube.sums[:, 2])
+    assert not cube.get_counts(months)[:, 0].any()
+
+
+def test_from_empty_transactions():
+    cube = SpendCube.from_transactions(pd.DataFrame({"datetime": pd.to_datetime([]), "category": [], "amount": []}))
+    assert cube.sums.shape == (0, 0)
+
+
+@pytest.mark.parametrize("depth, expected_sums, expected_counts", [
+    ("child", [[0, 0, 0], [1000, 0, 0], [-380, 0, -250]], [[0, 0, 0], [1, 0, 0], [3, 0, 1]]),
+    ("leaf", [[1000, 0, 0], [-360, 0, 0], [-20, 0, -250]], [[1, 0, 0], [2, 0, 0], [1, 0, 1]]),
+])
+def test_aggregate_to_budgets(budget, transactions, depth, expected_sums, expected_counts):
+    cube = SpendCube.from_transactions(transactions)
+    for b in (budget, budget.freeze()):
+        sums, counts = cube.aggregate_to_budgets(b, depth=depth)
+        assert len(sums) == len(b.get_budgets_at_depth(depth))
+        np.testing.assert_array_equal(sums, expected_sums)
+        np.testing.assert_array_equal(counts, expected_counts)
+
+    # Only the requested months
+    sums, _ = cube.aggregate_to_budgets(budget, months=pd.to_datetime(["2020-03-01"]), depth=depth)
+    np.testing.assert_array_equal(sums, np.asarray(expected_sums)[:, [2]])
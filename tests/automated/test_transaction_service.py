@@ -1,11 +1,15 @@
 # TODO: Need to flesh this out more.  Only tests a small subset
 
+import pandas as pd
 import pytest
 
+from spearmint.classifiers.rules_classifier import RulesClassifier
 from spearmint.data.category import Category
+from spearmint.data.suggested_category import SuggestedCategory
 from spearmint.data.db_session import global_init, global_forget, create_session
 from spearmint.data.transaction import Transaction
-from spearmint.services.transaction import get_unique_transaction_categories_as_string
+from spearmint.services.category import get_suggested_categories_by_transaction
+from spearmint.services.transaction import get_unique_transaction_categories_as_string, add_transactions_from_dataframe
 
 
 @pytest.fixture
@@ -30,14 +34,14 @@ def db_with_desc_cat(db_init):
     trxs = []
     for labeled_trx in LABELED_TRANSACTIONS:
         print(f"labeled_trx = {labeled_trx}")
-        category = Category(category=str(labeled_trx['category']), scheme="from_test")
+        category = str(labeled_trx['category'])
 
         kwargs = {k: v for k, v in labeled_trx.items() if k not in ["category", "accept_category"]}
         trx = Transaction(**kwargs)
 
-        trx.categories_suggested.append(category)
+        trx.categories_suggested.append(SuggestedCategory(category=category, scheme="from_test", rank=0))
         if labeled_trx.get("accept_category", None):
-            trx.category = category
+            trx.category = Category(category=category, scheme="from_test")
 
         trxs.append(trx)
     s.add_all(trxs)
@@ -50,3 +54,30 @@ def test_lookup_classifier(db_with_desc_cat):
     actual_categories = get_unique_transaction_categories_as_string()
     assert expected_categories == set(actual_categories)
     assert len(expected_categories) == len(actual_categories)
+
+
+def test_add_transactions_with_classifiers(db_with_desc_cat):
+    df = pd.DataFrame({
+        "Amount": [1.0, 2.0],
+        "Datetime": [None, None],
+        "Description": ["new coffee", "new groceries"],
+        "Account Name": ["acct", "acct"],
+        "Source File": ["test.csv", "test.csv"],
+        "Category": [None, None],
+    })
+    rules = RulesClassifier([("coffee", "Coffee Shops"), ("groceries", "Groceries")])
+
+    add_transactions_from_dataframe(df, classifiers={"rules": rules})
+
+    suggestions = get_suggested_categories_by_transaction("rules")
+    s = create_session()
+    new_ids = [trx_id for trx_id, in s.query(Transaction.id).filter(Transaction.source_file == "test.csv")]
+    s.close()
+    # Only the new transactions are classified
+    assert sorted(suggestions) == sorted(new_ids)
+    assert sorted(c[0].category for c in suggestions.values()) == ["Coffee Shops", "Groceries"]
+
+
+def test_unique_accepted_categories(db_with_desc_cat):
+    # Only categories 0 and 2 are accepted by a transaction
+    assert sorted(get_unique_transaction_categories_as_string('accepted')) == ["0", "2"]